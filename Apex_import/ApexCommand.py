@@ -11,32 +11,54 @@ __copyright__ = "Copyright 2008 LLNL"
 import apex
 import os
 import string
+import threading
 from StringIO import *
 from subprocess import *
 
+# Held while writing to the terminal, so that the output of APEX commands run at the
+# same time (see ApexCommandScheduler) doesn't get mixed up within a line or a dump:
+_outputLock = threading.RLock()
+
 class ApexCommand:
     "Apex command implementation base class"
     
+    # The most characters of file names to put on one APEX 'show_status' command.
+    # Each command starts an apexinit-wrapped process, which takes seconds, so each
+    # one gets as many files as fit comfortably on a command line.
+    maxStatusCommandLength = 32 * 1024
+    
     def __init__(self, debugOn, effortOnly):
         """Initializes the instance variables associated with the class
         """
         self.__debugOn    = debugOn
         self.__effortOnly = effortOnly
+        # The 'show_status' results so far, by kind of status ("controlled" or
+        # "ready") and then by filename.  Moving or updating a file forgets its
+        # results.
+        self._statusCache = {}
     
     def log(self, message):
-	    """Display the given message onto the terminal.
-	    """
-	    if self.__effortOnly:
-		   print "EFFORT_ONLY " + message
-	    else:
-		   print message
+        """Display the given message onto the terminal.
+        """
+        _outputLock.acquire()
+        try:
+            if self.__effortOnly:
+                print "EFFORT_ONLY " + message
+            else:
+                print message
+        finally:
+            _outputLock.release()
 
     def debugPrint(self, message):
         """Display the given debug message onto the terminal
             if and only if debugging mode has been turned on.
         """
         if self.__debugOn:
-            print "$$$ " + message
+            _outputLock.acquire()
+            try:
+                print "$$$ " + message
+            finally:
+                _outputLock.release()
 
     def setDebugOn(self, debugOn):
         """Set the class variable to what was passed
@@ -75,11 +97,11 @@ class ApexCommand:
                 and False if the filename is an APEX Uncontrolled file.
             The APEX command performed is as follows:
                 apex show_status -all <filenameList>
+            Only the files whose status is not already known are given to the command.
         """
-        Popen_Args_List = self.buildShowStatusCommand(filenameList)
-        self.dumpPopenArgs(apex.Show_Status_Command, Popen_Args_List)
-        Results_Stream = self.issueApexCommand(Popen_Args_List)
-        return self.analyzeShowStatusResults(filenameList, Results_Stream)
+        return self.cachedShowStatus("controlled", filenameList, 
+                                     self.buildShowStatusCommand,
+                                     self.analyzeShowStatusResults)
 
     def isFileReadyToMove(self, filename):
         """Performs the APEX 'show_status' command to determine if the given file
@@ -110,12 +132,64 @@ class ApexCommand:
                                         or an Uncontrolled APEX file which would not affect a move
                 and False if the filename is an APEX Controlled file that is NOT ready to be moved.
             The APEX command performed is as follows:
-                apex show_status -all <filenameList>
+                apex show_status -all -verbose <filenameList>
+            Only the files whose status is not already known are given to the command.
         """
-        Popen_Args_List = self.buildShowStatusVerboseCommand(filenameList)
-        self.dumpPopenArgs(apex.Show_Status_Command, Popen_Args_List)
-        Results_Stream = self.issueApexCommand(Popen_Args_List)
-        return self.analyzeShowStatusResultsForReadiness(filenameList, Results_Stream)
+        return self.cachedShowStatus("ready", filenameList, 
+                                     self.buildShowStatusVerboseCommand,
+                                     self.analyzeShowStatusResultsForReadiness)
+
+    def cachedShowStatus(self, statusKind, filenameList, buildCommand, analyzeResults):
+        """Returns a tuple list containing each filename in the given list and its
+            statusKind result.  The results not already cached are found with as few
+            APEX 'show_status' commands as the command line length allows, each built
+            by buildCommand and analyzed by analyzeResults, and then cached.
+            The failures filled in for files missing from a command's output are
+            returned but not cached, so the next query asks APEX again.
+        """
+        Status_Cache = self._statusCache.setdefault(statusKind, {})
+        Uncached     = {}
+        Unknown_List = []
+        Unknown_Set  = set()
+        for fname in filenameList:
+            if (fname not in Status_Cache) and (fname not in Unknown_Set):
+                Unknown_List.append(fname)
+                Unknown_Set.add(fname)
+        for File_List in self.splitForCommandLine(Unknown_List, self.maxStatusCommandLength):
+            Popen_Args_List = buildCommand(File_List)
+            self.dumpPopenArgs(apex.Show_Status_Command, Popen_Args_List)
+            Results_Lines = self.issueApexCommandLines(Popen_Args_List)
+            (Parsed_List, Filled_List) = analyzeResults(File_List, Results_Lines)
+            for (fname, results) in Parsed_List:
+                Status_Cache[fname] = results
+            for (fname, results) in Filled_List:
+                Uncached[fname] = results
+        return [(fname, Status_Cache.get(fname, Uncached.get(fname))) for fname in filenameList]
+
+    def forgetStatus(self, filenameList):
+        """Forgets any cached 'show_status' results for the files in the given list.
+        """
+        for Status_Cache in self._statusCache.values():
+            for fname in filenameList:
+                Status_Cache.pop(fname, None)
+
+    def splitForCommandLine(self, filenameList, maxLength):
+        """Splits the given list of files into lists whose names add up to no more
+            than maxLength characters (but that have at least one file each), in order.
+        """
+        Lists       = []
+        File_List   = []
+        List_Length = 0
+        for fname in filenameList:
+            if (File_List and (List_Length + len(fname) + 1 > maxLength)):
+                Lists.append(File_List)
+                File_List   = []
+                List_Length = 0
+            File_List.append(fname)
+            List_Length = List_Length + len(fname) + 1
+        if File_List:
+            Lists.append(File_List)
+        return Lists
 
     def moveFileToDir(self, filename, dirname):
         """Performs an APEX move of the given file to the given directory.
@@ -164,8 +238,11 @@ class ApexCommand:
         """
         Popen_Args_List = self.buildMoveCommand(filenameList, dirname)
         self.dumpPopenArgs(apex.Move_Object_Command, Popen_Args_List)
-        Results_Stream = self.issueApexCommand(Popen_Args_List)
-        return self.analyzeResults(apex.Move_Object_Command, filenameList, Results_Stream)
+        Results_Lines = self.issueApexCommandLines(Popen_Args_List)
+        Results_List = self.analyzeResults(apex.Move_Object_Command, filenameList, Results_Lines)
+        self.forgetStatus(filenameList + 
+                          [os.path.join(dirname, os.path.basename(fname)) for fname in filenameList])
+        return Results_List
 
     def updateFileToLatest(self, filename):
         """Performs the APEX 'accept_changes' command to update the given file
@@ -190,8 +267,10 @@ class ApexCommand:
         """
         Popen_Args_List = self.buildUpdateToLatestCommand(filenameList)
         self.dumpPopenArgs(apex.Update_To_Latest_Command, Popen_Args_List)
-        Results_Stream = self.issueApexCommand(Popen_Args_List)
-        return self.analyzeResults(apex.Update_To_Latest_Command, filenameList, Results_Stream)
+        Results_Lines = self.issueApexCommandLines(Popen_Args_List)
+        Results_List = self.analyzeResults(apex.Update_To_Latest_Command, filenameList, Results_Lines)
+        self.forgetStatus(filenameList)
+        return Results_List
 
     def copyDirectory(self, sourcePath, destinationName): 
         """Performs the APEX 'accept_changes' command to duplicate the contents of the
@@ -299,10 +378,16 @@ class ApexCommand:
             The APEX command performed is as follows:
                 apex compare -controlled <baselineView> <currentView>
         """
+        return list(self.iterCompareViews(baselineView, currentView))
+
+    def iterCompareViews(self, baselineView, currentView): 
+        """Like compareViews, but yields each tuple as soon as the APEX 'compare' command
+            outputs its line, instead of returning them all once the command is done.
+        """
         Popen_Args_List = self.buildCompareViewsCommand(baselineView, currentView)
         self.dumpPopenArgs(apex.Compare_Views_Command, Popen_Args_List)
-        Results_Stream = self.issueApexCommand(Popen_Args_List)
-        return self.analyzeCompareResults(apex.Compare_Views_Command, Results_Stream)
+        Results_Lines = self.issueApexCommandLines(Popen_Args_List)
+        return self.iterCompareResults(apex.Compare_Views_Command, Results_Lines)
 
     def duplicateFileVersion(self, filename, destination): 
         """Performs the APEX 'accept_changes' command to create a duplicate version of the
@@ -329,8 +414,10 @@ class ApexCommand:
         """
         Popen_Args_List = self.buildDuplicateVersionCommand(filenameList, destination, False)
         self.dumpPopenArgs(apex.Duplicate_Version_Command, Popen_Args_List)
-        Results_Stream = self.issueApexCommand(Popen_Args_List)
-        return self.analyzeResults(apex.Duplicate_Version_Command, filenameList, Results_Stream)
+        Results_Lines = self.issueApexCommandLines(Popen_Args_List)
+        Results_List = self.analyzeResults(apex.Duplicate_Version_Command, filenameList, Results_Lines)
+        self.forgetStatus([os.path.join(destination, os.path.basename(fname)) for fname in filenameList])
+        return Results_List
 
     def getSwitchInfo(self, viewName, switchName):
         """Performs the APEX 'show_switches' command to show the switch information for a given APEX switch.
@@ -462,14 +549,19 @@ class ApexCommand:
         """Dump the contents of the given Popen arguments list, for the given APEX command,
             to the display.
         """
-        self.debugPrint("    dump of APEX command <" + commandName + "> ...")
-        self.log("-----------------------------------------------------------")
-        Arg_String = ""
-        for popenArg in popenArgsList:
-            for arg in string.split(popenArg, ","):
-                self.log(Arg_String + arg)
-                Arg_String = Arg_String + "  "
-        self.log("-----------------------------------------------------------")
+        # All together, even when commands are issued from several threads:
+        _outputLock.acquire()
+        try:
+            self.debugPrint("    dump of APEX command <" + commandName + "> ...")
+            self.log("-----------------------------------------------------------")
+            Arg_String = ""
+            for popenArg in popenArgsList:
+                for arg in string.split(popenArg, ","):
+                    self.log(Arg_String + arg)
+                    Arg_String = Arg_String + "  "
+            self.log("-----------------------------------------------------------")
+        finally:
+            _outputLock.release()
 
     def dumpResultsList(self, commandName, resultsList):
         """Dump the contents of the given results list, for the given APEX command,
@@ -504,6 +596,41 @@ class ApexCommand:
         # return the output stream results
         return Output_Stream
 
+    def issueApexCommandLines(self, popenArgsList):
+        """Issue the APEX command associated with the given Popen arguments list, like
+            issueApexCommand, but return an iterator over the lines of its output, as the
+            command writes them.  The analyze methods take either.
+        """
+        if (self.__effortOnly and (popenArgsList[1] != apex.Show_Status_Command)):
+            return iter([self.buildBogusOutputStream()])
+        try:   
+            Null_Stream = open(os.devnull, "w")
+            p1 = Popen(popenArgsList, env = os.environ, stdout = PIPE, stderr = Null_Stream)
+        except OSError, e:
+            print "Execution failed:", e
+            raise
+        return self.linesFromProcess(p1, Null_Stream)
+
+    def linesFromProcess(self, process, nullStream):
+        """Yields each line of the process's output, then waits for it to exit.
+        """
+        try:
+            # readline, since iterating over a pipe reads ahead in large blocks:
+            for line in iter(process.stdout.readline, ""):
+                yield line
+        finally:
+            process.stdout.close()
+            process.wait()
+            nullStream.close()
+
+    def linesOf(self, resultsStream):
+        """Returns an iterator over the lines of the given results, which are either
+            a string (from issueApexCommand) or already lines (from issueApexCommandLines).
+        """
+        if isinstance(resultsStream, basestring):
+            return iter(StringIO(resultsStream))
+        return iter(resultsStream)
+
     def buildCreateWorkingCommand(self, viewName):
         """Build a list that contains the APEX 'create_working' command and the options and arguments
             needed to create a working view for the given viewName.
@@ -659,108 +786,111 @@ class ApexCommand:
     def analyzeShowStatusResults(self, filenameList, resultsStream):
         """Analyze the results found within the resultsStream from the APEX 'show_status' command
             associated with the list of files given.
+            Returns a tuple of tuple lists: the results found in the stream, and the
+            failures filled in for the files it didn't show.
         """
-        self.debugPrint(resultsStream)
+        Debug_On            = self.__debugOn
         File_Name_Hdr_Found = False
         Results_List        = []
         FnIdx = 0
-        Sptr  = StringIO(resultsStream)
-        try:
-            for line in Sptr:
+        for line in self.linesOf(resultsStream):
+            if Debug_On:
                 self.debugPrint("line = [" + line + "]")
-                if File_Name_Hdr_Found:
-                    if (FnIdx >= len(filenameList)):
-                        continue # for line in Sptr loop
-                    if (string.find(line, os.path.basename(filenameList[FnIdx])) >= 0):
+            if File_Name_Hdr_Found:
+                if (FnIdx >= len(filenameList)):
+                    continue # for line loop
+                if (string.find(line, os.path.basename(filenameList[FnIdx])) >= 0):
+                    if Debug_On:
                         self.debugPrint("    Filename found: " + filenameList[FnIdx])
-                        if (string.find(line, "Uncontrolled") >= 0):
-                            # file is NOT controlled
-                            self.debugPrint("        File is UNCONTROLLED!")
-                            Results_List = Results_List + [(filenameList[FnIdx], False)]
-                        else:
-                            # file IS controlled
-                            self.debugPrint("        File is CONTROLLED!")
-                            Results_List = Results_List + [(filenameList[FnIdx], True)]
-                        FnIdx = FnIdx + 1
+                    if (string.find(line, "Uncontrolled") >= 0):
+                        # file is NOT controlled
+                        self.debugPrint("        File is UNCONTROLLED!")
+                        Results_List.append((filenameList[FnIdx], False))
+                    else:
+                        # file IS controlled
+                        self.debugPrint("        File is CONTROLLED!")
+                        Results_List.append((filenameList[FnIdx], True))
+                    FnIdx = FnIdx + 1
+                    if Debug_On:
                         self.debugPrint("    FnIdx = " + str(FnIdx))
-                else:
-                    if (string.find(line, "File Name") >= 0):
-                        self.debugPrint("    File Name header found!")
-                        File_Name_Hdr_Found = True
-        finally:
-            Sptr.close()
+            else:
+                if (string.find(line, "File Name") >= 0):
+                    self.debugPrint("    File Name header found!")
+                    File_Name_Hdr_Found = True
 	    
+        Filled_List = []
         if (FnIdx < len(filenameList)):
             self.log("***** WARNING: Reached end of results before processing all filenames in list!")
             self.log("*****          Filling in list with failures for this command!")
             while (FnIdx < len(filenameList)):
-                Results_List = Results_List + [(filenameList[FnIdx], False)]
+                Filled_List.append((filenameList[FnIdx], False))
                 FnIdx = FnIdx + 1
         
-        self.dumpResultsList(apex.Show_Status_Command, Results_List)
-        return Results_List
+        self.dumpResultsList(apex.Show_Status_Command, Results_List + Filled_List)
+        return (Results_List, Filled_List)
 
     def analyzeShowStatusResultsForReadiness(self, filenameList, resultsStream):
         """Analyze the results found within the resultsStream from the APEX 'show_status' command
             associated with the list of files given.
+            Returns a tuple of tuple lists, as analyzeShowStatusResults does.
         """
-        self.debugPrint(resultsStream)
+        Debug_On            = self.__debugOn
         File_Name_Hdr_Found = False
         Results_List        = []
         FnIdx = 0
-        Sptr  = StringIO(resultsStream)
-        try:
-            for line in Sptr:
+        for line in self.linesOf(resultsStream):
+            if Debug_On:
                 self.debugPrint("line = [" + line + "]")
-                if File_Name_Hdr_Found:
-                    if (FnIdx >= len(filenameList)):
-                        continue # for line in Sptr loop
-                    if (string.find(line, os.path.basename(filenameList[FnIdx])) >= 0):
+            if File_Name_Hdr_Found:
+                if (FnIdx >= len(filenameList)):
+                    continue # for line loop
+                if (string.find(line, os.path.basename(filenameList[FnIdx])) >= 0):
+                    if Debug_On:
                         self.debugPrint("    Filename found: " + filenameList[FnIdx])
-                        if (string.find(line, "Uncontrolled") >= 0):
-                            # file is NOT controlled
-                            self.debugPrint("        File is UNCONTROLLED!")
-                            Results_List = Results_List + [(filenameList[FnIdx], True)]
+                    if (string.find(line, "Uncontrolled") >= 0):
+                        # file is NOT controlled
+                        self.debugPrint("        File is UNCONTROLLED!")
+                        Results_List.append((filenameList[FnIdx], True))
+                    else:
+                        # file IS controlled
+                        self.debugPrint("        File is CONTROLLED!")
+                        # need to check that the file is check-in and is the latest version.
+                        # Look for the following patterns to determine if a file is ready to be moved:
+                        #
+                        #       ' In/' shows up in ' In/In' pattern that shows it is not at the latest version
+                        #       ' In/' shows up in ' In/Out' pattern that shows it has been check out somewhere else
+                        #       ' Private/' shows up in 'Private/In' pattern that shows it has been checked-out privately
+                        #       ' Private/' shows up in 'Private/Out' pattern that shows it has been checked-out privately
+                        #       ' Del' shows up in ' Del' pattern that shows that the file is not at the latest version
+                        if ((string.find(line, " In/") >= 0) or
+                            (string.find(line, "Out") >= 0) or
+                            (string.find(line, "Private") >= 0) or
+                            (string.find(line, "Del") >= 0)):
+                            self.debugPrint("            but file is NOT ready to be moved!")
+                            Results_List.append((filenameList[FnIdx], False))
+                            # show the line that failed!
+                            self.log(line)
                         else:
-                            # file IS controlled
-                            self.debugPrint("        File is CONTROLLED!")
-                            # need to check that the file is check-in and is the latest version.
-                            # Look for the following patterns to determine if a file is ready to be moved:
-                            #
-                            #       ' In/' shows up in ' In/In' pattern that shows it is not at the latest version
-                            #       ' In/' shows up in ' In/Out' pattern that shows it has been check out somewhere else
-                            #       ' Private/' shows up in 'Private/In' pattern that shows it has been checked-out privately
-                            #       ' Private/' shows up in 'Private/Out' pattern that shows it has been checked-out privately
-                            #       ' Del' shows up in ' Del' pattern that shows that the file is not at the latest version
-                            if ((string.find(line, " In/") >= 0) or
-                                (string.find(line, "Out") >= 0) or
-                                (string.find(line, "Private") >= 0) or
-                                (string.find(line, "Del") >= 0)):
-                                self.debugPrint("            but file is NOT ready to be moved!")
-                                Results_List = Results_List + [(filenameList[FnIdx], False)]
-                                # show the line that failed!
-                                self.log(line)
-                            else:
-                                self.debugPrint("            and file IS ready to be moved!")
-                                Results_List = Results_List + [(filenameList[FnIdx], True)]
-                        FnIdx = FnIdx + 1
+                            self.debugPrint("            and file IS ready to be moved!")
+                            Results_List.append((filenameList[FnIdx], True))
+                    FnIdx = FnIdx + 1
+                    if Debug_On:
                         self.debugPrint("    FnIdx = " + str(FnIdx))
-                else:
-                    if (string.find(line, "File Name") >= 0):
-                        self.debugPrint("    File Name header found!")
-                        File_Name_Hdr_Found = True
-        finally:
-            Sptr.close()
+            else:
+                if (string.find(line, "File Name") >= 0):
+                    self.debugPrint("    File Name header found!")
+                    File_Name_Hdr_Found = True
         
+        Filled_List = []
         if (FnIdx < len(filenameList)):
             self.log("***** WARNING: Reached end of results before processing all filenames in list!")
             self.log("*****          Filling in list with failures for this command!")
             while (FnIdx < len(filenameList)):
-                Results_List = Results_List + [(filenameList[FnIdx], False)]
+                Filled_List.append((filenameList[FnIdx], False))
                 FnIdx = FnIdx + 1
         
-        self.dumpResultsList(apex.Show_Status_Command, Results_List)
-        return Results_List
+        self.dumpResultsList(apex.Show_Status_Command, Results_List + Filled_List)
+        return (Results_List, Filled_List)
 
     def analyzeResults(self, commandName, filenameList, resultsStream):
         """Analyze the results found within the resultsStream from an APEX command
@@ -775,33 +905,29 @@ class ApexCommand:
                 ':::' finished processing of the command
         """
         Dump_Output_Upon_Error = False
-        self.debugPrint(resultsStream)
+        Output_Lines = []   # kept to show them if the command failed
         Results_List = []
         FnIdx = 0
-        Sptr  = StringIO(resultsStream)
-        try:
-            for line in Sptr:
-#               self.debugPrint("line = [" + line + "]")
-                if (FnIdx >= len(filenameList)):
-                    continue # for line in Sptr loop
-                if (string.find(line, os.path.basename(filenameList[FnIdx])) >= 0):
-                    self.debugPrint("    File found: [" + filenameList[FnIdx] + "]")
-                    if (string.find(line, " ++") >= 0):
-#                       self.debugPrint("        operation completed!")
-                        # processing of file completed
-                        if (string.find(line, " ++* ") >= 0):
-                            # operation failed on this file
-                            self.debugPrint("            operation FAILED!")
-                            Results_List = Results_List + [(filenameList[FnIdx], False)]
-                            Dump_Output_Upon_Error = True
-                        else:
-                            # operation completed on this file (either successfully or no change)
-                            self.debugPrint("            operation SUCCEEDED!")
-                            Results_List = Results_List + [(filenameList[FnIdx], True)]
-                        FnIdx = FnIdx + 1
-#                       self.debugPrint("    FnIdx = " + str(FnIdx))
-        finally:
-            Sptr.close()
+        for line in self.linesOf(resultsStream):
+            Output_Lines.append(line)
+            if (FnIdx >= len(filenameList)):
+                continue # for line loop
+            if (string.find(line, os.path.basename(filenameList[FnIdx])) >= 0):
+                self.debugPrint("    File found: [" + filenameList[FnIdx] + "]")
+                if (string.find(line, " ++") >= 0):
+                    # processing of file completed
+                    if (string.find(line, " ++* ") >= 0):
+                        # operation failed on this file
+                        self.debugPrint("            operation FAILED!")
+                        Results_List.append((filenameList[FnIdx], False))
+                        Dump_Output_Upon_Error = True
+                    else:
+                        # operation completed on this file (either successfully or no change)
+                        self.debugPrint("            operation SUCCEEDED!")
+                        Results_List.append((filenameList[FnIdx], True))
+                    FnIdx = FnIdx + 1
+        if self.__debugOn:
+            self.debugPrint("".join(Output_Lines))
 		
         if (FnIdx < len(filenameList)):
             if (not self.__effortOnly):
@@ -811,12 +937,12 @@ class ApexCommand:
             Valid_Response = False
             if (self.__effortOnly):
                 Valid_Response = True
-            Results_List = Results_List + [(filenameList[FnIdx], Valid_Response)]
+            Results_List.append((filenameList[FnIdx], Valid_Response))
             FnIdx = FnIdx + 1
 		
         if (Dump_Output_Upon_Error):
             if (not self.__debugOn):
-                self.log(resultsStream)
+                self.log("".join(Output_Lines))
         
         self.dumpResultsList(commandName, Results_List)
         return Results_List
@@ -1008,28 +1134,13 @@ class ApexCommand:
                 Field_Data = line[fieldMin:fieldMax]
                 Field_Data = str.rstrip(Field_Data)
                 Directory_Depth = Field_Data.count("  ")
-#               print "Directory_Depth = ", Directory_Depth
                 Field_Data = str.strip(line[fieldMin:fieldMax])
-#                print "Field_Data after strip = ", Field_Data
-                if (len(relativePathList) > 0):
-                    if (Directory_Depth > 0):
-                        Rel_Path_Name = relativePathList[0]
-                        Depth = 0
-                        for relDir in relativePathList:
-#                            print "relDir = ", relDir
-                            Depth = Depth + 1
-                            if (Depth > Directory_Depth):
-                                break
-                            if (Depth == 1):
-                                continue
-                            Rel_Path_Name = Rel_Path_Name + relDir
-#                            print "Rel_Path_Name = ", Rel_Path_Name
-                        Field_Data = Rel_Path_Name + str(Field_Data)
-#                        print "Field_Data = ", Field_Data
+                if ((len(relativePathList) > 0) and (Directory_Depth > 0)):
+                    # The first Directory_Depth directories:
+                    Field_Data = "".join(relativePathList[:Directory_Depth]) + Field_Data
             else:
                 Field_Data = str.strip(line[fieldMin:fieldMax])
-            Field_Info_List = Field_Info_List + [(fieldName, Field_Data)]
-#            print "Field_Info_List = ", Field_Info_List
+            Field_Info_List.append((fieldName, Field_Data))
         return Field_Info_List
 
     def extractFilenameFromCompare(self, line, relativePathList, annotation):
@@ -1046,22 +1157,21 @@ class ApexCommand:
             Directory_Depth = str.count(line[2:Truncated_Len], "  ")
         else:
             Directory_Depth = 0
-        if (len(relativePathList) > 0):
-            if (Directory_Depth > 0):
-                Rel_Path_Name = relativePathList[0]
-                Depth = 0
-                for relDir in relativePathList:
-                    Depth = Depth + 1
-                    if (Depth >= Directory_Depth):
-                        break
-                    if (Depth == 1):
-                        continue
-                    Rel_Path_Name = Rel_Path_Name + relDir
-                Filename = Rel_Path_Name + Filename
+        if ((len(relativePathList) > 0) and (Directory_Depth > 0)):
+            # The first Directory_Depth - 1 directories (but always the first):
+            Filename = "".join(relativePathList[:max(Directory_Depth - 1, 1)]) + Filename
         return Filename
         
     def analyzeCompareResults(self, commandName, resultsStream):
         """Analyze the results found within the resultsStream from an APEX compare command.
+            Returns the list of tuples iterCompareResults yields.
+        """
+        return list(self.iterCompareResults(commandName, resultsStream))
+
+    def iterCompareResults(self, commandName, resultsStream):
+        """Analyze the results found within the resultsStream from an APEX compare command,
+            yielding a ((filename, reason), False) tuple for each file that needs more work
+            as soon as its line is read.
             The resultsStream will contain data associated with the baseline view and the current view.
             This data contains the file name, the baseline history, version and state
             and the current history, version and state.
@@ -1074,46 +1184,41 @@ class ApexCommand:
                 '*' baseline view and current view have different histories (may need work)
                 'o' the file is checked out in one of the views (needs work)
         """
-        self.debugPrint(resultsStream)
-        Results_List = []
+        Debug_On = self.__debugOn
         File_Name_Hdr_Found = False
         if (self.__effortOnly):
-            self.dumpResultsList(commandName, Results_List)
-            return Results_List
-        Sptr  = StringIO(resultsStream)
-        try:
-            Relative_Path = []
-            for line in Sptr:
+            self.dumpResultsList(commandName, [])
+            return
+        Relative_Path = []
+        for line in self.linesOf(resultsStream):
+            if Debug_On:
                 self.debugPrint("line = [" + line + "]")
-                if (File_Name_Hdr_Found):
-                    if (line.count("-") > 10):
-                        MinMaxFieldList = self.extractFieldMinMax(line)
-                    if (line[-2:-1] == "/"): # end-of-line = "/"
-                        Idx = line.count("  ") # each double-space denotes a directory depth
-                        if (Idx == 1):
-                            # reset list
-                            Relative_Path = [str.lstrip(line[:-1])]
-                        elif (Idx <= len(Relative_Path)):
-                            # replace entry
-                            Relative_Path[Idx-1] = str.lstrip(line[:-1])
-                        else:
-                            # add new entry
-                            Relative_Path = Relative_Path + [str.lstrip(line[:-1])]
-#                        print "Relative_Path = ", Relative_Path
-                    if ((line[:1] == "-") or (line[:1] == "*") or (line[:1] == "o")):
-                        Field_Info_List = self.extractFileInfoFromCompare(line, Relative_Path, 
-                                                                          MinMaxFieldList)
+            if (File_Name_Hdr_Found):
+                if (line.count("-") > 10):
+                    MinMaxFieldList = self.extractFieldMinMax(line)
+                if (line[-2:-1] == "/"): # end-of-line = "/"
+                    Idx = line.count("  ") # each double-space denotes a directory depth
+                    if (Idx == 1):
+                        # reset list
+                        Relative_Path = [str.lstrip(line[:-1])]
+                    elif (Idx <= len(Relative_Path)):
+                        # replace entry
+                        Relative_Path[Idx-1] = str.lstrip(line[:-1])
+                    else:
+                        # add new entry
+                        Relative_Path.append(str.lstrip(line[:-1]))
+                if ((line[:1] == "-") or (line[:1] == "*") or (line[:1] == "o")):
+                    Field_Info_List = self.extractFileInfoFromCompare(line, Relative_Path, 
+                                                                      MinMaxFieldList)
+                    if Debug_On:
                         self.dumpFieldInfoList(Field_Info_List)
-                        (File_Needs_More_Work, Reason) = self.fileNeedsMoreWork(Field_Info_List, line[:1])
-                        Filename = self.getFieldFromFieldInfoList("Filename", Field_Info_List)
+                    (File_Needs_More_Work, Reason) = self.fileNeedsMoreWork(Field_Info_List, line[:1])
+                    Filename = self.getFieldFromFieldInfoList("Filename", Field_Info_List)
+                    if Debug_On:
                         self.debugPrint("This file: <" + Filename + "> reason: " + Reason)
-                        if (File_Needs_More_Work):
-                            Results_List = Results_List + [((Filename, Reason), False)]
-                else:
-                    if (string.find(line, "File Name") >= 0):
-                        self.debugPrint("    File Name header found!")
-                        File_Name_Hdr_Found = True
-        finally:
-            Sptr.close()
-        
-        return Results_List
+                    if (File_Needs_More_Work):
+                        yield ((Filename, Reason), False)
+            else:
+                if (string.find(line, "File Name") >= 0):
+                    self.debugPrint("    File Name header found!")
+                    File_Name_Hdr_Found = True
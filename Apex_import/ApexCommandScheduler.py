@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+"""Runs APEX commands on a bounded pool of threads.
+
+Each APEX command is a process that takes seconds to start and then mostly waits, so
+commands on different views can run at the same time.  Commands on the same view run one
+at a time, in the order they were submitted, as they did before: later commands on a
+view may depend on earlier ones (e.g. duplicate after update).
+
+Usage:
+
+    scheduler = ApexCommandScheduler(maxConcurrent)
+    try:
+        jobs = []
+        for fileList in ...:
+            jobs = jobs + [scheduler.submit(apex.viewOf(targetDirectory),
+                                            apexCommand.moveFileListToDir,
+                                            fileList, targetDirectory)]
+        (Succeeded_List, Failed_List) = self.processApexResultsList(
+            apex.Move_Object_Command, scheduler.collect(jobs))
+    finally:
+        scheduler.stop()
+
+A submitted function must not change the current directory, which all the threads share
+(so e.g. ApexCommand.copyFile can't be submitted).  With maxConcurrent 0, submit just
+runs the function.
+"""
+
+import Queue
+import sys
+import threading
+
+class ApexCommandJob:
+    "An APEX command function submitted to an ApexCommandScheduler, and its results"
+
+    def __init__(self, view, function, args):
+        self.view      = view
+        self.function  = function
+        self.args      = args
+        self.__results = None
+        self.__excInfo = None
+        self.__done    = threading.Event()
+
+    def run(self):
+        try:
+            self.__results = self.function(*self.args)
+        except:
+            self.__excInfo = sys.exc_info()
+        self.__done.set()
+
+    def getResults(self):
+        """Waits for the function to finish, and returns what it returned, or raises
+            what it raised.
+        """
+        self.__done.wait()
+        if self.__excInfo is not None:
+            raise self.__excInfo[0], self.__excInfo[1], self.__excInfo[2]
+        return self.__results
+
+class ApexCommandScheduler:
+    "Runs APEX command functions concurrently, but in order within each view"
+
+    def __init__(self, maxConcurrent):
+        """Starts maxConcurrent worker threads.
+        """
+        self.__maxConcurrent = maxConcurrent
+        self.__ready   = Queue.Queue()  # jobs whose view has nothing else running
+        self.__waiting = dict()         # for each view with a job running, the jobs
+                                        # submitted after it, in order
+        self.__lock    = threading.Condition()
+        self.__threads = []
+        for index in range(maxConcurrent):
+            thread = threading.Thread(target = self.__work, name = "apex" + str(index))
+            thread.setDaemon(True)
+            thread.start()
+            self.__threads = self.__threads + [thread]
+
+    def submit(self, view, function, *args):
+        """Runs function(*args) once every job submitted before it for view has run.
+            Returns its ApexCommandJob.
+        """
+        job = ApexCommandJob(view, function, args)
+        if self.__maxConcurrent <= 0:
+            job.run()
+            return job
+        self.__lock.acquire()
+        try:
+            if view in self.__waiting:
+                self.__waiting[view].append(job)
+                return job
+            self.__waiting[view] = []
+        finally:
+            self.__lock.release()
+        self.__ready.put(job)
+        return job
+
+    def collect(self, jobs):
+        """Waits for the given jobs, each of which returns a tuple list of filenames and
+            results, and returns all their tuples in one list, in the order of jobs.
+        """
+        Results_List = []
+        for job in jobs:
+            Results_List = Results_List + job.getResults()
+        return Results_List
+
+    def stop(self):
+        """Waits for all the submitted jobs to run, and stops the workers.
+        """
+        # Wait for the views first, since a job queues the next in its view when it ends:
+        self.__lock.acquire()
+        try:
+            while self.__waiting:
+                self.__lock.wait()
+        finally:
+            self.__lock.release()
+        for thread in self.__threads:
+            self.__ready.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+
+    def __work(self):
+        while True:
+            job = self.__ready.get()
+            if job is None:
+                break
+            job.run()
+            # Start the next job for the view, if any:
+            self.__lock.acquire()
+            try:
+                if self.__waiting[job.view]:
+                    Next_Job = self.__waiting[job.view].pop(0)
+                else:
+                    del self.__waiting[job.view]
+                    Next_Job = None
+                    self.__lock.notifyAll()
+            finally:
+                self.__lock.release()
+            if Next_Job is not None:
+                self.__ready.put(Next_Job)
+
+class _Test:
+    def setup(self):
+        print "BEGIN test"
+        self.events = []
+        self.eventsLock = threading.Lock()
+
+    def record(self, view, fileList, seconds):
+        import time
+        self.eventsLock.acquire()
+        self.events.append(("start", view, fileList[0]))
+        self.eventsLock.release()
+        time.sleep(seconds)
+        self.eventsLock.acquire()
+        self.events.append(("end", view, fileList[0]))
+        self.eventsLock.release()
+        return [(fname, not fname.startswith("bad")) for fname in fileList]
+
+    def run(self):
+        scheduler = ApexCommandScheduler(3)
+        try:
+            jobs = []
+            for view in ("a.wrk", "b.wrk"):
+                for fname in ("1", "2", "3"):
+                    jobs = jobs + [scheduler.submit(view, self.record, view, [view + fname], 0.05)]
+            results = scheduler.collect(jobs)
+            # stop waits for jobs nobody collected:
+            lastJob = scheduler.submit("a.wrk", self.record, "a.wrk", ["a.wrk4"], 0.05)
+            lastJob = scheduler.submit("a.wrk", self.record, "a.wrk", ["a.wrk5"], 0.05)
+        finally:
+            scheduler.stop()
+        assert lastJob.getResults() == [("a.wrk5", True)]
+        assert results == [("a.wrk1", True), ("a.wrk2", True), ("a.wrk3", True),
+                           ("b.wrk1", True), ("b.wrk2", True), ("b.wrk3", True)], results
+        for view in ("a.wrk", "b.wrk"):
+            # One at a time, in order, within a view:
+            viewEvents = [(event, fname) for (event, eventView, fname) in self.events if eventView == view]
+            assert viewEvents[:6] == [("start", view + "1"), ("end", view + "1"),
+                                      ("start", view + "2"), ("end", view + "2"),
+                                      ("start", view + "3"), ("end", view + "3")], viewEvents
+        # The two views at the same time:
+        assert [event for (event, view, fname) in self.events[:2]] == ["start", "start"], self.events
+
+        serial = ApexCommandScheduler(0)
+        job = serial.submit("a.wrk", self.record, "a.wrk", ["bad"], 0)
+        assert job.getResults() == [("bad", False)]
+        failing = serial.submit("a.wrk", self.record, "a.wrk", [], 0)
+        try:
+            failing.getResults()
+            assert False, "expected an IndexError"
+        except IndexError:
+            pass
+
+    def finish(self):
+        print "END test (no errors)"
+
+if __name__ == '__main__':
+    test = _Test()
+    test.setup()
+    test.run()
+    test.finish()
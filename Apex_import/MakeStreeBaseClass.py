@@ -13,6 +13,25 @@ import os
 import shutil
 import sys
 
+def makeDirs(path):
+    """Like os.makedirs, but a directory that another process made first is not an error.
+    """
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+# The file operations doOrLog does, by the names it logs them with:
+fileOperations = {
+    "os.link"       : os.link,
+    "os.makedirs"   : makeDirs,
+    "os.remove"     : os.remove,
+    "os.symlink"    : os.symlink,
+    "shutil.copy2"  : shutil.copy2,
+    "shutil.rmtree" : shutil.rmtree,
+    }
+
 class MakeStree:
     "Make shadow tree base class"
     
@@ -37,6 +56,8 @@ class MakeStree:
         self.workspace       = ""
         self.underApexSession = False
         self.verificationMode = False    # set to True to verify against the 'make_shadow_tree.py' utility
+        self.manifest        = None     # a manifest.Manifest for incremental runs, shared by
+                                        # the Layer and SubSys instances this one creates
         self.viewsProcessed  = 0        # views are considered directories with a ".ss" suffix
         self.dirsProcessed   = 0        # views are directories also
         self.filesProcessed  = 0        # processing means that it has been looked at
@@ -45,6 +66,8 @@ class MakeStree:
         self.statusCount     = 0        # this counts the number of files 
                                         # that were issued the 'show_status' APEX command
         self.latestCount     = 0        # this counts the number of files updated to the 'latest' version
+        self.unchangedCount  = 0        # this counts the number of targets left as they were,
+                                        # because their sources had not changed (incremental runs only)
         self.duplicateCount  = 0        # this counts the number of files that needed to be 'duplicated'
                                         # being 'duplicated' is APEX's way of copying the file
                                         # to a different view under the same sub-system.
@@ -63,8 +86,20 @@ class MakeStree:
                                         # the same place, as a group.
                                         # This will be tunable using the 'maxFilesPerApexMove'
                                         # command line option.
-        self.maxFilesPerApexStatus = 7
         self.maxFilesPerApexUpdate = 7
+        self.maxConcurrentApexCommands = 4  # this is the maximum number of APEX commands run at
+                                        # the same time.  Commands on the same view always run
+                                        # one at a time, in order.  0 runs every command
+                                        # as it is issued.
+        self.maxProcesses    = 1        # this is the maximum number of subsystems made at the
+                                        # same time, each in its own process.  1 makes them
+                                        # all in this process.
+                                        # This will be tunable using the '--jobs' command line option.
+        self.pool            = None     # the multiprocessing.Pool the subsystems are made in, if
+                                        # maxProcesses is more than 1, shared by the Layer instances
+                                        # a Tower instance creates
+        self.deferredLinks   = None     # in a pool worker, the (source, target) of each link into the
+                                        # shared IDL links directory, for the parent to make in order
 
     def getProcessCounts(self):
         """Returns the base class instance variables associated with counts.
@@ -80,6 +115,8 @@ class MakeStree:
         self.log("  Directories Processed: " + str(self.dirsProcessed))
         self.log("        Files Processed: " + str(self.filesProcessed))
         self.log("        Targets Created: " + str(self.targetCount))
+        if (self.manifest is not None):
+            self.log("      Targets Unchanged: " + str(self.unchangedCount))
         if (self.moveIdlAda):
             self.log("         Files Statused: " + str(self.statusCount))
             self.log("            Files Moved: " + str(self.moveCount))
@@ -169,22 +206,58 @@ class MakeStree:
     def prepareTargetDirectory (self, targetDirPath):
         """Prepares target directory by removing the entire tree of the given directory.
         This is in preparation of creating a new tree with new files.
+        On an incremental run, keeps the tree, and just notes that the targets in it
+        that aren't remade are to be removed by removeStaleTargets.
         """
+        if self.manifest is not None:
+            self.manifest.addScope(targetDirPath)
+            if not self.manifest.isNew():
+                if not os.path.exists (targetDirPath):
+                    self.doOrLog ("os.makedirs", targetDirPath)
+                return
         if os.path.exists(targetDirPath):
-            self.runOrLog('shutil.rmtree ("' + targetDirPath + '")')
+            self.doOrLog("shutil.rmtree", targetDirPath)
         if not os.path.exists (targetDirPath):
-            self.runOrLog ('os.makedirs ("' + targetDirPath + '")')    
+            self.doOrLog ("os.makedirs", targetDirPath)
     
     def prepareTargetFile (self, targetFilePath):
         """Prepares to link or copy a file.  Deletes the target, 
         and creates any needed target directories.
         """
         Target_Parent_Path = os.path.dirname(targetFilePath)
-        if os.path.exists (targetFilePath):
-            self.runOrLog ('os.remove ("' + targetFilePath + '")')
+        # lexists, so that a dangling link left by an incremental run is replaced too:
+        if os.path.lexists (targetFilePath):
+            self.doOrLog ("os.remove", targetFilePath)
         if not os.path.exists (Target_Parent_Path):
-            self.runOrLog ('os.makedirs ("' + Target_Parent_Path + '")')    
+            self.doOrLog ("os.makedirs", Target_Parent_Path)
     
+    def targetIsCurrent (self, targetFilePath, sourceFilePath, kind):
+        """Returns True on an incremental run if the target was made from the source
+        last time, and the source hasn't changed since.
+        """
+        if self.manifest is not None and self.manifest.isCurrent(targetFilePath, sourceFilePath, kind):
+            self.debugPrint("unchanged: " + targetFilePath)
+            self.unchangedCount = self.unchangedCount + 1
+            return True
+        return False
+
+    def recordTarget (self, targetFilePath, sourceFilePath, kind):
+        """Notes in the manifest, if any, what the target was just made from.
+        """
+        if self.manifest is not None:
+            self.manifest.record(targetFilePath, sourceFilePath, kind)
+
+    def removeStaleTargets (self):
+        """Removes the targets the last run made that this one didn't, and saves the
+        manifest for the next run.  Leaves any directories they empty.
+        """
+        for targetFilePath in self.manifest.staleTargets():
+            if os.path.lexists (targetFilePath):
+                self.doOrLog ("os.remove", targetFilePath)
+            self.manifest.forget(targetFilePath)
+        if not self.effortOnly:
+            self.manifest.save()
+
     def debugPrint(self, message):
         """Display the given debug message onto the terminal
             if and only if debugging mode has been turned on.
@@ -220,6 +293,15 @@ class MakeStree:
         if not self.effortOnly:
             exec command
 
+    def doOrLog(self, operationName, *args):
+        """Display the file operation (a key of fileOperations) and its arguments the
+            way runOrLog displays a command, and do the operation only if the user
+            wanted to.  Unlike runOrLog, nothing is compiled, and any path works.
+        """
+        self.log(operationName + ' (' + ', '.join(['"' + arg + '"' for arg in args]) + ')')
+        if not self.effortOnly:
+            fileOperations[operationName](*args)
+
     def lookForPositiveResponse(self, responseStr):
         """Analyze the given response string.
             Return True for a positive response (such as 'y', 'yes', 'Y' or 'YES')
@@ -9,7 +9,10 @@ __version__   = "$Revision: 1.6 $"
 __date__      = "$Date: 05/07/2008 14:18:50 $"
 __copyright__ = "Copyright 2008 LLNL"
 
+import multiprocessing
 import os
+import sys
+import dir_walker
 from MakeStreeBaseClass import *
 from MakeStreeForSubSys import *
 from make_stree_utilities import *
@@ -24,18 +27,30 @@ class MakeStreeForLayer(MakeStree):
             to create the appropriate files.
         """
         self.logName()
+        Own_Pool = startSubsysPool(self)
+        try:
+            self.finishSubsystems(self.startSubsystems(sourcePath))
+        finally:
+            if Own_Pool:
+                stopSubsysPool(self)
+
+    def startSubsystems(self, sourcePath):
+        """Creates a MakeStreeForSubsys object for each subsystem in the given source
+            directory that has the tower, and, if there is a pool, starts making them in it.
+            Returns the (object, pool result) list for finishSubsystems.
+        """
         subsysList = []
-        for Entry in os.listdir(sourcePath):
-            Entry_Path = os.path.join(sourcePath, Entry)
+        for Dir_Entry in dir_walker.scan(sourcePath):
             # only add entries to the 'subsysList' if they are directories
-            # with the appropriate SubSystem suffix
-            if os.path.isdir(Entry_Path) and Entry_Path[-3:] == apex.Subsystem_Suffix:
-                subsysList = subsysList + [Entry]
+            # with the appropriate SubSystem suffix (checked first, since
+            # it needs no stat)
+            if Dir_Entry.name[-3:] == apex.Subsystem_Suffix and Dir_Entry.isDir():
+                subsysList = subsysList + [Dir_Entry.name]
                 
+        Started_List = []
         for subsys in subsysList:
             Subsys_Path = os.path.join(sourcePath, subsys)
             Tower_Path  = os.path.join(Subsys_Path, self.towerName)
-            Shadow_Path = os.path.join(targetAdaPath, subsys[:-3])
             if os.path.isdir(Tower_Path):
                 subsysInstance = MakeStreeForSubSys(self.towerName, self.layerName, subsys, subsys)
                 #
@@ -47,36 +62,76 @@ class MakeStreeForLayer(MakeStree):
                                                 self.moveIdlAda, self.removeIdlAdaDir, self.checkIdlAdaDir,
                                                 self.effortOnly, self.debugOn, self.underApexSession,
                                                 self.workspace))
+                subsysInstance.manifest = self.manifest
                 #
                 # make the Source and Target path names for new instance
                 #
                 subsysInstance.makeSourcePathNames()
                 subsysInstance.makeTargetPathNames()
-                if not (self.moveIdlAda or self.removeIdlAdaDir or self.checkIdlAdaDir):
-                    subsysInstance.prepareTargetDirectory(subsysInstance.targetAdaSubsysPath)
+                if self.pool is None:
+                    Started_List.append((subsysInstance, None))
+                else:
+                    # the worker uses its own copy of the manifest
+                    subsysInstance.manifest = None
+                    Started_List.append((subsysInstance,
+                                         self.pool.apply_async(makeSubsysInWorker, (subsysInstance,))))
+        return Started_List
+
+    def finishSubsystems(self, startedList):
+        """Makes each subsystem that startSubsystems didn't start in the pool, or waits
+            for it, in order, and adds its counts to this instance's.
+        """
+        for (subsysInstance, Pool_Result) in startedList:
+            if Pool_Result is None:
                 #
                 # process the given Subsystem directory making the appropriate
                 #   files based on the command line options that the user chose.
                 #
-                subsysInstance.logName()
-                subsysInstance.processDir(subsysInstance.sourceViewPath, 
-                                          subsysInstance.targetAdaSubsysPath, 
-                                          subsysInstance.targetIdlSubsysPath)
-                #
-                # get the counts of the processed files and directories and other counts
-                #
-                (viewsProcessed, dirsProcessed, filesProcessed, targetCount,
-                    moveCount, statusCount, latestCount, duplicateCount) = \
-                                        subsysInstance.getProcessCounts()
-                # have the Subsystem instance log his counts
-                subsysInstance.logProcessCounts()
-                # update my instances counts
-                self.viewsProcessed = self.viewsProcessed + 1
-                self.dirsProcessed  = self.dirsProcessed + dirsProcessed
-                self.filesProcessed = self.filesProcessed + filesProcessed
-                self.targetCount    = self.targetCount + targetCount
-                self.moveCount      = self.moveCount + moveCount
-                self.statusCount    = self.statusCount + statusCount
-                self.latestCount    = self.latestCount + latestCount
-                self.duplicateCount = self.duplicateCount + duplicateCount
-    
+                subsysInstance.makeSubsys()
+            else:
+                (subsysInstance, Output, Manifest_Changes) = Pool_Result.get()
+                sys.stdout.write(Output)
+                subsysInstance.manifest = self.manifest
+                if Manifest_Changes is not None:
+                    self.manifest.mergeChanges(Manifest_Changes)
+                subsysInstance.makeDeferredLinks()
+            #
+            # get the counts of the processed files and directories and other counts
+            #
+            (viewsProcessed, dirsProcessed, filesProcessed, targetCount,
+                moveCount, statusCount, latestCount, duplicateCount) = \
+                                    subsysInstance.getProcessCounts()
+            # have the Subsystem instance log his counts
+            subsysInstance.logProcessCounts()
+            # update my instances counts
+            self.viewsProcessed = self.viewsProcessed + 1
+            self.dirsProcessed  = self.dirsProcessed + dirsProcessed
+            self.filesProcessed = self.filesProcessed + filesProcessed
+            self.targetCount    = self.targetCount + targetCount
+            self.unchangedCount = self.unchangedCount + subsysInstance.unchangedCount
+            self.moveCount      = self.moveCount + moveCount
+            self.statusCount    = self.statusCount + statusCount
+            self.latestCount    = self.latestCount + latestCount
+            self.duplicateCount = self.duplicateCount + duplicateCount
+
+def startSubsysPool(streeInstance):
+    """Starts a pool of streeInstance.maxProcesses worker processes to make subsystems in,
+        as streeInstance.pool, unless it has one or maxProcesses is 1.
+        Returns True if it started one, for stopSubsysPool.
+    """
+    if (streeInstance.pool is not None or streeInstance.maxProcesses <= 1 or
+        # the IDL_Ada work asks questions, and already runs its APEX commands concurrently:
+        streeInstance.moveIdlAda or streeInstance.removeIdlAdaDir or streeInstance.checkIdlAdaDir):
+        return False
+    # or each worker would print what is still buffered when it exits
+    sys.stdout.flush()
+    streeInstance.pool = multiprocessing.Pool(streeInstance.maxProcesses,
+                                              startSubsysWorker, (streeInstance.manifest,))
+    return True
+
+def stopSubsysPool(streeInstance):
+    """Stops the pool startSubsysPool started, and any subsystems still being made in it.
+    """
+    streeInstance.pool.terminate()
+    streeInstance.pool.join()
+    streeInstance.pool = None
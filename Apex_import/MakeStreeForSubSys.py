@@ -13,10 +13,14 @@ import os
 import shutil
 import string
 import sys
+import dir_walker
 from MakeStreeBaseClass import *
 from make_stree_utilities import *
 from IccsApexCommand import *
+from ApexCommandScheduler import ApexCommandScheduler
+from manifest import Manifest
 from optparse import OptionParser
+from StringIO import StringIO
 from subprocess import *
 
 class MakeStreeForSubSys(MakeStree):
@@ -28,7 +32,6 @@ class MakeStreeForSubSys(MakeStree):
             Also, the target file will be massaged to be a relative path
             back to the source file.
         """
-        self.prepareTargetFile(targetFilePath)
         Target_Path = os.path.normpath(targetFilePath)
         # Gnat Ada programs and some others don't know about drive letters, 
         # so must use relative symbolic links.
@@ -44,20 +47,32 @@ class MakeStreeForSubSys(MakeStree):
             Slash_Depth = Slash_Depth - 1
         Relative_Source_Path = os.path.normpath (Relative_Source_Path)
         self.debugPrint ("Relative source path is: " + Relative_Source_Path)
+        # A hard link changes with its source, a symbolic link only with its text:
+        if self.makeHardLink:
+            kind, manifestSourcePath = Manifest.HARDLINK, sourceFilePath
+        else:
+            kind, manifestSourcePath = Manifest.SYMLINK, Relative_Source_Path
+        if self.targetIsCurrent(Target_Path, manifestSourcePath, kind):
+            return
+        self.prepareTargetFile(Target_Path)
 
         # Windows explorer with CIFS sees symbolic link as file.
         if self.makeHardLink:
-            self.runOrLog ('os.link ("' + Relative_Source_Path + '", "' + Target_Path + '")')
+            self.doOrLog ("os.link", Relative_Source_Path, Target_Path)
         else:
-            self.runOrLog ('os.symlink ("' + Relative_Source_Path + '", "' + Target_Path + '")')
+            self.doOrLog ("os.symlink", Relative_Source_Path, Target_Path)
+        self.recordTarget(Target_Path, manifestSourcePath, kind)
         
         self.targetCount = self.targetCount + 1
 
     def performCopy(self, sourceFilePath, targetFilePath):
         """Perform the actual copying of the source file to the target file.
         """
+        if self.targetIsCurrent(targetFilePath, sourceFilePath, Manifest.COPY):
+            return
         self.prepareTargetFile(targetFilePath)
-        self.runOrLog('shutil.copy2 ("' + sourceFilePath + '", "' + targetFilePath + '")')
+        self.doOrLog("shutil.copy2", sourceFilePath, targetFilePath)
+        self.recordTarget(targetFilePath, sourceFilePath, Manifest.COPY)
         self.targetCount = self.targetCount + 1
 
     def makeTheFile(self, sourceFilePath, targetFilePath, alwaysLink=False):
@@ -224,7 +239,11 @@ class MakeStreeForSubSys(MakeStree):
             self.processAaaOsSpecificFile(sourceFilePath, targetFilePath, True)
         else:
             self.makeTheFile(sourceFilePath, targetFilePath)
-            self.makeTheFile(targetFilePath, targetFileIdlPath, True)
+            if self.deferredLinks is None:
+                self.makeTheFile(targetFilePath, targetFileIdlPath, True)
+            else:
+                # the links directory is shared by all the subsystems:
+                self.deferredLinks.append((targetFilePath, targetFileIdlPath))
 
     def removeIdlAdaDirectory(self, sourcePath, controlledFileList):
         """Process the removal of the IDL Ada directory 'IDL_Ada'.
@@ -242,7 +261,7 @@ class MakeStreeForSubSys(MakeStree):
             self.log("*****          This directory will NOT be removed!")
             self.log("*****")
         else:
-            self.runOrLog('shutil.rmtree ("' + sourcePath + '")')
+            self.doOrLog("shutil.rmtree", sourcePath)
                
     def listNotReadyToBeMovedFiles(self, sourcePath, controlledFileList):
         """Process the list of files that are NOT ready to be moved.
@@ -307,46 +326,50 @@ class MakeStreeForSubSys(MakeStree):
             sys.stdout.flush()
             os._exit(19)
 
+    def submitApexCommands(self, view, fileList, maxFilesPerCommand, apexFunction, *args):
+        """Submits apexFunction(files, *args) to the APEX command scheduler for each
+            group of at most maxFilesPerCommand files in the given list, in order,
+            all in the given view.
+            Returns the list of submitted jobs, for the scheduler's collect().
+        """
+        Job_List = []
+        for index in range(0, len(fileList), maxFilesPerCommand):
+            Job_List = Job_List + [self.apex_scheduler.submit(view, apexFunction,
+                                                              fileList[index:index + maxFilesPerCommand],
+                                                              *args)]
+        return Job_List
+
     def duplicateIdlAdaFiles(self, updatedFileList, nonExistingInfix, existingInfix, generalTargetDestination):
         """Duplicate the files, based on the given list of files, that are contained
             in a given set of <infix> duplicate directories to the general target directory.
             The general target directory is where the given files were moved.
             Now these moved files need to be duplicated in the 
+            Only submits the APEX commands.  Returns the list of submitted jobs,
+            for finishDuplicateIdlAdaFiles.
         """
         if (not iccs_apex.isValidInfixStream(self.towerName)):
-            return
+            return []
         if (len(updatedFileList) == 0):
-            return
+            return []
 
         New_Duplicate_List = self.apex_command.newDuplicateFiles(updatedFileList, 
                                                                  nonExistingInfix, existingInfix)
         New_Destination = self.apex_command.newDestinationStream(generalTargetDestination,
                                                                  existingInfix, nonExistingInfix)
-        Success_List = []
-        Failure_List = []
-        File_List = []
-        for Entry in New_Duplicate_List:
-            File_List = File_List + [Entry]
-            if (len(File_List) >= self.maxFilesPerApexUpdate):
-                Results_List = self.apex_command.duplicateFileListVersion(File_List, New_Destination)
-                File_List = []
-                Succeeded_List, Failed_List = self.processApexResultsList(apex.Update_Command,
-                                                                          Results_List)
-                Success_List = Success_List + Succeeded_List
-                Failure_List = Failure_List + Failed_List
-                
-        if (len(File_List) > 0):
-            Results_List = self.apex_command.duplicateFileListVersion(File_List, New_Destination)
-            File_List = []
-            Succeeded_List, Failed_List = self.processApexResultsList(apex.Update_Command,
-                                                                      Results_List)
-            Success_List = Success_List + Succeeded_List
-            Failure_List = Failure_List + Failed_List
+        return self.submitApexCommands(apex.viewOf(New_Destination), New_Duplicate_List,
+                                       self.maxFilesPerApexUpdate,
+                                       self.apex_command.duplicateFileListVersion, New_Destination)
+
+    def finishDuplicateIdlAdaFiles(self, duplicateJobList):
+        """Waits for the APEX commands submitted by duplicateIdlAdaFiles, and
+            processes their results.  Returns the list of files that failed to be
+            duplicated, for logFailuresAndAsk once no other commands are running.
+        """
+        Success_List, Failure_List = self.processApexResultsList(apex.Update_Command,
+                                                                 self.apex_scheduler.collect(duplicateJobList))
         
         self.duplicateCount = self.duplicateCount + len(Success_List)
-                        
-        if (len(Failure_List) > 0):
-            self.logFailuresAndAsk("duplicated", Failure_List)
+        return Failure_List
             
 
     def updateDuplicateIdlAdaFiles(self, controlledFileList, targetDirectory):
@@ -355,6 +378,8 @@ class MakeStreeForSubSys(MakeStree):
             has been moved, then the duplicate file will now have a 'Deleted' entry.
             Updating the duplicate file to its latest version will remove the duplicate
             file from the directory.
+            Each <infix> directory is a different view, so the views are updated 
+            (and then duplicated) at the same time.
         """
         if (not iccs_apex.isValidInfixStream(self.towerName)):
             return
@@ -365,6 +390,7 @@ class MakeStreeForSubSys(MakeStree):
         View_Type_List = []
         View_Type_List = View_Type_List + ["working"]
         View_Type_List = View_Type_List + ["release"]
+        Update_List = []
         for vtype in View_Type_List:
             for infixStream in iccs_apex.getInfixList():
                 if ((infixStream == My_Infix_Stream) and (vtype == "working")):
@@ -382,67 +408,54 @@ class MakeStreeForSubSys(MakeStree):
                 for fname in Duplicate_List:
                     self.debugPrint("    fname = " + fname)
             
-                Success_List = []
-                Failure_List = []
-                File_List = []
-                for Entry in Duplicate_List:
-                    File_List = File_List + [Entry]
-                    if (len(File_List) >= self.maxFilesPerApexUpdate):
-                        Results_List = self.apex_command.updateFileListToLatest(File_List)
-                        File_List = []
-                        Succeeded_List, Failed_List = self.processApexResultsList(apex.Update_Command, 
-                                                                                Results_List)
-                        Success_List = Success_List + Succeeded_List
-                        Failure_List = Failure_List + Failed_List
-            
-                if (len(File_List) > 0):
-                    Results_List = self.apex_command.updateFileListToLatest(File_List)
-                    File_List = []
-                    Succeeded_List, Failed_List = self.processApexResultsList(apex.Move_Object_Command, 
-                                                                                Results_List)
-                    Success_List = Success_List + Succeeded_List
-                    Failure_List = Failure_List + Failed_List
+                Job_List = self.submitApexCommands(apex.viewOf(Duplicate_List[0]), Duplicate_List,
+                                                   self.maxFilesPerApexUpdate,
+                                                   self.apex_command.updateFileListToLatest)
+                Update_List = Update_List + [(vtype, infixStream, Job_List)]
+        
+        # Each view's duplicates start as soon as its updates are done:
+        Duplicate_Job_Lists = []
+        Update_Failure_Lists = []
+        for (vtype, infixStream, Job_List) in Update_List:
+            Success_List, Failure_List = self.processApexResultsList(apex.Update_Command, 
+                                                                     self.apex_scheduler.collect(Job_List))
+            Update_Failure_Lists = Update_Failure_Lists + [Failure_List]
                 
-                if (len(Success_List) > 0):
-                    self.latestCount = self.latestCount + len(Success_List)
-                    if (vtype == "working"):
+            if (len(Success_List) > 0):
+                self.latestCount = self.latestCount + len(Success_List)
+                if (vtype == "working"):
+                    Duplicate_Job_Lists = Duplicate_Job_Lists + [
                         self.duplicateIdlAdaFiles(Success_List, infixStream, 
-                                                  My_Infix_Stream, targetDirectory)
-                    else:
-                        Release_Tower = self.apex_command.getReleaseVersion(self.towerName, infixStream)
+                                                  My_Infix_Stream, targetDirectory)]
+                else:
+                    Release_Tower = self.apex_command.getReleaseVersion(self.towerName, infixStream)
+                    Duplicate_Job_Lists = Duplicate_Job_Lists + [
                         self.duplicateIdlAdaFiles(Success_List, Release_Tower, 
-                                                  self.towerName, targetDirectory)
-                
-                if (len(Failure_List) > 0):
-                    self.logFailuresAndAsk("updated to their latest version", Failure_List)
+                                                  self.towerName, targetDirectory)]
+            else:
+                Duplicate_Job_Lists = Duplicate_Job_Lists + [[]]
+        
+        # Wait for every command before asking anything, so that no APEX command is
+        # running (and logging) during a prompt, or killed by a "n" answer:
+        Duplicate_Failure_Lists = []
+        for Job_List in Duplicate_Job_Lists:
+            Duplicate_Failure_Lists = Duplicate_Failure_Lists + [self.finishDuplicateIdlAdaFiles(Job_List)]
+        
+        for (Update_Failures, Duplicate_Failures) in zip(Update_Failure_Lists, Duplicate_Failure_Lists):
+            if (len(Update_Failures) > 0):
+                self.logFailuresAndAsk("updated to their latest version", Update_Failures)
+            if (len(Duplicate_Failures) > 0):
+                self.logFailuresAndAsk("duplicated", Duplicate_Failures)
 
     def moveIdlAdaFiles(self, controlledFileList, targetDirectory):
         """Move all of the files in the given list to the target directory.
         """
         
-        Succeeded_List = []
-        Failed_List    = []
-        Success_List = []
-        Failure_List = []
-        File_List    = []
-        for Entry in controlledFileList:
-            File_List = File_List + [Entry]
-            if (len(File_List) >= self.maxFilesPerApexMove):
-                Results_List = self.apex_command.moveFileListToDir(File_List, targetDirectory)
-                File_List = []
-                Succeeded_List, Failed_List = self.processApexResultsList(apex.Move_Object_Command, 
-                                                                          Results_List)
-                Success_List = Success_List + Succeeded_List
-                Failure_List = Failure_List + Failed_List
-        
-        # if the File List is not empty then you have files left over to be moved
-        if (len(File_List) > 0): 
-            Results_List = self.apex_command.moveFileListToDir(File_List, targetDirectory)
-            File_List = []
-            Succeeded_List, Failed_List = self.processApexResultsList(apex.Move_Object_Command, 
-                                                                      Results_List)
-            Success_List = Success_List + Succeeded_List
-            Failure_List = Failure_List + Failed_List
+        Job_List = self.submitApexCommands(apex.viewOf(targetDirectory), controlledFileList,
+                                           self.maxFilesPerApexMove,
+                                           self.apex_command.moveFileListToDir, targetDirectory)
+        Success_List, Failure_List = self.processApexResultsList(apex.Move_Object_Command, 
+                                                                 self.apex_scheduler.collect(Job_List))
 
         self.moveCount = self.moveCount + len(Success_List)
         self.updateDuplicateIdlAdaFiles(Success_List, targetDirectory)
@@ -463,12 +476,13 @@ class MakeStreeForSubSys(MakeStree):
         self.apex_command = IccsApexCommand(self.debugOn, self.effortOnly)
         Controlled_File_List = []
         Pipe_Tuple_List = []
-        Entries = os.listdir (sourcePath)
+        Entries = dir_walker.scan (sourcePath)
         File_List = []
-        for Entry in Entries:
-            Entry_Source = os.path.join(sourcePath, Entry)
-            if os.path.isdir(Entry_Source):
-                if os.path.islink (Entry_Source):
+        for Dir_Entry in Entries:
+            Entry = Dir_Entry.name
+            Entry_Source = Dir_Entry.path
+            if Dir_Entry.isDir():
+                if Dir_Entry.isLink():
                     continue # continue processing entries, don't follow a directory link
                 self.debugPrint("")
                 self.debugPrint(" Directory = " + Entry)
@@ -493,23 +507,9 @@ class MakeStreeForSubSys(MakeStree):
                 self.filesProcessed = self.filesProcessed + 1
                 self.statusCount    = self.statusCount + 1
                 File_List = File_List + [Entry_Source]
-                if (len(File_List) >= self.maxFilesPerApexStatus):
-                    if self.checkIdlAdaDir:
-                        Results_List = self.apex_command.isFileListReadyToMove(File_List)
-                    else:
-                        Results_List = self.apex_command.isFileListControlled(File_List)
-                    File_List = []
-                    for (fname, results) in Results_List:
-                        if self.checkIdlAdaDir:
-                            if results == False:
-                                # load the controlled files that are NOT ready to be moved!
-                                Controlled_File_List = Controlled_File_List + [fname]
-                        else:                   
-                            if results:
-                                # load the controlled files that are ready to be moved!
-                                Controlled_File_List = Controlled_File_List + [fname]
         
-        # if there are any files left over in the File_List that have not been processed
+        # Get the status of all the files at once.  The APEX command layer puts as
+        # many files on each 'show_status' command as the command line allows:
         if (len(File_List) > 0):
             if self.checkIdlAdaDir:
                 Results_List = self.apex_command.isFileListReadyToMove(File_List)
@@ -526,13 +526,34 @@ class MakeStreeForSubSys(MakeStree):
                         # load the controlled files that are ready to be moved!
                         Controlled_File_List = Controlled_File_List + [fname]
                 
-        if self.removeIdlAdaDir == True:
-            self.removeIdlAdaDirectory(sourcePath, Controlled_File_List)
-        if self.moveIdlAda == True:
-            Target_Dir = os.path.dirname(sourcePath)
-            self.moveIdlAdaFiles(Controlled_File_List, Target_Dir)    
-        if self.checkIdlAdaDir == True:
-            self.listNotReadyToBeMovedFiles(sourcePath, Controlled_File_List)        
+        self.apex_scheduler = ApexCommandScheduler(self.maxConcurrentApexCommands)
+        try:
+            if self.removeIdlAdaDir == True:
+                self.removeIdlAdaDirectory(sourcePath, Controlled_File_List)
+            if self.moveIdlAda == True:
+                Target_Dir = os.path.dirname(sourcePath)
+                self.moveIdlAdaFiles(Controlled_File_List, Target_Dir)    
+            if self.checkIdlAdaDir == True:
+                self.listNotReadyToBeMovedFiles(sourcePath, Controlled_File_List)        
+        finally:
+            self.apex_scheduler.stop()
+
+    def makeSubsys(self):
+        """Prepares the target directory of this subsystem and processes its tower directory,
+            as MakeStreeForLayer does for each of its subsystems.
+        """
+        if not (self.moveIdlAda or self.removeIdlAdaDir or self.checkIdlAdaDir):
+            self.prepareTargetDirectory(self.targetAdaSubsysPath)
+        self.logName()
+        self.processDir(self.sourceViewPath, self.targetAdaSubsysPath, self.targetIdlSubsysPath)
+
+    def makeDeferredLinks(self):
+        """Makes the links that processIdlFile deferred in a pool worker, in order.
+        """
+        Link_List = self.deferredLinks
+        self.deferredLinks = None
+        for (sourceFilePath, targetFilePath) in Link_List:
+            self.makeTheFile(sourceFilePath, targetFilePath, True)
 
     def processFile(self, sourcePath, targetAdaPath, targetIdlPath, filename):
         """Process the given file.  Calling the appropriate method to create
@@ -552,14 +573,13 @@ class MakeStreeForSubSys(MakeStree):
         self.debugPrint( "   sourcePath = " + sourcePath)
         self.debugPrint( "targetAdaPath = " + targetAdaPath)
         self.debugPrint( "targetIdlPath = " + targetIdlPath)
-        Entries = os.listdir (sourcePath)
-        for Skip_Dir in apex.Internal_Dirs:
-            if Skip_Dir in Entries:
-                Entries.remove (Skip_Dir)
-        for Entry in Entries:
-            Entry_Source = os.path.join(sourcePath, Entry)
-            if os.path.isdir(Entry_Source):
-                if os.path.islink (Entry_Source):
+        for Dir_Entry in dir_walker.scan (sourcePath):
+            Entry = Dir_Entry.name
+            if Entry in apex.Internal_Dirs:
+                continue
+            Entry_Source = Dir_Entry.path
+            if Dir_Entry.isDir():
+                if Dir_Entry.isLink():
                     continue # continue processing entries, don't follow a directory link
                 self.debugPrint("")
                 self.debugPrint(" Directory = " + Entry)
@@ -578,3 +598,39 @@ class MakeStreeForSubSys(MakeStree):
 #                else:
 #                    self.debugPrint("         this file is NOT an ADA file!")
     
+
+# The worker processes' copy of the manifest, if any:
+workerManifest = None
+
+def startSubsysWorker(manifest):
+    """Sets up a worker process of the pool MakeStreeForLayer makes subsystems in.
+    """
+    global workerManifest
+    workerManifest = manifest
+
+def makeSubsysInWorker(subsysInstance):
+    """Runs in a worker process.  Makes the given subsystem (see makeSubsys) and returns
+        the instance, with its counts and deferred links, its log and its manifest changes,
+        for the parent.
+    """
+    subsysInstance.manifest = workerManifest
+    subsysInstance.deferredLinks = []
+    Saved_Stdout = sys.stdout
+    Captured = StringIO()
+    sys.stdout = Captured
+    try:
+        subsysInstance.makeSubsys()
+    except:
+        # Print the log so far, or it is lost with the subsystem:
+        sys.stdout = Saved_Stdout
+        sys.stdout.write(Captured.getvalue())
+        sys.stdout.flush()
+        raise
+    sys.stdout = Saved_Stdout
+    Output = Captured.getvalue()
+    Manifest_Changes = None
+    if workerManifest is not None:
+        Manifest_Changes = workerManifest.takeChanges()
+    # the parent has its own:
+    subsysInstance.manifest = None
+    return (subsysInstance, Output, Manifest_Changes)
@@ -24,47 +24,71 @@ class MakeStreeForTower(MakeStree):
             to create the appropriate files.
         """
         self.logName()
-        for Layer in apex.NIF_Layers:
-            Layer_Path = os.path.join(sourcePath, Layer)
-            if os.path.isdir(Layer_Path):
-                layerInstance = MakeStreeForLayer(self.towerName, Layer, self.subsysName, Layer)
-                #
-                # setup the flags within the Layer instance based on the
-                #   flags setup for this Tower instance.
-                #
-                layerInstance.setInstanceVars((self.createApex, self.createGnat, self.createIdl,
-                                                self.makeSoftLink, self.makeHardLink, self.makeCopy,
-                                                self.moveIdlAda, self.removeIdlAdaDir, self.checkIdlAdaDir,
-                                                self.effortOnly, self.debugOn, self.underApexSession,
-                                                self.workspace))
-                #
-                # make the Source and Target path names for our given instance
-                #
-                layerInstance.makeSourcePathNames()
-                layerInstance.makeTargetPathNames()
-                if not (self.moveIdlAda or self.removeIdlAdaDir or self.checkIdlAdaDir):
-                    layerInstance.prepareTargetDirectory(layerInstance.targetAdaLayerPath)
-                #
-                # process the given Layer directory making the appropriate
-                #   files based on the command line options that the user chose.
-                #
-                layerInstance.processDir(layerInstance.sourceLayerPath, 
-                                          layerInstance.targetAdaLayerPath, 
-                                          layerInstance.targetIdlLayerPath)
-                #
-                # get the counts of the processed files and directories and other counts
-                #
-                (viewsProcessed, dirsProcessed, filesProcessed, targetCount,
-                    moveCount, statusCount, latestCount, duplicateCount) = \
-                                        layerInstance.getProcessCounts()
-                # have the Subsystem instance log his counts
-                layerInstance.logProcessCounts()
-                # update my instances counts
-                self.viewsProcessed = self.viewsProcessed + viewsProcessed
-                self.dirsProcessed  = self.dirsProcessed + dirsProcessed
-                self.filesProcessed = self.filesProcessed + filesProcessed
-                self.targetCount    = self.targetCount + targetCount
-                self.moveCount      = self.moveCount + moveCount
-                self.statusCount    = self.statusCount + statusCount
-                self.latestCount    = self.latestCount + latestCount
-                self.duplicateCount = self.duplicateCount + duplicateCount
+        Own_Pool = startSubsysPool(self)
+        try:
+            Started_Layer_List = []
+            for Layer in apex.NIF_Layers:
+                Layer_Path = os.path.join(sourcePath, Layer)
+                if os.path.isdir(Layer_Path):
+                    layerInstance = MakeStreeForLayer(self.towerName, Layer, self.subsysName, Layer)
+                    #
+                    # setup the flags within the Layer instance based on the
+                    #   flags setup for this Tower instance.
+                    #
+                    layerInstance.setInstanceVars((self.createApex, self.createGnat, self.createIdl,
+                                                    self.makeSoftLink, self.makeHardLink, self.makeCopy,
+                                                    self.moveIdlAda, self.removeIdlAdaDir, self.checkIdlAdaDir,
+                                                    self.effortOnly, self.debugOn, self.underApexSession,
+                                                    self.workspace))
+                    layerInstance.manifest = self.manifest
+                    layerInstance.maxProcesses = self.maxProcesses
+                    layerInstance.pool = self.pool
+                    #
+                    # make the Source and Target path names for our given instance
+                    #
+                    layerInstance.makeSourcePathNames()
+                    layerInstance.makeTargetPathNames()
+                    if not (self.moveIdlAda or self.removeIdlAdaDir or self.checkIdlAdaDir):
+                        layerInstance.prepareTargetDirectory(layerInstance.targetAdaLayerPath)
+                    Started_Layer_List.append((layerInstance,
+                                               layerInstance.startSubsystems(layerInstance.sourceLayerPath)))
+                    if self.pool is None:
+                        self.finishLayer(*Started_Layer_List.pop())
+            #
+            # with a pool, every subsystem in the tower has been started by now,
+            #   so that the pool doesn't wait for the last one in each layer.
+            #
+            for (layerInstance, Started_List) in Started_Layer_List:
+                self.finishLayer(layerInstance, Started_List)
+        finally:
+            if Own_Pool:
+                stopSubsysPool(self)
+
+    def finishLayer(self, layerInstance, startedList):
+        """Finishes the subsystems layerInstance.startSubsystems returned,
+            and adds the Layer instance's counts to this instance's.
+        """
+        layerInstance.logName()
+        #
+        # process the given Layer directory making the appropriate
+        #   files based on the command line options that the user chose.
+        #
+        layerInstance.finishSubsystems(startedList)
+        #
+        # get the counts of the processed files and directories and other counts
+        #
+        (viewsProcessed, dirsProcessed, filesProcessed, targetCount,
+            moveCount, statusCount, latestCount, duplicateCount) = \
+                                layerInstance.getProcessCounts()
+        # have the Subsystem instance log his counts
+        layerInstance.logProcessCounts()
+        # update my instances counts
+        self.viewsProcessed = self.viewsProcessed + viewsProcessed
+        self.dirsProcessed  = self.dirsProcessed + dirsProcessed
+        self.filesProcessed = self.filesProcessed + filesProcessed
+        self.targetCount    = self.targetCount + targetCount
+        self.unchangedCount = self.unchangedCount + layerInstance.unchangedCount
+        self.moveCount      = self.moveCount + moveCount
+        self.statusCount    = self.statusCount + statusCount
+        self.latestCount    = self.latestCount + latestCount
+        self.duplicateCount = self.duplicateCount + duplicateCount
@@ -7,6 +7,8 @@ __version__   = "$Revision: 1.4 $"
 __date__      = "$Date: 08/07/2008 07:49:57 $"
 __copyright__ = "Copyright 2008 LLNL"
 
+import os
+
 Ada_Suffix = ".ada"
 Body_Suffix = ".2.ada"
 IDL_Ada_Dir = "IDL_Ada"
@@ -18,6 +20,7 @@ Internal_Dirs = (
     "Exports")
 Spec_Suffix = ".1.ada"
 Subsystem_Suffix = ".ss"
+View_Suffixes = (".wrk", ".rel")
 
 Full_Command_Path = "/nif/rational/releases/apex.4.2.0b/bin/apexinit"
 Command                   = "apex"
@@ -48,3 +51,14 @@ NIF_Layers = (
         "Main_Programs",
         "Support",
         "Research")
+
+def viewOf(path):
+    """Returns the view path contains: path up to its first directory with a view
+        suffix (e.g. /nif/code/Support/Utilities.ss/vx.ada.7.2.0.wrk), or the
+        directory path is in if it is not in a view.
+    """
+    Parts = path.split("/")
+    for index in range(len(Parts)):
+        if Parts[index].endswith(View_Suffixes):
+            return "/".join(Parts[:index + 1])
+    return os.path.dirname(path)
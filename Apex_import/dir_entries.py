@@ -3,11 +3,15 @@ Basically, those classes just add copy behavior to file_filters.py.
 class Utils supplies all the path name modification operations to the directory etc. 
 classes copy operations.
 """
+from collections import OrderedDict
 import file_filters
+from manifest import Manifest
 import os
+import Queue
 import re
 import shutil
 from stats import stats
+import threading
 import support.runner
 from support.string_utils import su
 from support.local_logging import Logger, LineLogger, FunctionLogger
@@ -29,10 +33,53 @@ class Utils (object):
 	"""
 	NEW_NIF_CODE = "/src/code"
 	NEW_NIF_IDL = "/src/idl"
+	PLATFORMS = (
+		"ppc-vxworks",
+		"sparc-solaris",
+		"x86-linux",
+		"x86-windows")
+	# How many constructTargetPath results to remember:
+	TARGET_PATH_CACHE_SIZE = 10000
+	
+	_NIF_IN_WORKSPACE = re.compile("^/nif/(code|environment|rational|tools)")
+	_SS_AT_END = re.compile(r"\.ss$")
+	_SS_IN_PATH = re.compile(r"\.ss/")
+	_VIEW_IN_PATH = re.compile("/" + file_filters.View.PATTERN)
 	
 	skipClean = False
+	# A manifest.Manifest, during an incremental Directory.copy:
+	manifest = None
+	# The targetRoot the rewrites below were compiled for:
+	_rewritesRoot = None
+	
 	def setTargetRoot (self, targetRoot):
 		self.targetRoot = targetRoot
+		self._compileRewrites ()
+	
+	def _compileRewrites (self):
+		"""Builds the targetRoot-dependent strings and regexes the rewrites use, and 
+		empties the constructTargetPath cache, whose results depend on targetRoot.
+		"""
+		root = self.targetRoot
+		self._codeRoot = root + "/code"
+		self._srcCodeRoot = root + self.NEW_NIF_CODE
+		self._platformRewrites = [("/AAA_os_specific/" + platform, 
+									self._srcCodeRoot + "/Target/" + platform)
+								for platform in self.PLATFORMS]
+		srcRoot = "(?P<srcRoot>" + re.escape(root) + "/src)"
+		notTargetPlatform = r"(?!/Target/[^/]+)"
+		layer = r"(?P<layer>/[^/]+)"
+		subsystem = r"(?P<subsystem>/[^/]+(\.ss)?)"
+		subdirs1 = r"(?P<subdirs1>(/.*)*)"
+		subdirs2 = r"(?P<subdirs2>($)|(/.*))"
+		self._idlTree = re.compile(
+					srcRoot + "(/code)" + notTargetPlatform + layer + subsystem + subdirs1 + "(/IDL)" + subdirs2)
+		self._shadowTree = re.compile(
+					r"(?P<root>" + re.escape(root) + r")" + self.NEW_NIF_CODE + 
+					r"/Slices/Shadow_Deployment(\.ss)?" + r"(?P<subdirs>($)|(/.*))")
+		self._shadowRoot = self._srcCodeRoot + "/Slices/Shadow_Deployment"
+		self._targetPathCache = OrderedDict()
+		self._rewritesRoot = root
 	
 	def constructTargetPath(self, targetPath):
 		"""Modify targetPath as needed.
@@ -41,7 +88,25 @@ class Utils (object):
 		(e.g. /etc/hosts) must be treated differently that those that would be (e.g. 
 		/nif/code/Framework_Templates/System_Manager.ss/accurev.7.2.0.rel).
 		Successive processing of the same target will not wipe out any previous changes.
+		
+		The most recent results are cached, since the same paths come up again and again: 
+		adjustLinkTarget rewrites a link's directory for every link in it, so siblings 
+		share one rewrite of their directory.
 		"""
+		if self._rewritesRoot != self.targetRoot:
+			# targetRoot was assigned directly:
+			self._compileRewrites ()
+		cache = self._targetPathCache
+		result = cache.pop (targetPath, None)
+		if result is None:
+			result = self._rewriteTargetPath (targetPath)
+			if len(cache) >= self.TARGET_PATH_CACHE_SIZE:
+				cache.popitem (last=False)
+		# (Re)inserted last, as the most recently used:
+		cache [targetPath] = result
+		return result
+	
+	def _rewriteTargetPath (self, targetPath):
 		localTargetPath = targetPath
 		localTargetPath = self._changeNifToTargetRoot(localTargetPath)
 		localTargetPath = self._changeCodeToSrcCode(localTargetPath)
@@ -63,8 +128,8 @@ class Utils (object):
 		/nif/rational
 		/nif/tools
 		"""
-		if re.compile("^/nif/(code|environment|rational|tools).*").match(targetPath):
-			return re.sub("^/nif",  self.targetRoot, targetPath, 1)
+		if self._NIF_IN_WORKSPACE.match(targetPath):
+			return self.targetRoot + targetPath [len("/nif"):]
 		else:
 			return targetPath
 			
@@ -74,7 +139,10 @@ class Utils (object):
 		to 
 		<workspace><NEW_NIF_CODE>
 		"""
-		return re.sub("^" + self.targetRoot + "/code",  self.targetRoot + self.NEW_NIF_CODE, targetPath, 1)
+		if targetPath.startswith (self._codeRoot):
+			return self._srcCodeRoot + targetPath [len(self._codeRoot):]
+		else:
+			return targetPath
 			
 	def _extractTargetTree (self, targetPath):
 		"""change  
@@ -83,31 +151,27 @@ class Utils (object):
 		<workspace><NEW_NIF_CODE>/Target/<platform>/.../...
 		"""
 		result =self._changeCodeToSrcCode(targetPath)
-		for platform in (
-			    "ppc-vxworks",
-			    "sparc-solaris",
-			    "x86-linux",
-			    "x86-windows"):
-			AAASegment = "/AAA_os_specific/" + platform
+		if result.find("/AAA_os_specific/") == -1:
+			return result
+		for AAASegment, newSrcRoot in self._platformRewrites:
 			if result.find(AAASegment) > -1:
 				# _debug('FOUND (AAASegment = "' + AAASegment + '")')
-				newSrcRoot = self.targetRoot + self.NEW_NIF_CODE + "/Target/" + platform
-				result = result.replace(AAASegment, "").replace(self.targetRoot + self.NEW_NIF_CODE, newSrcRoot)
+				result = result.replace(AAASegment, "").replace(self._srcCodeRoot, newSrcRoot)
 				#_debug('(targetPath = "' + targetPath + '", result = "' + result + '")')
 		return result
 	
 	def _trimSS (self, targetPath):
 		"""Change .../<subsystem>.ss/... to .../<subsystem>/...
 		"""
-		result = re.sub(r"\.ss$", "", targetPath, 1)
-		result = re.sub(r"\.ss/", "/", result, 1)
+		result = self._SS_AT_END.sub("", targetPath, 1)
+		result = self._SS_IN_PATH.sub("/", result, 1)
 		return result
 
 	def _trimView (self, targetPath):
 		"""Change .../<view> to ...
 		TODO: leave /nif/rational/base/ada views in.  We have multiple source views from the same subsystem.
 		"""
-		return re.sub("/" + file_filters.View.PATTERN, "", targetPath, 1)
+		return self._VIEW_IN_PATH.sub("", targetPath, 1)
 
 	def _extractIDLTree (self, targetPath):
 		"""change  
@@ -121,14 +185,9 @@ class Utils (object):
 		but not for <workspace>/src/Target/ppc-vxworks/Support/IDL
 		but not for <workspace>/src/code/Support/IDL
 		"""
-		srcRoot = "(?P<srcRoot>" + self.targetRoot + "/src)"
-		notTargetPlatform = r"(?!/Target/[^/]+)"
-		layer = r"(?P<layer>/[^/]+)"
-		subsystem = r"(?P<subsystem>/[^/]+(\.ss)?)"
-		subdirs1 = r"(?P<subdirs1>(/.*)*)"
-		subdirs2 = r"(?P<subdirs2>($)|(/.*))"
-		result = re.sub(
-					pattern = srcRoot + "(/code)" + notTargetPlatform + layer + subsystem + subdirs1 + "(/IDL)" + subdirs2, 
+		if targetPath.find("/IDL") == -1:
+			return targetPath
+		result = self._idlTree.sub(
 					repl = r"\g<srcRoot>/idl\g<layer>\g<subsystem>\g<subdirs1>\g<subdirs2>", 
 					string = targetPath)
 		#_debug('(targetPath = "' + targetPath + '", result = "' + result + '")')
@@ -140,10 +199,9 @@ class Utils (object):
 		to 
 		<workspace>/foo...
 		"""
-		root = r"(?P<root>" + self.targetRoot + r")"
-		subdirs = r"(?P<subdirs>($)|(/.*))"
-		result = re.sub(
-					pattern = root + self.NEW_NIF_CODE + r"/Slices/Shadow_Deployment(\.ss)?" + subdirs, 
+		if targetPath.find(self._shadowRoot) == -1:
+			return targetPath
+		result = self._shadowTree.sub(
 					repl = r"\g<root>/product\g<subdirs>", 
 					string = targetPath)
 		return result
@@ -152,12 +210,32 @@ class Utils (object):
 		"""Prepares to link or copy a file.  Deletes the target, 
 		and creates any needed target directories.
 		"""
-		if not self.__class__.skipClean and os.path.exists (targetPath):
-			runner.runOrLog ('os.remove ("' + targetPath + '")', globals(), locals())
+		# Let any copy to the same target (or to a link in its path) finish first, as it 
+		# would have before the copy pool:
+		_copyPool.waitFor (targetPath)
+		# lexists, so that a dangling link left by an incremental run is replaced too:
+		if not self.__class__.skipClean and os.path.lexists (targetPath):
+			runner.removeOrLog (targetPath)
 			stats.increment("filesDeletedFirst")
 		targetParentPath = os.path.dirname(targetPath)
 		if not os.path.exists (targetParentPath):
-			runner.runOrLog ('os.makedirs ("' + targetParentPath + '")', globals(), locals())
+			runner.makedirsOrLog (targetParentPath)
+			
+	def targetIsCurrent (self, targetPath, sourcePath, kind):
+		"""Returns True during an incremental copy if targetPath was made from sourcePath 
+		last time, and sourcePath hasn't changed since.
+		"""
+		if self.manifest is None:
+			return False
+		_copyPool.waitFor (targetPath)
+		if self.manifest.isCurrent (targetPath, sourcePath, kind):
+			stats.increment("filesUnchanged")
+			return True
+		return False
+		
+	def recordTarget (self, targetPath, sourcePath, kind):
+		if self.manifest is not None:
+			self.manifest.record (targetPath, sourcePath, kind)
 			
 	def join (self, dir, entry):
 		"""Returns "<dir>/<entry>" unless entry is "".  Then, returns "<dir>" 
@@ -379,6 +457,15 @@ class Utils (object):
 											self.targetRoot + "/product/foo")
 		assertEq (self.constructTargetPath (self.targetRoot + self.NEW_NIF_CODE + "/Slices/Shadow_Deployment/foo"), 
 											self.targetRoot + "/product/foo")
+
+		# Cached, and the cache is emptied when the target root changes:
+		assertEq (self.constructTargetPath ("/nif/code/Support.ss"), self.targetRoot + self.NEW_NIF_CODE + "/Support")
+		assert "/nif/code/Support.ss" in self._targetPathCache
+		oldTargetRoot = self.targetRoot
+		self.setTargetRoot ("/tmp/bar")
+		assertEq (self.constructTargetPath ("/nif/code/Support.ss"), "/tmp/bar" + self.NEW_NIF_CODE + "/Support")
+		self.setTargetRoot (oldTargetRoot)
+		assertEq (self.constructTargetPath ("/nif/code/Support.ss"), self.targetRoot + self.NEW_NIF_CODE + "/Support")
 		
 
 		# Test paths within the same workspace:
@@ -431,6 +518,124 @@ class Utils (object):
 						
 _utils = Utils()
 
+class _CopyPool (object):
+	"""Runs the file copies and symlinks from Directory.copy on a bounded pool of
+	worker threads, while Directory.copy goes on walking and filtering.  Everything 
+	else (filtering, deleting, creating directories, stats) stays on the walking 
+	thread, in the same order as before, so only the copies themselves overlap.
+	
+	Usage:
+	
+		_copyPool.start()
+		try:
+			... _copyPool.submit (targetPath, "copy", sourcePath, targetPath) ...
+		finally:
+			_copyPool.stop()
+	
+	Outside start/stop, or with a worker count of 0, submit just does the operation.
+	"""
+	def __init__(self):
+		self._workerCount = 8
+		self._jobs = None
+		self._threads = []
+		# Targets of submitted operations that haven't finished, and how many operations each:
+		self._pending = dict()
+		self._condition = threading.Condition()
+		
+	def setWorkerCount (self, workerCount):
+		assert not self.isRunning()
+		self._workerCount = workerCount
+		
+	def isRunning (self):
+		return self._jobs is not None
+	
+	def start (self):
+		if self._workerCount > 0:
+			# Bounded, so the walk doesn't get too far ahead of the copies:
+			self._jobs = Queue.Queue(maxsize = 4 * self._workerCount)
+			for index in range (self._workerCount):
+				thread = threading.Thread(target = self._work, name = "copy" + str(index))
+				thread.setDaemon(True)
+				thread.start()
+				self._threads.append(thread)
+				
+	def stop (self):
+		"""Waits for all the submitted operations to finish, and stops the workers.
+		"""
+		if self.isRunning():
+			for thread in self._threads:
+				self._jobs.put(None)
+			for thread in self._threads:
+				thread.join()
+			self._jobs = None
+			self._threads = []
+			
+	def submit (self, targetPath, operation, *args):
+		"""Does operation (a runner.doOrLog operation that creates targetPath) on args, 
+		on a worker.
+		"""
+		if self.isRunning():
+			self._condition.acquire()
+			try:
+				self._pending[targetPath] = self._pending.get(targetPath, 0) + 1
+			finally:
+				self._condition.release()
+			self._jobs.put((targetPath, operation, args))
+		else:
+			runner.doOrLog (operation, *args)
+			
+	def waitFor (self, path):
+		"""Waits until no submitted operation is creating path or any of its parents.
+		"""
+		if self.isRunning():
+			self._condition.acquire()
+			try:
+				while self._isPending(path):
+					self._condition.wait()
+			finally:
+				self._condition.release()
+				
+	def drain (self):
+		"""Waits until all the submitted operations have finished.
+		"""
+		if self.isRunning():
+			self._condition.acquire()
+			try:
+				while self._pending:
+					self._condition.wait()
+			finally:
+				self._condition.release()
+				
+	def _isPending (self, path):
+		while True:
+			if self._pending.has_key(path):
+				return True
+			parent = os.path.dirname(path)
+			if parent == path:
+				return False
+			path = parent
+			
+	def _work (self):
+		while True:
+			job = self._jobs.get()
+			if job is None:
+				break
+			targetPath, operation, args = job
+			try:
+				# doOrLog logs and continues on failure, just as when running serially:
+				runner.doOrLog (operation, *args)
+			finally:
+				self._condition.acquire()
+				try:
+					self._pending[targetPath] -= 1
+					if self._pending[targetPath] == 0:
+						del self._pending[targetPath]
+					self._condition.notifyAll()
+				finally:
+					self._condition.release()
+	
+_copyPool = _CopyPool()
+
 class File (file_filters.File):
 	def copy (self, sourcePath, targetPath, fileFilters):
 		"""Copies sourcePath to targetPath.  Replaces old targetPath.  
@@ -439,8 +644,11 @@ class File (file_filters.File):
 		If the source file is a link, copies the file it is pointing at.
 		See class Link.
 		"""
+		if _utils.targetIsCurrent (targetPath, sourcePath, Manifest.COPY):
+			return
 		_utils.prepareTargetLocation (targetPath)
-		runner.runOrLog ('shutil.copy2 ("' + sourcePath + '", "' + targetPath + '")', globals(), locals())
+		_copyPool.submit (targetPath, "copy", sourcePath, targetPath)
+		_utils.recordTarget (targetPath, sourcePath, Manifest.COPY)
 		stats.increment("filesCopied")
 		
 file = File()
@@ -448,13 +656,49 @@ file = File()
 class Directory (file_filters.Directory):
 	# Keep state between calls:
 	_skipDirs = ()
+	_incremental = False
+	_useHash = False
 	
 	def setSkipDirs(self, skipDirs):
 		self.__class__._skipDirs = skipDirs
 		
+	def setIncremental(self, incremental, useHash=False):
+		"""Keeps the target trees from the last copy instead of removing them, and only 
+		copies the files and links whose sources changed since (by size and mtime, and if 
+		useHash, by contents).  Removes the targets whose sources are gone at the end.
+		The manifest of what was copied is kept in the target root.  
+		"""
+		self.__class__._incremental = incremental
+		self.__class__._useHash = useHash
+		
+	def setCopyWorkers(self, workerCount):
+		"""Sets how many files and links are copied at once.  0 copies them one at a time, 
+		on the walking thread.
+		"""
+		_copyPool.setWorkerCount(workerCount)
+		
 	def copy (self, sourcePath, targetPath, fileFilters):
-		""" Copy all the entries in a directory, recursively.
+		""" Copy all the entries in a directory, recursively.  The outermost call 
+		runs the copy pool, and returns once all the copies are done.  On an 
+		incremental copy, it also removes the stale targets afterwards.
 		"""		
+		if _copyPool.isRunning():
+			self._copy (sourcePath, targetPath, fileFilters)
+		else:
+			if self._incremental:
+				_utils.manifest = Manifest (_utils.targetRoot + "/" + Manifest.FILE_NAME, self._useHash)
+			try:
+				_copyPool.start()
+				try:
+					self._copy (sourcePath, targetPath, fileFilters)
+				finally:
+					_copyPool.stop()
+				if _utils.manifest is not None:
+					self._removeStaleTargets ()
+			finally:
+				_utils.manifest = None
+			
+	def _copy (self, sourcePath, targetPath, fileFilters):
 		_debug(str(self.__class__) + '(sourcePath = "' + sourcePath + '", targetPath = "' + targetPath + '")')
 		if sourcePath in self._skipDirs:
 			_log('SKIPPING "' + sourcePath + '" per command line option')
@@ -478,9 +722,29 @@ class Directory (file_filters.Directory):
 	def _removeTargetTree (self, targetPath):
 		_debug('(targetPath = "' + targetPath + '")')
     	# TODO: fix to handle read-only permission error
+		# Don't delete anything out from under the copies in progress:
+		_copyPool.drain()
+		if _utils.manifest is not None:
+			_utils.manifest.addScope (targetPath)
+			if not _utils.manifest.isNew():
+				# Keep the tree; _removeStaleTargets removes what isn't copied again:
+				return
 		if  os.path.exists (targetPath):
-			runner.runOrLog ('shutil.rmtree ("' + targetPath + '")', globals(), locals())
+			runner.rmtreeOrLog (targetPath)
 			stats.addDeletedDir (targetPath)			
+			
+	def _removeStaleTargets (self):
+		"""Removes the targets the last copy made that this one didn't, and saves the
+		manifest for the next one.  Leaves any directories they empty.
+		"""
+		with runner.batch() as batch:
+			for targetPath in _utils.manifest.staleTargets():
+				if os.path.lexists (targetPath):
+					batch.remove (targetPath)
+					stats.increment("staleTargetsDeleted")
+				_utils.manifest.forget (targetPath)
+		if not runner.isEffortOnly():
+			_utils.manifest.save()
 				
 directory = Directory()
 		
@@ -522,8 +786,11 @@ class Link (file_filters.Link):
 		"""Create a link in the new location with the same relative target as the link in the old location.
 		"""
 		relativeLinkTarget = _utils.adjustLinkTarget(os.path.dirname(sourcePath), sourceLinkTarget)
+		if _utils.targetIsCurrent (targetPath, relativeLinkTarget, Manifest.SYMLINK):
+			return
 		_utils.prepareTargetLocation (targetPath)
-		runner.runOrLog ('os.symlink ("' + relativeLinkTarget + '", "' + targetPath + '")', globals(), locals())
+		_copyPool.submit (targetPath, "symlink", relativeLinkTarget, targetPath)
+		_utils.recordTarget (targetPath, relativeLinkTarget, Manifest.SYMLINK)
 
 def _createDirEntryFromFilterEntry(entry, explicitlyIncluded=False):
 	# Checks using __class__= instead of isinstance to avoid finding membership in parent classes
@@ -565,6 +832,7 @@ class _Test ():
 	def run (self):
 		self.utils.test()
 		self.testDirEntryClasses()
+		self.testCopyPool()
 		
 	def finish (self):
 		self.log("END test (no errors)")
@@ -585,6 +853,24 @@ class _Test ():
 		assert createDirEntry("/nif/environment/setup.ss").__class__ ==  Subsystem
 		assert createDirEntry("/nif/environment/setup.ss/latest.wrk").__class__ ==  View
 		
+	def testCopyPool (self):
+		import tempfile
+		root = tempfile.mkdtemp()
+		try:
+			source = os.path.join (root, "source")
+			open(source, "w").close()
+			_copyPool.start()
+			try:
+				for index in range (20):
+					_copyPool.submit (source + str(index), "copy", source, source + str(index))
+				_copyPool.waitFor (source + "0")
+				assert os.path.exists (source + "0")
+			finally:
+				_copyPool.stop()
+			assert len(os.listdir(root)) == 21
+		finally:
+			shutil.rmtree(root)
+		
 if __name__ == '__main__':
 	test=_Test()
 	test.setup()	
@@ -0,0 +1,161 @@
+"""Lists directories for the Apex_import walkers, statting each entry at most once.
+
+Walking a tree with os.listdir and then os.path.isdir, islink, exists, etc. on each
+entry costs a stat per question per entry, and on NFS each one is a round trip.  An
+Entry answers all of those questions from one lstat (and, for a link, one stat of
+what it points at), made the first time it is needed.  Where os.scandir (Python 3.5+)
+or the scandir package is available, the entries come from it, and most questions
+are answered from the directory listing itself, without any stat.
+
+Usage:
+
+	for entry in dir_walker.scan (dirPath):
+		if entry.isDir() and not entry.isLink():
+			...recurse into entry.path...
+"""
+import os
+import stat
+
+try:
+	_scandir = os.scandir
+except AttributeError:
+	try:
+		from scandir import scandir as _scandir
+	except ImportError:
+		_scandir = None
+
+_NOT_YET = object()
+
+class Entry (object):
+	"""A directory entry.  Answers like the os.path function of the same name
+	(e.g. isDir like os.path.isdir), but stats at most once, and not at all if the
+	directory listing already said.
+	"""
+	__slots__ = ("path", "name", "_scandirEntry", "_lstat", "_stat", "_realpath")
+	
+	def __init__(self, path, scandirEntry=None):
+		self.path = path
+		self.name = os.path.basename(path)
+		self._scandirEntry = scandirEntry
+		self._lstat = _NOT_YET
+		self._stat = _NOT_YET
+		self._realpath = None
+
+	def lstat (self):
+		"""Returns the entry's own os.lstat result, or None if it doesn't exist.
+		"""
+		if self._lstat is _NOT_YET:
+			try:
+				if self._scandirEntry is not None:
+					self._lstat = self._scandirEntry.stat(follow_symlinks=False)
+				else:
+					self._lstat = os.lstat(self.path)
+			except OSError:
+				self._lstat = None
+		return self._lstat
+
+	def stat (self):
+		"""Returns the os.stat result of the entry, or of what it points at if it is a
+		link, or None if either doesn't exist.
+		"""
+		if self._stat is _NOT_YET:
+			if not self.isLink():
+				self._stat = self.lstat()
+			else:
+				try:
+					self._stat = os.stat(self.path)
+				except OSError:
+					self._stat = None
+		return self._stat
+
+	def isLink (self):
+		if self._scandirEntry is not None:
+			return self._scandirEntry.is_symlink()
+		lstatResult = self.lstat()
+		return lstatResult is not None and stat.S_ISLNK(lstatResult.st_mode)
+
+	def isDir (self):
+		if self._scandirEntry is not None:
+			return self._scandirEntry.is_dir()
+		return self._statModeIs (stat.S_ISDIR)
+
+	def isFile (self):
+		if self._scandirEntry is not None:
+			return self._scandirEntry.is_file()
+		return self._statModeIs (stat.S_ISREG)
+
+	def exists (self):
+		return self.stat() is not None
+
+	def realpath (self):
+		if self._realpath is None:
+			self._realpath = os.path.realpath(self.path)
+		return self._realpath
+
+	def _statModeIs (self, isMode):
+		statResult = self.stat()
+		return statResult is not None and isMode(statResult.st_mode)
+
+def scan (dirPath):
+	"""Returns an Entry for each entry in dirPath, in no particular order.
+	"""
+	if _scandir is not None:
+		return [Entry(os.path.join(dirPath, scandirEntry.name), scandirEntry)
+				for scandirEntry in _scandir(dirPath)]
+	else:
+		return [Entry(os.path.join(dirPath, name)) for name in os.listdir(dirPath)]
+
+def entriesByName (dirPath):
+	"""Returns a dictionary of the Entries in dirPath, by name.
+	"""
+	result = dict()
+	for entry in scan(dirPath):
+		result[entry.name] = entry
+	return result
+
+def entryFor (path):
+	"""Returns an Entry for path, which need not exist.
+	"""
+	return Entry(path)
+
+class _Test ():
+	def setup (self):
+		import tempfile
+		print "BEGIN test"
+		self.root = tempfile.mkdtemp()
+		os.mkdir (os.path.join (self.root, "dir"))
+		open (os.path.join (self.root, "file"), "w").close()
+		os.symlink ("dir", os.path.join (self.root, "dirLink"))
+		os.symlink ("nowhere", os.path.join (self.root, "danglingLink"))
+
+	def run (self):
+		global _scandir
+		for withScandir in (True, False):
+			savedScandir = _scandir
+			if not withScandir:
+				_scandir = None
+			try:
+				entries = entriesByName (self.root)
+			finally:
+				_scandir = savedScandir
+			assert sorted (entries.keys()) == ["danglingLink", "dir", "dirLink", "file"]
+			for name, entry in entries.items():
+				path = os.path.join (self.root, name)
+				assert entry.path == path
+				assert entry.isDir() == os.path.isdir(path), name
+				assert entry.isFile() == os.path.isfile(path), name
+				assert entry.isLink() == os.path.islink(path), name
+				assert entry.exists() == os.path.exists(path), name
+				assert entry.realpath() == os.path.realpath(path), name
+		assert not entryFor (os.path.join (self.root, "missing")).exists()
+
+	def finish (self):
+		import shutil
+		shutil.rmtree (self.root)
+		print "END test (no errors)"
+
+if __name__ == '__main__':
+	test = _Test()
+	test.setup()
+	test.run()
+	test.finish()
@@ -1,6 +1,7 @@
 """Specifies the files, directories, etc. to be explicitly included and 
 excluded when importing into AccuRev. 
 """
+import dir_walker
 import os
 import re
 from support.local_logging import Logger, LineLogger, FunctionLogger
@@ -28,10 +29,19 @@ class NonExcludedEntry (DirEntryBase):
 	"""
 	def __init__(self, explicitlyIncluded=True):
 		self.explicitlyIncluded = explicitlyIncluded
+		
+	def isA(self, path):
+		return self.isEntry(dir_walker.entryFor(path))
+	
+	def isEntry(self, entry):
+		"""Like isA, but for a dir_walker.Entry, which stats at most once however 
+		many of these are asked.
+		"""
+		raise NotImplementedError
 
 class File (NonExcludedEntry):
-	def isA(self, path):
-		return os.path.isfile(path)
+	def isEntry(self, entry):
+		return entry.isFile()
 _file=File()
 
 class Directory (NonExcludedEntry):
@@ -39,26 +49,34 @@ class Directory (NonExcludedEntry):
 		NonExcludedEntry.__init__(self, explicitlyIncluded)
 		self.removeTargetTreeFirst=removeTargetTreeFirst
 		
-	def isA(self, path):
-		return os.path.isdir(path)
+	def isEntry(self, entry):
+		return entry.isDir()
 	
-	def isDirMatchesPattern (self,  path, pattern):
+	def isDirMatchesPattern (self,  entry, pattern):
 		return (
-			# Self is a subclass of Directory.  Prevent infinite recursion by calling Directory.IsA directly:
-			Directory.isA(self, path) and 
-			re.compile("^.*" + pattern + "$").match(path) > -1)
+			# Self is a subclass of Directory.  Prevent infinite recursion by calling Directory.isEntry directly:
+			Directory.isEntry(self, entry) and 
+			_compiledDirPattern(pattern).match(entry.path) is not None)
 _directory = Directory()
+
+_dirPatterns = dict()
+def _compiledDirPattern (pattern):
+	"""Returns the compiled re for a Directory subclass PATTERN, compiling it only once.
+	"""
+	if not _dirPatterns.has_key(pattern):
+		_dirPatterns[pattern] = re.compile("^.*" + pattern + "$")
+	return _dirPatterns[pattern]
 			
 class Subsystem (Directory):
 	PATTERN=r"[^/]*\.ss"
-	def isA(self, path):
-		return self.isDirMatchesPattern (path, self.PATTERN)
+	def isEntry(self, entry):
+		return self.isDirMatchesPattern (entry, self.PATTERN)
 _subsystem= Subsystem()
 			
 class View (Directory):
 	PATTERN=r"[^/]*(\.wrk|\.rel)"
-	def isA(self, path):
-		return self.isDirMatchesPattern (path, self.PATTERN)
+	def isEntry(self, entry):
+		return self.isDirMatchesPattern (entry, self.PATTERN)
 _view=View()
 			
 class Link (NonExcludedEntry):
@@ -71,8 +89,8 @@ class Link (NonExcludedEntry):
 		self.target = target
 		self.copyTarget = copyTarget
 		
-	def isA(self, path):
-		return os.path.islink(path)
+	def isEntry(self, entry):
+		return entry.isLink()
 _link=Link(_file)
 
 class FileFilters():
@@ -93,6 +111,7 @@ class FileFilters():
 	def __init__(self):
 		_debug ('')
 		self.__class__._filters = dict()
+		self.__class__._index = None
 		
 	def addFilter (self, filterName, filterEntries):
 		"""Adds a filter to the class wide state.  
@@ -101,40 +120,116 @@ class FileFilters():
 		-- Each key is a  file name or an re pattern.
 		-- Each value is a DirEntryBase object.
 		An re pattern is a string starting with "^" or ending with "$".
+		Filters can't be added once the filters are frozen.
 		"""
 		_debug ('"' + filterName + '"')
+		assert self.__class__._index is None, "can't add filter '" + filterName + "' after freeze()"
 		assert not self.__class__._filters.has_key(filterName)
 		self.__class__._filters [filterName]=filterEntries
 		
+	def freeze (self):
+		"""Builds the FilterIndex for the filters added so far (see index).  Call
+		this once all the filters have been added, e.g. at the end of 
+		iccs_file_filters.initFileFilters.
+		"""
+		self.__class__._index = FilterIndex(self.__class__._filters)
+		
+	def index (self):
+		"""Returns the FilterIndex, freezing the filters first if need be.
+		"""
+		if self.__class__._index is None:
+			self.freeze()
+		return self.__class__._index
+		
 	def getFilter (self, filterName):
 		return self.__class__._filters[filterName]
 
 	def explicitFilterNames (self):
-		return self._explicitsOrPatternsOf(self.__class__._filters.keys(), returnPatterns=False)
+		return list(self.index().explicitFilterNames)
 		
 	def patternFilterNames (self):
-		return self._explicitsOrPatternsOf(self.__class__._filters.keys(), returnPatterns=True)
+		return list(self.index().patternFilterNames)
 	
 	def explicitEntriesOf(self, filterName):
-		return self._explicitsOrPatternsOf(self.__class__._filters[filterName].keys(), returnPatterns=False)
+		return list(self.index().filter(filterName).explicitNames)
 		
 	def patternEntriesOf(self, filterName):
-		return self._explicitsOrPatternsOf(self.__class__._filters[filterName].keys(), returnPatterns=True)
+		return list(self.index().filter(filterName).patternNames)
 		
-	def _explicitsOrPatternsOf (self, entries, returnPatterns):
-		names = []
-		for entry in entries:
-			if self._isPattern(entry) == returnPatterns:
-				names.append(entry)
-		# Sorting helps debugging:
-		names.sort()
-		return names		
+def _explicitsOrPatternsOf (entries, returnPatterns):
+	names = []
+	for entry in entries:
+		if _isPattern(entry) == returnPatterns:
+			names.append(entry)
+	# Sorting helps debugging:
+	names.sort()
+	return names		
 		
-	def _isPattern (self, aString):
-		if len (aString) == 0:
-			return False
-		else: 
-			return  (aString[0] == "^" or aString[-1] == "$")
+def _isPattern (aString):
+	if len (aString) == 0:
+		return False
+	else: 
+		return  (aString[0] == "^" or aString[-1] == "$")
+
+class CompiledFilter (object):
+	"""One filter's entries, precompiled.  The explicit names are in a set, and the
+	patterns are compiled, individually and as one alternation that rejects 
+	entries matching none of them in a single match.  (So entry patterns can't
+	use numbered group references.)
+	"""
+	def __init__(self, filterName, filterEntries):
+		self.filterName = filterName
+		self.entries = filterEntries
+		self.explicitNames = _explicitsOrPatternsOf(filterEntries.keys(), returnPatterns=False)
+		self.explicitNameSet = frozenset(self.explicitNames)
+		self.patternNames = _explicitsOrPatternsOf(filterEntries.keys(), returnPatterns=True)
+		self.patterns = [(pattern, re.compile(pattern)) for pattern in self.patternNames]
+		if self.patterns:
+			self.anyPattern = re.compile("|".join(["(?:" + pattern + ")" for pattern in self.patternNames]))
+		else:
+			self.anyPattern = None
+		
+	def matchingPatterns (self, dirEntry):
+		"""Returns the first two patterns (in sorted order) that match dirEntry, or fewer
+		if fewer match.  More than one is an error, which the caller reports.
+		"""
+		if self.anyPattern is None or self.anyPattern.match(dirEntry) is None:
+			return []
+		matches = []
+		for pattern, compiled in self.patterns:
+			if compiled.match(dirEntry):
+				matches.append(pattern)
+				if len(matches) == 2:
+					break
+		return matches
+
+class FilterIndex (object):
+	"""All the filters, precompiled once so that filtering a directory costs a dict
+	lookup for the explicit filter name, one match per pattern filter name, and 
+	about one match per directory entry.
+	"""
+	def __init__(self, filters):
+		self.filters = dict()
+		for filterName, filterEntries in filters.items():
+			self.filters[filterName] = CompiledFilter(filterName, filterEntries)
+		self.explicitFilterNames = _explicitsOrPatternsOf(filters.keys(), returnPatterns=False)
+		self.patternFilterNames = _explicitsOrPatternsOf(filters.keys(), returnPatterns=True)
+		self.patternFilters = [(filterName, re.compile(filterName)) for filterName in self.patternFilterNames]
+		
+	def filter (self, filterName):
+		return self.filters[filterName]
+		
+	def filtersFor (self, localSourceDir):
+		"""Returns the CompiledFilters that apply to localSourceDir: the explicitly named
+		one, if any, first, then the pattern named ones that match, in sorted order.
+		"""
+		result = []
+		if self.filters.has_key(localSourceDir) and not _isPattern(localSourceDir):
+			result.append(self.filters[localSourceDir])
+		for filterName, compiled in self.patternFilters:
+			if compiled.match(localSourceDir):
+				result.append(self.filters[filterName])
+		return result
 	
 SUBSYSTEM_PATTERN=Subsystem.PATTERN
 VIEW_PATTERN=View.PATTERN
@@ -143,32 +238,35 @@ NIF_CODE_LAYER_PATTERN="/nif/code/[^/]*"
 NIF_CODE_LAYER_SS_PATTERN=NIF_CODE_LAYER_PATTERN + "/" + SUBSYSTEM_PATTERN
 					
 
-def _makeClassOrLink(path, theClass, explicitlyIncluded):
+def _makeClassOrLink(entry, theClass, explicitlyIncluded):
 	"""	If an entry is a link, it is also whatever it's pointing at.
 	"""
-	if _link.isA(path):
-		targetPath = os.path.realpath(path)
-		if path == targetPath:
-			raise Exception, "Factory can't find target for recursive link '" + path + "'"
+	if _link.isEntry(entry):
+		targetPath = entry.realpath()
+		if entry.path == targetPath:
+			raise Exception, "Factory can't find target for recursive link '" + entry.path + "'"
 		else:
 			target = theClass(explicitlyIncluded=explicitlyIncluded)
 			return Link(target, explicitlyIncluded=explicitlyIncluded)
 	else:
 		return theClass(explicitlyIncluded=explicitlyIncluded)
 
-def createFilterEntry(path, explicitlyIncluded=False):
-	"""Returns a subclass of DirEntryBase that matches path.
+def createFilterEntry(path, explicitlyIncluded=False, entry=None):
+	"""Returns a subclass of DirEntryBase that matches path.  If entry is given, it is 
+	path's dir_walker.Entry, and no more stats are needed than it has already made.
 	"""
-	if os.path.exists(path):
-		if _view.isA(path):
-			return _makeClassOrLink (path, View, explicitlyIncluded)
-		elif _subsystem.isA(path):
-			return _makeClassOrLink (path, Subsystem, explicitlyIncluded)
+	if entry is None:
+		entry = dir_walker.entryFor(path)
+	if entry.exists():
+		if _view.isEntry(entry):
+			return _makeClassOrLink (entry, View, explicitlyIncluded)
+		elif _subsystem.isEntry(entry):
+			return _makeClassOrLink (entry, Subsystem, explicitlyIncluded)
 		# Check for dir after subsys and view since it is their superclass:
-		elif _directory.isA(path):
-			return _makeClassOrLink (path, Directory, explicitlyIncluded)
-		elif _file.isA(path):
-			return _makeClassOrLink (path, File, explicitlyIncluded)
+		elif _directory.isEntry(entry):
+			return _makeClassOrLink (entry, Directory, explicitlyIncluded)
+		elif _file.isEntry(entry):
+			return _makeClassOrLink (entry, File, explicitlyIncluded)
 		else:
 			raise Exception, "Factory doesn't know how to create entry for path '" + path + "' (not a view, subsystem, directory, or file)"
 	else:
@@ -196,59 +294,52 @@ class DirEntryFiltering (object):
 		# 	These instance attribute assignments are for carrying parameters to and from function calls. 
 		self.localSourceDir = os.path.normpath(sourceDir)
 		self.fileFilters = fileFilters
-		self.dirEntrySet = set(os.listdir (self.localSourceDir))
+		# One dir_walker.Entry per entry, so each is statted at most once, however many
+		# filters and kinds it is checked against:
+		self.dirEntries = dir_walker.entriesByName (self.localSourceDir)
+		self.dirEntrySet = set(self.dirEntries)
 		self.nonExcludedEntries = dict()
 		self.entryMatchedEntryPattern = dict()
 		# Explicitly-named filters take precedence over pattern-named filters, so they come first:
-		self._applyExplicitlyNamedFilters()
-		self._applyPatternNamedFilters()
+		for compiledFilter in fileFilters.index().filtersFor(self.localSourceDir):
+			self._getIncludedEntries(compiledFilter)
 		self._addNotFoundEntries()
 		return self.nonExcludedEntries
 	
-	def _applyExplicitlyNamedFilters (self):
-		for filterName in self.fileFilters.explicitFilterNames():
-			if self.localSourceDir == filterName:
-				self._getIncludedEntries(filterName)
-				
-	def _applyPatternNamedFilters (self):
-		for filterName in self.fileFilters.patternFilterNames():
-			if re.compile(filterName).match(self.localSourceDir):
-				self._getIncludedEntries(filterName)
-				
 	def _addNotFoundEntries (self):
 		for dirEntry in self.dirEntrySet:
-			self.nonExcludedEntries [dirEntry] = createFilterEntry (os.path.join(self.localSourceDir, dirEntry),
-														explicitlyIncluded = False)
+			self.nonExcludedEntries [dirEntry] = createFilterEntry (self.dirEntries[dirEntry].path,
+														explicitlyIncluded = False,
+														entry = self.dirEntries[dirEntry])
 
-	def _getIncludedEntries (self, filterName):
+	def _getIncludedEntries (self, compiledFilter):
 		"""Constructs self.nonExcludedEntries from the entries in self.dirEntrySet that should be 
-		included according to filterName.  Deletes each found Entry from self.dirEntrySet.
+		included according to compiledFilter.  Deletes each found Entry from self.dirEntrySet.
 		"""		
-		explicitFilterEntries = self.fileFilters.explicitEntriesOf(filterName)
 		for dirEntry in sortedKeysOf(self.dirEntrySet):
 			# Explicits take precedence over patterns:
-			if dirEntry in explicitFilterEntries:
-				self._handleFoundDirEntry (dirEntry, filterName, dirEntry)
+			if dirEntry in compiledFilter.explicitNameSet:
+				self._handleFoundDirEntry (dirEntry, compiledFilter, dirEntry)
 			else:
-				self._checkIfDirMatchesPattern (dirEntry, filterName)
+				self._checkIfDirMatchesPattern (dirEntry, compiledFilter)
 				
-	def _checkIfDirMatchesPattern (self, dirEntry, filterName):				
-		for pattern in self.fileFilters.patternEntriesOf(filterName):
-			if re.compile(pattern).match(dirEntry):
-				if self.entryMatchedEntryPattern.has_key(dirEntry):
-					raise Exception ("Multiple rules found for dirEntry '" + dirEntry + "'" +
-									" prev: '" +  self.entryMatchedEntryPattern[dirEntry] + "', current: '" + pattern + "'")
-				else:
-					self._handleFoundDirEntry (dirEntry, filterName, pattern)
-					self.entryMatchedEntryPattern[dirEntry] = pattern
+	def _checkIfDirMatchesPattern (self, dirEntry, compiledFilter):
+		for pattern in compiledFilter.matchingPatterns(dirEntry):
+			if self.entryMatchedEntryPattern.has_key(dirEntry):
+				raise Exception ("Multiple rules found for dirEntry '" + dirEntry + "'" +
+								" prev: '" +  self.entryMatchedEntryPattern[dirEntry] + "', current: '" + pattern + "'")
+			else:
+				self._handleFoundDirEntry (dirEntry, compiledFilter, pattern)
+				self.entryMatchedEntryPattern[dirEntry] = pattern
 						
-	def _handleFoundDirEntry (self,  dirEntry, filterName, filterEntryName):
-		filterEntry=self.fileFilters.getFilter (filterName)[filterEntryName]
+	def _handleFoundDirEntry (self,  dirEntry, compiledFilter, filterEntryName):
+		filterName = compiledFilter.filterName
+		filterEntry = compiledFilter.entries[filterEntryName]
 		if  isinstance(filterEntry , Exclude):
 			action = "EXCLUDED"
 		else:
 			action = "included"
-			if filterEntry.isA (os.path.join(self.localSourceDir, dirEntry)):
+			if filterEntry.isEntry (self.dirEntries[dirEntry]):
 				self.nonExcludedEntries [dirEntry] = filterEntry
 			else:
 				action = "EXCLUDED (dir entry kind mismatch)"
@@ -270,6 +361,7 @@ class _Test ():
 		
 	def run (self):
 		self.testConstructors ()
+		self.testIndex ()
 		self.testCreateFilterEntry ()
 
 	def finish (self):
@@ -294,6 +386,24 @@ class _Test ():
 		subsystemLink = Link(target = Subsystem(), explicitlyIncluded = True)
 		viewLink = Link(target = View(), explicitlyIncluded = True)
 		
+	def testIndex (self):
+		import shutil, tempfile
+		root = tempfile.mkdtemp()
+		try:
+			for name in ("a.ss", "b.idl", "c.ada", "d~"):
+				open(os.path.join(root, name), "w").close()
+			fileFilters = FileFilters()
+			fileFilters.addFilter (root, {"a.ss" : File(), "^.*~$" : Exclude()})
+			fileFilters.addFilter ("^.*$", {"^.*[.]ada$" : Exclude(), "^.*[.]idl$" : File()})
+			fileFilters.freeze()
+			assert fileFilters.explicitFilterNames() == [root]
+			assert fileFilters.patternEntriesOf("^.*$") == ["^.*[.]ada$", "^.*[.]idl$"]
+			entries = DirEntryFiltering().allNonExcludedEntriesIn(root, fileFilters)
+			assert sortedKeysOf(entries) == ["a.ss", "b.idl"]
+			assert entries["a.ss"].explicitlyIncluded and entries["b.idl"].explicitlyIncluded
+		finally:
+			shutil.rmtree(root)
+		
 	def testCreateFilterEntry(self):
 		assert createFilterEntry("/nif").__class__ == Directory
 		assert createFilterEntry("/nif/.cvspass").__class__ == File
@@ -509,6 +509,9 @@ def initFileFilters (tower):
 										nothingBut ("readme") : Exclude(),
 										nothingBut ("makefile") : Exclude(),
 										})
+	
+	# No more filters; precompile them:
+	fileFilters.freeze()
 			 
 class _Test ():
 	def __init__(self):
@@ -5,7 +5,11 @@ Given a view name, makes a shadow code tree in the form:
 
 /nif/code/shadow/[view]/[layer]/[subsystem]/[subdirs]/[hard links to Ada files]
 
-Deletes /nif/code/shadow/[view] first if it exists.
+Deletes /nif/code/shadow/[view] first if it exists.  With --incremental, keeps
+it instead, remakes only the targets whose sources changed since the last run,
+and deletes only the targets whose sources are gone (see manifest.py).
+With --jobs, makes that many subsystems at the same time, each in its own
+process, and prints each one's log as a whole, in the usual order.
 There is no view name after the subsystem name.
 The subsystem name is witout the ".ss".
 Each link points to the corresponding Ada file.  Two hard links are created for
@@ -38,11 +42,16 @@ __date__ = "$Date: 05/05/2008 11:23:35 $"
 __copyright__ = "Copyright 2006 LLNL"
 
 import array
+import dir_walker
+import multiprocessing
 from optparse import OptionParser
 import os
 import shutil
+import StringIO
 import sys
 
+from manifest import Manifest
+
 Apex_Ada_Suffix = ".ada"
 Apex_Body_Suffix = ".2.ada"
 Apex_Current_View = "sun4_solaris2.ada95.4.2.0.rel"
@@ -87,10 +96,18 @@ Subsystem_Suffix = ".ss"
 Target_IDL_Root_Path = ""
 Target_IDL_Links_Path = ""
 
+The_Manifest = None
+
 Views_Processed = 0
 Files_Processed = 0
 Files_Copied_Or_Linked = 0
 Target_Count = 0
+Targets_Unchanged = 0
+Stale_Targets_Deleted = 0
+
+# In a worker process, the links into the shared Target_IDL_Links_Path, as
+# (Source_Path, Target_Path), for the parent to make in subsystem order:
+Deferred_Links = None
 
 #################################################################################
 # BEGIN Procedures designed to be called by Process_View_Dirs
@@ -108,22 +125,66 @@ def Run_Or_Log (Command):
     if not options.Effort_Only:
         exec Command
 
-def Print_Source_And_Target_Dirs (Source_Path, Target_Path):
+def Target_Is_Current (Target_Path, Source_Path, Kind):
+    """Returns True if this is an incremental run and Target_Path was made from 
+    Source_Path last time, which hasn't changed since.
+    """
+    global Targets_Unchanged
+    if The_Manifest is not None and The_Manifest.isCurrent (Target_Path, Source_Path, Kind):
+        Debug_Print ("Unchanged: " + Target_Path)
+        Targets_Unchanged = Targets_Unchanged + 1
+        return True
+    return False
+
+def Record_Target (Target_Path, Source_Path, Kind):
+    if The_Manifest is not None:
+        The_Manifest.record (Target_Path, Source_Path, Kind)
+
+def Delete_Old_Tree (Path):
+    """Deletes the tree at Path before it is remade.  On an incremental run, just
+    notes that the targets in it the run doesn't remake are to be deleted.
+    """
+    if The_Manifest is not None:
+        The_Manifest.addScope (Path)
+        if not The_Manifest.isNew():
+            return False
+    if os.path.exists (Path):
+        Run_Or_Log ('shutil.rmtree ("' + Path + '")')
+        return True
+    return False
+
+def Delete_Stale_Targets ():
+    """Deletes the targets the last run made that this one didn't, and saves the 
+    manifest for the next run.
+    """
+    global Stale_Targets_Deleted
+    for Target_Path in The_Manifest.staleTargets():
+        if os.path.lexists (Target_Path):
+            Run_Or_Log ('os.remove ("' + Target_Path + '")')
+            Stale_Targets_Deleted = Stale_Targets_Deleted + 1
+        The_Manifest.forget (Target_Path)
+    if not options.Effort_Only:
+        The_Manifest.save()
+
+def Print_Source_And_Target_Dirs (Source_Path, Target_Path, Entries=None):
     print Source_Path
     print Target_Path
 
-def Print_Ada_Files_In_Source_Dir (Source_Path, Target_Path):
+def Print_Ada_Files_In_Source_Dir (Source_Path, Target_Path, Entries=None):
     """Prints the Ada files in View_Path.  Target_Path is unused.
     """
     Debug_Print ("Print_Ada_Files_In_Source_Dir (" + Source_Path + ", " + Target_Path + ")")
-    for Entry in os.listdir (Source_Path):
+    if Entries is None:
+        Entries = dir_walker.scan (Source_Path)
+    for Dir_Entry in Entries:
+        Entry = Dir_Entry.name
     	# Hopefully there are no directories ending in .ada:
         if Entry [-4:] == Apex_Ada_Suffix:
             print os.path.join (Source_Path, Entry)                
                
-def Make_Target_Dir (Source_Path, Target_Path):
+def Make_Target_Dir (Source_Path, Target_Path, Entries=None):
     """Creates directory Target_Path and any non-existent parent directories.
-    Source_Path is unused.
+    Source_Path and Entries are unused.
     """
     Debug_Print ("Make_Target_Dir (" + Source_Path + ", " + Target_Path + ")")
     if os.path.exists (Target_Path):
@@ -136,7 +197,7 @@ def Prepare_Target_Location (Target_Path):
     and creates any needed target directories.
     """
     Target_Parent_Path = os.path.dirname(Target_Path)
-    if os.path.exists (Target_Path):
+    if os.path.lexists (Target_Path):
         Run_Or_Log ('os.remove ("' + Target_Path + '")')
     if not os.path.exists (Target_Parent_Path):
         Run_Or_Log ('os.makedirs ("' + Target_Parent_Path + '")')    
@@ -146,7 +207,6 @@ def Link_A_File (Source_Path, Target_Path):
     Replaces old Target_Path.  Never copies.
     """
     global Target_Count
-    Prepare_Target_Location (Target_Path)
     Target_Path = os.path.normpath (Target_Path)
     Target_Parent_Path = os.path.dirname(Target_Path)
     # Gnat Ada programs and some others don't know about drive letters, 
@@ -161,7 +221,15 @@ def Link_A_File (Source_Path, Target_Path):
         Slash_Depth = Slash_Depth - 1
     Relative_Source_Path = os.path.normpath (Relative_Source_Path)
     Debug_Print ("Relative source path is: " + Relative_Source_Path)
-    if os.path.exists (Target_Path):
+    # A hard link changes with its source, a symbolic link only with its text:
+    if options.Make_Hard_Links:
+        Kind, Manifest_Source_Path = Manifest.HARDLINK, Source_Path
+    else:
+        Kind, Manifest_Source_Path = Manifest.SYMLINK, Relative_Source_Path
+    if Target_Is_Current (Target_Path, Manifest_Source_Path, Kind):
+        return
+    # lexists, so that a dangling symbolic link is replaced too:
+    if os.path.lexists (Target_Path):
         Run_Or_Log ('os.remove ("' + Target_Path + '")')
     if not os.path.exists (Target_Parent_Path):
         Run_Or_Log ('os.makedirs ("' + Target_Parent_Path + '")')    
@@ -171,6 +239,7 @@ def Link_A_File (Source_Path, Target_Path):
         Run_Or_Log ('os.link ("' + Relative_Source_Path + '", "' + Target_Path + '")')
     else:
         Run_Or_Log ('os.symlink ("' + Relative_Source_Path + '", "' + Target_Path + '")')
+    Record_Target (Target_Path, Manifest_Source_Path, Kind)
     Target_Count = Target_Count + 1
                      
 def Copy_Or_Link_A_File (Source_Path, Target_Path):
@@ -179,8 +248,11 @@ def Copy_Or_Link_A_File (Source_Path, Target_Path):
     """
     global Target_Count
     if options.Copy_Files:
+        if Target_Is_Current (Target_Path, Source_Path, Manifest.COPY):
+            return
         Prepare_Target_Location (Target_Path)
         Run_Or_Log ('shutil.copy2 ("' + Source_Path + '", "' + Target_Path + '")')
+        Record_Target (Target_Path, Source_Path, Manifest.COPY)
         Target_Count = Target_Count + 1
     else:
         Link_A_File (Source_Path, Target_Path)
@@ -226,7 +298,7 @@ def Is_Ada_File (File_Name):
     else:
         return False
                       
-def Link_Ada_Files (Source_Path, Target_Path):
+def Link_Ada_Files (Source_Path, Target_Path, Entries=None):
     """Creates Target_Path and any non-existent parent directories, then
     creates a link to each Ada file in Source_Path from Target_Path.
     May make Gnat, Apex, or both format links.  
@@ -237,11 +309,14 @@ def Link_Ada_Files (Source_Path, Target_Path):
     Log ("Link_Ada_Files (" + Source_Path + ", " + Target_Path + ")")
     Debug_Print ("Link_Ada_Files (" + Source_Path + ", " + Target_Path + ")")
     
-    for Entry in os.listdir (Source_Path):
+    if Entries is None:
+        Entries = dir_walker.scan (Source_Path)
+    for Dir_Entry in Entries:
+        Entry = Dir_Entry.name
         Debug_Print ("Processing '" + Entry + "' - Entry [-4:] is '" + Entry [-4:] + "'")
-        Source_Entry_Path = os.path.join (Source_Path, Entry)
+        Source_Entry_Path = Dir_Entry.path
         # Don't process any directories:
-        if not os.path.isdir(Source_Entry_Path):
+        if not Dir_Entry.isDir():
             if Is_Ada_File (Entry):
                 if options.Make_Both_Format_Targets or options.Make_Gnat_Format_Targets:
                     Shadow_Entry_Path = os.path.join (Target_Path, Apex_To_Gnat(Entry))
@@ -252,7 +327,7 @@ def Link_Ada_Files (Source_Path, Target_Path):
                 Files_Copied_Or_Linked = Files_Copied_Or_Linked + 1 
             Files_Processed = Files_Processed + 1 
                     
-def Link_IDL_Files (Source_Path, Target_Path):
+def Link_IDL_Files (Source_Path, Target_Path, Entries=None):
     """Creates Target_Path and any non-existent parent directories, then
     creates a link to each IDL file in Source_Path from Target_Path.
     """
@@ -260,15 +335,21 @@ def Link_IDL_Files (Source_Path, Target_Path):
     global Files_Processed
     Debug_Print ("Link_IDL_Files (" + Source_Path + ", " + Target_Path + ")")
     
-    for Entry in os.listdir (Source_Path):
+    if Entries is None:
+        Entries = dir_walker.scan (Source_Path)
+    for Dir_Entry in Entries:
+        Entry = Dir_Entry.name
         Debug_Print ("Processing '" + Entry + "' - Entry [-4:] is '" + Entry [-4:] + "'")
-        Source_Entry_Path = os.path.join (Source_Path, Entry)
+        Source_Entry_Path = Dir_Entry.path
         # Don't process any directories:
-        if not os.path.isdir(Source_Entry_Path):
+        if not Dir_Entry.isDir():
             if Entry [-4:] == IDL_Suffix:
                 Shadow_Entry_Path = os.path.join (Target_Path, Entry)
                 Copy_Or_Link_A_File (Source_Entry_Path, Shadow_Entry_Path)
-                Link_A_File (Shadow_Entry_Path, Target_IDL_Links_Path + "/" + Entry)
+                if Deferred_Links is None:
+                    Link_A_File (Shadow_Entry_Path, Target_IDL_Links_Path + "/" + Entry)
+                else:
+                    Deferred_Links.append ((Shadow_Entry_Path, Target_IDL_Links_Path + "/" + Entry))
                 Files_Copied_Or_Linked = Files_Copied_Or_Linked + 1
             Files_Processed = Files_Processed + 1 
             
@@ -276,48 +357,51 @@ def Link_IDL_Files (Source_Path, Target_Path):
 # END Procedures designed to be called by Process_View_Dirs
 #################################################################################
 
-def Process_View_Dirs (View_Path, Shadow_Path, The_Process):
+def Process_View_Dirs (View_Path, Shadow_Path, The_Process, View_Is_Link=None):
     global Apex_Internal_Dirs
     """Recursively processes the directories starting at View_Path, leaving out the internal 
     Rational dirs.  Sends each along with its corresponding shadow directory to The_Process.
     """
     Debug_Print ("Process_View_Dirs (" + View_Path + ", " + Shadow_Path + ")")
-    # Actual processing: 
-    The_Process (View_Path, Shadow_Path)
     # Don't recurse through any links:
-    if os.path.islink (View_Path):
+    if View_Is_Link is None:
+        View_Is_Link = os.path.islink (View_Path)
+    if View_Is_Link:
+        # Actual processing: 
+        The_Process (View_Path, Shadow_Path)
         return
-    Entries = os.listdir (View_Path)
-    # This is only needed for the first (view) level directory, 
-    # but it won't hurt to do it every time:
-    # Skip the Rational internal directories:
-    for Skip_Dir in Apex_Internal_Dirs:
-        if Skip_Dir in Entries:
-            Entries.remove (Skip_Dir)
-    for Entry in Entries:
-        Entry_Path = os.path.join (View_Path, Entry)
-        if os.path.isdir (Entry_Path):
+    # Listed and statted once, for both The_Process and the recursion:
+    Entries = dir_walker.scan (View_Path)
+    # Actual processing: 
+    The_Process (View_Path, Shadow_Path, Entries)
+    for Dir_Entry in Entries:
+        # This is only needed for the first (view) level directory, 
+        # but it won't hurt to do it every time:
+        # Skip the Rational internal directories:
+        if Dir_Entry.name in Apex_Internal_Dirs:
+            continue
+        if Dir_Entry.isDir():
             #
             # Recurse:
             #
-            Process_View_Dirs (Entry_Path, os.path.join (Shadow_Path, Entry), The_Process)
+            Process_View_Dirs (Dir_Entry.path, os.path.join (Shadow_Path, Dir_Entry.name), The_Process,
+                               Dir_Entry.isLink())
                        
 def Get_Subsystems_At (Root_Path):
     """Returns a list of the subsystem dirs at Root_Path.
     """
     Debug_Print ("Get_Subsystems_At (" + Root_Path + ")")
     Result = []
-    for Entry in os.listdir (Root_Path):
-        Path = os.path.join (Root_Path, Entry)
-        if os.path.isdir (Path) and  Path [-3:] == Subsystem_Suffix:
-            Result = Result + [Entry]
+    for Dir_Entry in dir_walker.scan (Root_Path):
+        # Name first, so only possible subsystems are statted:
+        if Dir_Entry.name [-3:] == Subsystem_Suffix and Dir_Entry.isDir():
+            Result = Result + [Dir_Entry.name]
     return Result
                        
-def Process_Subsystems (View, The_Process, Layer_Path, Target_Layer_Path, Subsystems):
-    """Process View in Subsystems at Layer_Path with The_Process
+def Get_Views_To_Process (View, Layer_Path, Target_Layer_Path, Subsystems):
+    """Returns (View_Path, Shadow_Path) for each of Subsystems at Layer_Path that has View.
     """
-    global Views_Processed
-    Debug_Print ("Process_Subsystems (" + View + ", " + `The_Process` + ", " + Layer_Path + ", " + Target_Layer_Path + ", " + `Subsystems` + ")")
+    Result = []
     for Subsystem in Subsystems:
         Subsystem_Path = os.path.join (Layer_Path, Subsystem)
         View_Path = os.path.join (Subsystem_Path, View)
@@ -327,28 +411,126 @@ def Process_Subsystems (View, The_Process, Layer_Path, Target_Layer_Path, Subsys
         # Debug_Print ("Process_Subsystems: Shadow_Path => " + Shadow_Path)
         # If this is an existing view, process it:
         if os.path.isdir (View_Path):
-            Process_View_Dirs (View_Path, Shadow_Path, The_Process)
-            Views_Processed = Views_Processed + 1           
+            Result = Result + [(View_Path, Shadow_Path)]
+    return Result
+
+def Process_Subsystems (View, The_Process, Layer_Path, Target_Layer_Path, Subsystems):
+    """Process View in Subsystems at Layer_Path with The_Process
+    """
+    global Views_Processed
+    Debug_Print ("Process_Subsystems (" + View + ", " + `The_Process` + ", " + Layer_Path + ", " + Target_Layer_Path + ", " + `Subsystems` + ")")
+    for (View_Path, Shadow_Path) in Get_Views_To_Process (View, Layer_Path, Target_Layer_Path, Subsystems):
+        Process_View_Dirs (View_Path, Shadow_Path, The_Process)
+        Views_Processed = Views_Processed + 1
+
+def Start_Worker (Worker_Options, Worker_Log_Prefix, Worker_IDL_Links_Path, Worker_Manifest):
+    """Sets up a worker process for Process_Views_In_Pool.  The settings are passed,
+    not inherited, so that this also works where processes aren't forked.
+    """
+    global options, Log_Prefix, Target_IDL_Links_Path, The_Manifest
+    options = Worker_Options
+    Log_Prefix = Worker_Log_Prefix
+    Target_IDL_Links_Path = Worker_IDL_Links_Path
+    The_Manifest = Worker_Manifest
+
+def Process_View_In_Worker (Work):
+    """Runs in a worker process.  Processes one view, as Process_Subsystems does,
+    and returns its log, counts, deferred links and manifest changes, for the parent.
+    """
+    global Files_Processed, Files_Copied_Or_Linked, Target_Count, Targets_Unchanged
+    global Deferred_Links
+    (View_Path, Shadow_Path, The_Process) = Work
+    Files_Processed = 0
+    Files_Copied_Or_Linked = 0
+    Target_Count = 0
+    Targets_Unchanged = 0
+    Deferred_Links = []
+    Saved_Stdout = sys.stdout
+    Captured = StringIO.StringIO()
+    sys.stdout = Captured
+    try:
+        Process_View_Dirs (View_Path, Shadow_Path, The_Process)
+    except:
+        # Print the log so far, or it is lost with the view:
+        sys.stdout = Saved_Stdout
+        sys.stdout.write (Captured.getvalue())
+        sys.stdout.flush()
+        raise
+    sys.stdout = Saved_Stdout
+    Output = Captured.getvalue()
+    Manifest_Changes = None
+    if The_Manifest is not None:
+        Manifest_Changes = The_Manifest.takeChanges()
+    return (Output,
+            (Files_Processed, Files_Copied_Or_Linked, Target_Count, Targets_Unchanged),
+            Deferred_Links,
+            Manifest_Changes)
+
+def Process_Views_In_Pool (Views, The_Process):
+    """Processes each (View_Path, Shadow_Path) in Views with The_Process, like
+    Process_Subsystems, but options.Jobs at a time, each in a worker process.
+    Prints each view's log and adds its counts as it finishes, in the order of Views.
+    """
+    global Views_Processed, Files_Processed, Files_Copied_Or_Linked, Target_Count, Targets_Unchanged
+    # Or each worker would print what is still buffered when it exits:
+    sys.stdout.flush()
+    Pool = multiprocessing.Pool (
+        options.Jobs, Start_Worker, (options, Log_Prefix, Target_IDL_Links_Path, The_Manifest))
+    try:
+        Work = [(View_Path, Shadow_Path, The_Process) for (View_Path, Shadow_Path) in Views]
+        # One at a time, since a view can take anywhere from no time to minutes:
+        for (Output, Counts, Links, Manifest_Changes) in Pool.imap (Process_View_In_Worker, Work, 1):
+            sys.stdout.write (Output)
+            Files_Processed = Files_Processed + Counts [0]
+            Files_Copied_Or_Linked = Files_Copied_Or_Linked + Counts [1]
+            Target_Count = Target_Count + Counts [2]
+            Targets_Unchanged = Targets_Unchanged + Counts [3]
+            Views_Processed = Views_Processed + 1
+            if Manifest_Changes is not None:
+                The_Manifest.mergeChanges (Manifest_Changes)
+            # Made here in order, so the last subsystem's link wins, as without a pool:
+            for (Source_Path, Target_Path) in Links:
+                Link_A_File (Source_Path, Target_Path)
+        Pool.close()
+    except:
+        Pool.terminate()
+        raise
+    Pool.join()
 
 def Process_NIF_Views (Tower_Name, Target_Root_Path, The_Process):
     """Processes the "Tower_Name" view and all directories in it for all NIF subsystems.
-    Deletes all links first.
+    Deletes all links first, unless this is an incremental run.
     """
     global Old_Dirs_Deleted
     Debug_Print ("Process_NIF_Views (" + Tower_Name + ", " + Target_Root_Path + ", " + `The_Process` + ")")
-    if os.path.exists (Target_Root_Path):
-        Run_Or_Log ('shutil.rmtree ("' + Target_Root_Path + '")')
+    if Delete_Old_Tree (Target_Root_Path):
         Old_Dirs_Deleted =  Old_Dirs_Deleted + Target_Root_Path + ", "
-        
+
+    if options.Jobs == 1:
+        for Layer in NIF_Layers:
+            Layer_Path = os.path.join (NIF_Root_Path, Layer)
+            Target_Layer_Path = os.path.join (Target_Root_Path, Layer)
+            Process_Subsystems (
+              Tower_Name,
+              The_Process,
+              Layer_Path,
+              Target_Layer_Path,
+              Get_Subsystems_At (Layer_Path))
+        return
+    # Every subsystem in the tower at once, so the pool doesn't wait for each layer's last one:
+    Views = []
     for Layer in NIF_Layers:
         Layer_Path = os.path.join (NIF_Root_Path, Layer)
         Target_Layer_Path = os.path.join (Target_Root_Path, Layer)
-        Process_Subsystems (
-          Tower_Name, 
-          The_Process, 
-          Layer_Path, 
-          Target_Layer_Path, 
-          Get_Subsystems_At (Layer_Path)) 
+        Layer_Views = Get_Views_To_Process (
+          Tower_Name, Layer_Path, Target_Layer_Path, Get_Subsystems_At (Layer_Path))
+        # Made here, or the workers would race to make it:
+        if Layer_Views and not os.path.exists (Target_Layer_Path):
+            Log ('os.makedirs ("' + Target_Layer_Path + '")')
+            if not options.Effort_Only:
+                os.makedirs (Target_Layer_Path)
+        Views = Views + Layer_Views
+    Process_Views_In_Pool (Views, The_Process)
                
 
 if __name__ == "__main__":
@@ -384,11 +566,24 @@ if __name__ == "__main__":
     parser.add_option("-w", "--workspace", 
                       action="store", type="string", dest="Workspace", default="",
                       metavar="<path>", help="Use <path>/src/ada for the Ada and <path>/src/idl for the IDL.")
+    parser.add_option("--incremental",
+                      action="store_true", dest="Incremental", default=False,
+                      help="Keep the old tree, and only remake targets whose sources changed since the last run [default: %default].")
+    parser.add_option("--hash",
+                      action="store_true", dest="Use_Hash", default=False,
+                      help="With --incremental, compare source contents too, so touched but unchanged files are not remade [default: %default].")
+    parser.add_option("-j", "--jobs",
+                      action="store", type="int", dest="Jobs", default=1,
+                      metavar="<n>", help="Make <n> subsystems at a time, each in its own process; 0 means one per CPU [default: %default].")
     (options, args) = parser.parse_args()
     if len(args) != 1:
         parser.error("expected 1 argument, got " + str (len(args)))
     if options.Copy_Files and options.Make_Hard_Links:
         parser.error("options -c and -h are mutually exclusive")
+    if options.Jobs < 0:
+        parser.error("option -j must not be negative")
+    if options.Jobs == 0:
+        options.Jobs = multiprocessing.cpu_count()
     Tower_Name = args[0]
     	    
     print "[" + sys.argv [0] + " " + Tower_Name + "]"    
@@ -402,6 +597,8 @@ if __name__ == "__main__":
     Files_Processed = 0
     Files_Copied_Or_Linked = 0
     Target_Count = 0
+    Targets_Unchanged = 0
+    Stale_Targets_Deleted = 0
             
 #    Process_NIF_Views (View_Name, Print_Path_And_Shadow)
 #    Process_NIF_Views (View_Name, Print_Code_Files)
@@ -432,16 +629,23 @@ if __name__ == "__main__":
         Target_Ada_Root_Path = os.path.join (options.Workspace, "src/ada")
         Target_IDL_Root_Path = os.path.join (options.Workspace, "src/idl")
         Target_IDL_Links_Path = os.path.join (options.Workspace, "src/idl_links")
+
+    if options.Incremental:
+        # Kept beside the IDL tree, since -i runs don't touch the Ada tree:
+        The_Manifest = Manifest (
+            os.path.join (Target_IDL_Root_Path, Manifest.FILE_NAME), options.Use_Hash)
         
     if not options.IDL_Only:
         Process_NIF_Views (Tower_Name, Target_Ada_Root_Path, Link_Ada_Files)
     
     # It's not necessary to delete this at the moment, since the tree is brand new,
     # but this "rmtree" increases this code segment's independence:
-    if os.path.exists (Target_IDL_Links_Path):
-            Run_Or_Log ('shutil.rmtree ("' + Target_IDL_Links_Path + '")')
-    Run_Or_Log ('os.makedirs ("' + Target_IDL_Links_Path + '")') 
+    Delete_Old_Tree (Target_IDL_Links_Path)
+    if not os.path.exists (Target_IDL_Links_Path):
+        Run_Or_Log ('os.makedirs ("' + Target_IDL_Links_Path + '")') 
     Process_NIF_Views (Tower_Name, Target_IDL_Root_Path, Link_IDL_Files)
+    if The_Manifest is not None:
+        Delete_Stale_Targets ()
     
     print "Views_Processed:        " + `Views_Processed`
     print "Files_Processed:        " + `Files_Processed`
@@ -449,6 +653,9 @@ if __name__ == "__main__":
       print "(Above includes once for Ada, once for IDL)"
     print "Files_Copied_Or_Linked: " + `Files_Copied_Or_Linked`
     print "Target_Count:           " + `Target_Count`
+    if options.Incremental:
+        print "Targets_Unchanged:      " + `Targets_Unchanged`
+        print "Stale_Targets_Deleted:  " + `Stale_Targets_Deleted`
 
     if options.Effort_Only:
         print "Would first have deleted: " + Old_Dirs_Deleted
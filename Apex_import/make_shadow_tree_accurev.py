@@ -35,6 +35,7 @@ __date__ = "$Date: 12/20/2007 09:16:05 $"
 __copyright__ = "Copyright 2006 LLNL"
 
 import array
+import dir_walker
 import getopt
 from optparse import OptionParser
 import os
@@ -108,22 +109,25 @@ def Run_Or_Log (Command):
     if not options.Effort_Only:
         exec Command
 
-def Print_Source_And_Target_Dirs (Source_Path, Target_Path):
+def Print_Source_And_Target_Dirs (Source_Path, Target_Path, Entries=None):
     print Source_Path
     print Target_Path
 
-def Print_Ada_Files_In_Source_Dir (Source_Path, Target_Path):
+def Print_Ada_Files_In_Source_Dir (Source_Path, Target_Path, Entries=None):
     """Prints the Ada files in View_Path.  Target_Path is unused.
     """
     Debug_Print ("Print_Ada_Files_In_Source_Dir (" + Source_Path + ", " + Target_Path + ")")
-    for Entry in os.listdir (Source_Path):
+    if Entries is None:
+        Entries = dir_walker.scan (Source_Path)
+    for Dir_Entry in Entries:
+        Entry = Dir_Entry.name
     	# Hopefully there are no directories ending in .ada:
         if Entry [-4:] == Apex_Ada_Suffix:
             print os.path.join (Source_Path, Entry)                
                
-def Make_Target_Dir (Source_Path, Target_Path):
+def Make_Target_Dir (Source_Path, Target_Path, Entries=None):
     """Creates directory Target_Path and any non-existent parent directories.
-    Source_Path is unused.
+    Source_Path and Entries are unused.
     """
     Debug_Print ("Make_Target_Dir (" + Source_Path + ", " + Target_Path + ")")
     if os.path.exists (Target_Path):
@@ -237,7 +241,7 @@ def Is_Ada_File (File_Name):
     else:
         return False
                       
-def Link_Ada_Files (Source_Path, Target_Path):
+def Link_Ada_Files (Source_Path, Target_Path, Entries=None):
     """Creates Target_Path and any non-existent parent directories, then
     creates a link to each Ada file in Source_Path from Target_Path.
     May make Gnat, Apex, or both format links.  
@@ -248,11 +252,14 @@ def Link_Ada_Files (Source_Path, Target_Path):
     Log ("Link_Ada_Files (" + Source_Path + ", " + Target_Path + ")")
     Debug_Print ("Link_Ada_Files (" + Source_Path + ", " + Target_Path + ")")
     
-    for Entry in os.listdir (Source_Path):
+    if Entries is None:
+        Entries = dir_walker.scan (Source_Path)
+    for Dir_Entry in Entries:
+        Entry = Dir_Entry.name
         Debug_Print ("Processing '" + Entry + "' - Entry [-4:] is '" + Entry [-4:] + "'")
-        Source_Entry_Path = os.path.join (Source_Path, Entry)
+        Source_Entry_Path = Dir_Entry.path
         # Don't process any directories:
-        if not os.path.isdir(Source_Entry_Path):
+        if not Dir_Entry.isDir():
             if Is_Ada_File (Entry):
                 if options.Make_Both_Format_Targets or options.Make_Gnat_Format_Targets:
                     Target_Entry_Path = os.path.join (Target_Path, Apex_To_Gnat(Entry))
@@ -263,7 +270,7 @@ def Link_Ada_Files (Source_Path, Target_Path):
                 Files_Copied_Or_Linked = Files_Copied_Or_Linked + 1 
             Files_Processed = Files_Processed + 1 
                     
-def Link_IDL_Files (Source_Path, Target_Path):
+def Link_IDL_Files (Source_Path, Target_Path, Entries=None):
     """Creates Target_Path and any non-existent parent directories, then
     creates a link to each IDL file in Source_Path from Target_Path.
     """
@@ -273,11 +280,14 @@ def Link_IDL_Files (Source_Path, Target_Path):
     # Trim the IDL off the target path: 
     if os.path.basename (Target_Path) == IDL_Source_Dir:
         Target_Path = os.path.dirname (Target_Path)
-    for Entry in os.listdir (Source_Path):
+    if Entries is None:
+        Entries = dir_walker.scan (Source_Path)
+    for Dir_Entry in Entries:
+        Entry = Dir_Entry.name
         Debug_Print ("Processing '" + Entry + "' - Entry [-4:] is '" + Entry [-4:] + "'")
-        Source_Entry_Path = os.path.join (Source_Path, Entry)
+        Source_Entry_Path = Dir_Entry.path
         # Don't process any directories:
-        if not os.path.isdir(Source_Entry_Path):
+        if not Dir_Entry.isDir():
             if Entry [-4:] == IDL_Suffix:
                 Target_Entry_Path = os.path.join (Target_Path, Entry)
                 Copy_Or_Link_A_File (Source_Entry_Path, Target_Entry_Path)
@@ -290,41 +300,45 @@ def Link_IDL_Files (Source_Path, Target_Path):
 # END Procedures designed to be called by Process_View_Dirs
 #################################################################################
 
-def Process_View_Dirs (View_Path, Target_Path, The_Process):
+def Process_View_Dirs (View_Path, Target_Path, The_Process, View_Is_Link=None):
     global Apex_Internal_Dirs
     """Recursively processes the directories starting at View_Path, leaving out the internal 
     Rational dirs.  Sends each along with its corresponding Target directory to The_Process.
     """
     Debug_Print ("Process_View_Dirs (" + View_Path + ", " + Target_Path + ")")
-    # Actual processing: 
-    The_Process (View_Path, Target_Path)
     # Don't recurse through any links:
-    if os.path.islink (View_Path):
+    if View_Is_Link is None:
+        View_Is_Link = os.path.islink (View_Path)
+    if View_Is_Link:
+        # Actual processing: 
+        The_Process (View_Path, Target_Path)
         return
-    Entries = os.listdir (View_Path)
-    # This is only needed for the first (view) level directory, 
-    # but it won't hurt to do it every time:
-    # Skip the Rational internal directories:
-    for Skip_Dir in Apex_Internal_Dirs:
-        if Skip_Dir in Entries:
-            Entries.remove (Skip_Dir)
-    for Entry in Entries:
-        Entry_Path = os.path.join (View_Path, Entry)
-        if os.path.isdir (Entry_Path):
+    # Listed and statted once, for both The_Process and the recursion:
+    Entries = dir_walker.scan (View_Path)
+    # Actual processing: 
+    The_Process (View_Path, Target_Path, Entries)
+    for Dir_Entry in Entries:
+        # This is only needed for the first (view) level directory, 
+        # but it won't hurt to do it every time:
+        # Skip the Rational internal directories:
+        if Dir_Entry.name in Apex_Internal_Dirs:
+            continue
+        if Dir_Entry.isDir():
             #
             # Recurse:
             #
-            Process_View_Dirs (Entry_Path, os.path.join (Target_Path, Entry), The_Process)
+            Process_View_Dirs (Dir_Entry.path, os.path.join (Target_Path, Dir_Entry.name), The_Process,
+                               Dir_Entry.isLink())
                        
 def Get_Subsystems_At (Root_Path):
     """Returns a list of the subsystem dirs at Root_Path.
     """
     Debug_Print ("Get_Subsystems_At (" + Root_Path + ")")
     Result = []
-    for Entry in os.listdir (Root_Path):
-        Path = os.path.join (Root_Path, Entry)
-        if os.path.isdir (Path) and  Path [-3:] == Subsystem_Suffix:
-            Result = Result + [Entry]
+    for Dir_Entry in dir_walker.scan (Root_Path):
+        # Name first, so only possible subsystems are statted:
+        if Dir_Entry.name [-3:] == Subsystem_Suffix and Dir_Entry.isDir():
+            Result = Result + [Dir_Entry.name]
     return Result
                        
 def Process_Subsystems (View, The_Process, Layer_Path, Target_Layer_Path, Subsystems):
@@ -11,6 +11,9 @@ makes a shadow code tree in the form:
 All layers below the given tower will be created.
 All subsystems below the given layer will be created.
 Deletes /nif/code/shadow/[tower]/[layer]/[subsystem] first if it exists.
+With --incremental, keeps it instead, remakes only the targets whose sources
+changed since the last run, and removes only the targets whose sources are gone.
+With --jobs, makes that many subsystems at the same time, each in its own process.
 There is no tower name after the subsystem name.
 The subsystem name is without the ".ss".
 Each link points to the corresponding Ada file.  
@@ -47,6 +50,7 @@ from MakeStreeForSubSys import *
 from MakeStreeForLayer import *
 from MakeStreeForTower import *
 from make_stree_utilities import *
+from manifest import Manifest
 from optparse import OptionParser
 
 if __name__ == "__main__":
@@ -64,6 +68,8 @@ if __name__ == "__main__":
         print
     if options.Copy_Files and options.Make_Hard_Links:
         parser.error("options -c and -h are mutually exclusive")
+    if options.Jobs < 0:
+        parser.error("option -j must not be negative")
 #    if options.Move_Idl_Ada and options.Remove_Idl_Ada_Dirs:
 #        parser.error("options --move_idl_ada and --remove_idl_ada_dirs are mutually exclusive")
 #    if options.Check_Idl_Ada_Dirs and \
@@ -116,6 +122,13 @@ if __name__ == "__main__":
     makeStree.makeSourcePathNames()
     makeStree.makeTargetPathNames()
     #
+    # on an incremental run, the manifest of what the last run made is kept
+    #   at the top of the Ada tree, whichever part of the tree is being made.
+    #
+    if options.Incremental:
+        makeStree.manifest = Manifest(os.path.join(makeStree.targetAdaTowerPath, Manifest.FILE_NAME),
+                                      options.Use_Hash)
+    #
     # based on the number of arguments, initialize the Source and Target
     # paths for each possible type of request.
     #
@@ -158,6 +171,8 @@ if __name__ == "__main__":
     makeStree.processDir(Source_Path, 
                          Target_Ada_Path, 
                          Target_Idl_Path)
+    if makeStree.manifest is not None:
+        makeStree.removeStaleTargets()
     
     # have my instance log its Process Counts
     makeStree.logProcessCounts()
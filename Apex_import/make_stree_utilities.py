@@ -11,6 +11,7 @@ __copyright__ = "Copyright 2008 LLNL"
 
 import apex
 import gnat
+import multiprocessing
 import os
 
 def addParserOptions(parser):
@@ -94,6 +95,26 @@ def addParserOptions(parser):
                       default="",
                       metavar="<path>", 
                       help="Use <path>/src/ada for the Ada and <path>/src/idl for the IDL.")
+    parser.add_option("--incremental",
+                      action="store_true", 
+                      dest="Incremental", 
+                      default=False,
+                      help="Keep the old tree, and only remake targets whose sources " +
+                            "changed since the last run [default: %default].")
+    parser.add_option("--hash",
+                      action="store_true", 
+                      dest="Use_Hash", 
+                      default=False,
+                      help="With --incremental, compare source contents too, so touched " +
+                            "but unchanged files are not remade [default: %default].")
+    parser.add_option("-j", "--jobs",
+                      action="store", 
+                      type="int", 
+                      dest="Jobs", 
+                      default=1,
+                      metavar="<n>", 
+                      help="Make <n> subsystems at a time, each in its own process; " +
+                            "0 means one per CPU [default: %default].")
 
 def setupFlags(parsedOptions, streeInstance):
         """Setup flags within the given Object Instance
@@ -152,6 +173,10 @@ def setupFlags(parsedOptions, streeInstance):
                                       moveIdlAda, removeIdlAdaDir, checkIdlAdaDir,
                                       effortOnly, debugOn, underApexSession,
                                       workspace))
+        if parsedOptions.Jobs == 0:
+            streeInstance.maxProcesses = multiprocessing.cpu_count()
+        else:
+            streeInstance.maxProcesses = parsedOptions.Jobs
         # print a copy of what was set, only printed if debugging is turned on
         streeInstance.dumpInstanceVars()
         
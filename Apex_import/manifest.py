@@ -0,0 +1,264 @@
+"""Manifest of the targets a shadow tree builder made, for incremental rebuilds.
+
+For each target file, the manifest remembers what it was made from: the source
+path, whether it was a copy, a symbolic link or a hard link, and the source's
+size and modification time (and optionally an MD5 of its contents).  On the
+next run, a builder asks the manifest whether each target is still current
+instead of deleting and remaking the whole tree, and only copies or links the
+ones that aren't.  Targets in the manifest that the run no longer makes are
+"stale", and the builder deletes just those.
+
+Usage:
+
+    manifest = Manifest(os.path.join(targetRoot, Manifest.FILE_NAME))
+    if manifest.isNew():
+        # No previous run to compare with: rebuild from scratch as before.
+        ...remove targetDir...
+    manifest.addScope(targetDir)
+    ...
+    if not manifest.isCurrent(targetPath, sourcePath, Manifest.COPY):
+        ...copy sourcePath to targetPath...
+        manifest.record(targetPath, sourcePath, Manifest.COPY)
+    ...
+    for targetPath in manifest.staleTargets():
+        ...remove targetPath...
+        manifest.forget(targetPath)
+    manifest.save()
+
+A scope is a directory that a full rebuild would have removed first.  Only
+targets under a scope are ever stale, so a run that rebuilds one subsystem
+doesn't delete the rest of the tower.
+"""
+
+import hashlib
+import json
+import os
+
+class Manifest (object):
+    "Source size, mtime and optional hash for each target a builder made"
+
+    FILE_NAME = ".shadow_manifest"
+
+    COPY = "copy"
+    SYMLINK = "symlink"
+    HARDLINK = "hardlink"
+
+    def __init__(self, path, useHash=False):
+        """Loads the manifest at path, if there is one.  If useHash is True, a source
+        whose mtime changed but whose contents didn't is still current.
+        """
+        self.path = path
+        self.useHash = useHash
+        self._entries = dict()
+        self._scopes = []
+        self._seen = set()
+        self._isNew = not os.path.exists(path)
+        if not self._isNew:
+            manifestFile = open(path)
+            try:
+                self._entries = json.load(manifestFile)
+            finally:
+                manifestFile.close()
+
+    def isNew(self):
+        """Returns True if there was no manifest from a previous run.
+        """
+        return self._isNew
+
+    def addScope(self, targetDir):
+        """Notes that targetDir would have been removed and rebuilt.
+        """
+        self._scopes.append(os.path.normpath(targetDir))
+
+    def isCurrent(self, targetPath, sourcePath, kind):
+        """Returns True if targetPath exists and was made from sourcePath, as kind, and
+        sourcePath hasn't changed since.  For a symbolic link, sourcePath is the link
+        text.  Either way, targetPath is not stale.
+        """
+        self._seen.add(targetPath)
+        entry = self._entries.get(targetPath)
+        if (entry is None or entry["source"] != sourcePath or entry["kind"] != kind or
+            not os.path.lexists(targetPath)):
+            return False
+        if kind == self.SYMLINK:
+            return os.path.islink(targetPath) and os.readlink(targetPath) == sourcePath
+        try:
+            size, mtime = self._sizeAndMtime(sourcePath)
+        except OSError:
+            return False
+        if kind == self.COPY and os.path.getsize(targetPath) != size:
+            return False
+        if size == entry["size"] and mtime == entry["mtime"]:
+            return True
+        if self.useHash and size == entry["size"] and entry["hash"] == self._hash(sourcePath):
+            # Touched, but not changed:
+            entry["mtime"] = mtime
+            return True
+        return False
+
+    def record(self, targetPath, sourcePath, kind):
+        """Notes that targetPath was just made from sourcePath, as kind.
+        """
+        self._seen.add(targetPath)
+        entry = {"source" : sourcePath, "kind" : kind, "size" : None, "mtime" : None, "hash" : None}
+        if kind != self.SYMLINK:
+            try:
+                entry["size"], entry["mtime"] = self._sizeAndMtime(sourcePath)
+                if self.useHash:
+                    entry["hash"] = self._hash(sourcePath)
+            except (IOError, OSError):
+                # Leave it unknown, so the next run makes it again:
+                pass
+        self._entries[targetPath] = entry
+
+    def forget(self, targetPath):
+        if targetPath in self._entries:
+            del self._entries[targetPath]
+
+    def takeChanges(self):
+        """Returns the scopes added and the targets made or found current since this
+        manifest was loaded or last asked, and forgets them.  A worker process with a
+        copy of the manifest returns them, for mergeChanges on the original.
+        """
+        seenEntries = dict()
+        for targetPath in self._seen:
+            seenEntries[targetPath] = self._entries.get(targetPath)
+        changes = (seenEntries, self._scopes)
+        self._seen = set()
+        self._scopes = []
+        return changes
+
+    def mergeChanges(self, changes):
+        """Notes the changes takeChanges returned from a copy of this manifest.
+        """
+        seenEntries, scopes = changes
+        for targetPath, entry in seenEntries.items():
+            self._seen.add(targetPath)
+            if entry is not None:
+                self._entries[targetPath] = entry
+        for scope in scopes:
+            if scope not in self._scopes:
+                self._scopes.append(scope)
+
+    def staleTargets(self):
+        """Returns the targets in the manifest under a scope that this run hasn't made
+        or found current, sorted.
+        """
+        result = []
+        for targetPath in self._entries:
+            if targetPath not in self._seen and self._inScope(targetPath):
+                result.append(targetPath)
+        result.sort()
+        return result
+
+    def save(self):
+        """Writes the manifest.  Writes a new file and renames it, so an interrupted
+        run leaves the old manifest intact.
+        """
+        parentPath = os.path.dirname(self.path)
+        if parentPath and not os.path.exists(parentPath):
+            os.makedirs(parentPath)
+        newPath = self.path + ".new"
+        manifestFile = open(newPath, "w")
+        try:
+            json.dump(self._entries, manifestFile, sort_keys=True, indent=0)
+        finally:
+            manifestFile.close()
+        os.rename(newPath, self.path)
+        self._isNew = False
+
+    def _inScope(self, targetPath):
+        for scope in self._scopes:
+            if targetPath == scope or targetPath.startswith(scope + os.sep):
+                return True
+        return False
+
+    def _sizeAndMtime(self, sourcePath):
+        status = os.stat(sourcePath)
+        return status.st_size, status.st_mtime
+
+    def _hash(self, sourcePath):
+        digest = hashlib.md5()
+        sourceFile = open(sourcePath, "rb")
+        try:
+            while True:
+                block = sourceFile.read(1 << 20)
+                if not block:
+                    break
+                digest.update(block)
+        finally:
+            sourceFile.close()
+        return digest.hexdigest()
+
+class _Test ():
+    def setup (self):
+        import tempfile
+        print "BEGIN test"
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join (self.root, "source")
+        self.target = os.path.join (self.root, "tree", "target")
+        self.manifestPath = os.path.join (self.root, Manifest.FILE_NAME)
+        self.write (self.source, "one")
+        os.makedirs (os.path.dirname (self.target))
+        self.write (self.target, "one")
+
+    def write (self, path, contents, mtime=None):
+        pathFile = open (path, "w")
+        pathFile.write (contents)
+        pathFile.close()
+        if mtime is not None:
+            os.utime (path, (mtime, mtime))
+
+    def run (self):
+        manifest = Manifest (self.manifestPath)
+        assert manifest.isNew()
+        manifest.addScope (os.path.join (self.root, "tree"))
+        assert not manifest.isCurrent (self.target, self.source, Manifest.COPY)
+        manifest.record (self.target, self.source, Manifest.COPY)
+        manifest.record (self.target + ".gone", self.source, Manifest.COPY)
+        manifest.save()
+
+        manifest = Manifest (self.manifestPath)
+        assert not manifest.isNew()
+        manifest.addScope (os.path.join (self.root, "tree"))
+        assert manifest.isCurrent (self.target, self.source, Manifest.COPY)
+        assert not manifest.isCurrent (self.target, self.source, Manifest.HARDLINK)
+        assert manifest.staleTargets() == [self.target + ".gone"]
+
+        # Changed:
+        self.write (self.source, "two", mtime=1)
+        assert not Manifest (self.manifestPath).isCurrent (self.target, self.source, Manifest.COPY)
+
+        # Touched, but not changed, with and without hashing:
+        manifest = Manifest (self.manifestPath, useHash=True)
+        self.write (self.source, "one", mtime=1)
+        manifest.record (self.target, self.source, Manifest.COPY)
+        os.utime (self.source, (2, 2))
+        manifest.useHash = False
+        assert not manifest.isCurrent (self.target, self.source, Manifest.COPY)
+        manifest.useHash = True
+        assert manifest.isCurrent (self.target, self.source, Manifest.COPY)
+
+        # Changes made in a copy, e.g. in a worker process:
+        manifest.save()
+        original = Manifest (self.manifestPath)
+        original.addScope (os.path.join (self.root, "tree"))
+        copy = Manifest (self.manifestPath)
+        copy.addScope (os.path.join (self.root, "other"))
+        copy.record (self.target, self.source + ".moved", Manifest.COPY)
+        original.mergeChanges (copy.takeChanges())
+        assert copy.takeChanges() == ({}, [])
+        assert original.staleTargets() == [self.target + ".gone"]
+        assert original._entries[self.target]["source"] == self.source + ".moved"
+        assert original._scopes == [os.path.join (self.root, "tree"), os.path.join (self.root, "other")]
+
+    def finish (self):
+        import shutil
+        shutil.rmtree (self.root)
+        print "END test (no errors)"
+
+if __name__ == '__main__':
+    test = _Test()
+    test.setup()
+    test.run()
+    test.finish()
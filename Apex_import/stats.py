@@ -11,6 +11,8 @@ class _Stats():
 			"dirsProcessed",
 			"filesCopied",
 			"filesDeletedFirst",
+			"filesUnchanged",
+			"staleTargetsDeleted",
 			"itemsSkipped")
 	
 	def __init__(self):
@@ -1,11 +1,122 @@
 """Provides access to AccuRev.
+
+The get... methods that return XML parse all of the command's output into a
+document first.  The iter... methods instead yield the attributes of each element
+as the command writes it, so use them on large output, e.g. "stat" on a whole
+depot.
 """
 # import inspect
 from optparse import OptionParser
 import string
+import time
 from support.local_logging import Logger
 from support.runner import Runner
 from xml.dom.minidom import parseString
+try:
+	from xml.etree.cElementTree import iterparse
+except ImportError:
+	from xml.etree.ElementTree import iterparse
+from xml.parsers import expat
+
+class ElementIndex:
+	"""A set of element names that can also say whether any directory of an 
+	element is in the set, in time proportional to the element's depth rather 
+	than to the size of the set.
+	"""
+	def __init__ (self, elements=()):
+		self._elements = set (elements)
+
+	def __contains__ (self, element):
+		return element in self._elements
+
+	def __len__ (self):
+		return len (self._elements)
+
+	def add (self, element):
+		self._elements.add (element)
+
+	def dirOf (self, element):
+		"""Returns the nearest directory of element that is in the set, or None.  
+		element itself doesn't count.
+		"""
+		end = element.rfind ("/")
+		while end > 0:
+			possibleDir = element [:end]
+			if possibleDir in self._elements:
+				return possibleDir
+			end = element.rfind ("/", 0, end)
+		return None
+
+	def withoutDirChildren (self, elements):
+		"""Returns elements, in order, minus those with a directory in the set.
+		"""
+		return [element for element in elements if self.dirOf (element) is None]
+
+class StreamGraph:
+	"""The streams of one depot, as AccuRevCommand.iterStreams yields them, 
+	linked by number to their bases.  Answers ancestor, descendant and common 
+	ancestor questions by stream name, and raises KeyError for a name that isn't 
+	in the depot.
+	"""
+	def __init__ (self, streams):
+		# Snapshot views are frozen forever.  A snapshot's basis stream
+		# name may have changed since the snapshot was taken, but not 
+		# the basis stream number.  Therefore, we track ancestors by 
+		# number, not name.
+		self._nameOfNumber = dict ()
+		self._numberOfName = dict ()
+		self._basisOfNumber = dict ()
+		self._childrenOfNumber = dict ()
+		for stream in streams:
+			number = stream [AccuRevCommand._XMLTags.Stream_Number]
+			name = stream [AccuRevCommand._XMLTags.Name]
+			self._nameOfNumber [number] = name
+			self._numberOfName [name] = number
+			# The root stream has no basis:
+			if AccuRevCommand._XMLTags.Basis_Number in stream:
+				basisNumber = stream [AccuRevCommand._XMLTags.Basis_Number]
+				self._basisOfNumber [number] = basisNumber
+				self._childrenOfNumber.setdefault (basisNumber, []).append (number)
+		self.loadTime = time.time()
+
+	def __contains__ (self, name):
+		return name in self._numberOfName
+
+	def ancestors (self, name):
+		"""Returns the names of the ancestors of stream name, its basis first.
+		"""
+		return [self._nameOfNumber [number] for number in self._ancestorNumbers (name)]
+
+	def descendants (self, name):
+		"""Returns the names of the descendants of stream name, nearest first.
+		"""
+		result = []
+		numbers = [self._numberOfName [name]]
+		while numbers:
+			children = []
+			for number in numbers:
+				children.extend (self._childrenOfNumber.get (number, []))
+			result.extend ([self._nameOfNumber [child] for child in children])
+			numbers = children
+		return result
+
+	def commonAncestor (self, name1, name2):
+		"""Returns the name of the nearest stream that is name1 or one of its 
+		ancestors and also name2 or one of its ancestors, or None.
+		"""
+		numbers2 = set ([self._numberOfName [name2]] + self._ancestorNumbers (name2))
+		for number in [self._numberOfName [name1]] + self._ancestorNumbers (name1):
+			if number in numbers2:
+				return self._nameOfNumber [number]
+		return None
+
+	def _ancestorNumbers (self, name):
+		result = []
+		number = self._numberOfName [name]
+		while number in self._basisOfNumber:
+			number = self._basisOfNumber [number]
+			result.append (number)
+		return result
 
 class AccuRevCommand:
 	"""Provides AccuRev commands"""
@@ -101,25 +212,70 @@ class AccuRevCommand:
 			_Options.AllFiles, 
 			_Options.XMLFormat]
     
-	def __init__(self, debugOn, effortOnly):
-		"""Initializes the instance variables associated with the class
+	def __init__(self, debugOn, effortOnly, streamGraphSeconds=300, clientProg=None):
+		"""Initializes the instance variables associated with the class.  A 
+		depot's streams are reread at most every streamGraphSeconds.  clientProg 
+		runs instead of "accurev" if given (e.g. fake_accurev.PATH).
 		"""
 		self._debugOn = debugOn
 		self._effortOnly = effortOnly
 		self._logger=Logger(name="AccuRevCommand")
 		self._logger.set_debug (self._debugOn)
-		self._debug = self._logger.logger.debug
-		self._log = self._logger.logger.info
+		self._debug = self._logger.debug
+		self._log = self._logger.info
 		self._runner=Runner()
+		self._streamGraphSeconds = streamGraphSeconds
+		self._streamGraphs = dict ()
+		if clientProg is not None:
+			self._ClientProg = clientProg
+			self._XMLStatArgs = [clientProg] + AccuRevCommand._XMLStatArgs [1:]
     
 	def issueCommandReturnXML (self, popenArgsList, wsDir=None):
 		"""Issues the command and provides the results as XML.
 		"""
 		output = self.issueCommand(popenArgsList, wsDir)
 		XML_Result = parseString (output)
-		self._debug (`XML_Result`)
+		self._debug (repr (XML_Result))
 		return XML_Result
 
+	def issueCommandIterXML (self, popenArgsList, tag, wsDir=None):
+		"""Issues the command, and yields the attributes of each tag element in 
+		its XML output, as a dictionary, as soon as the command writes it.  Only 
+		one element at a time is kept.
+		"""
+		self.dumpPopenArgs(popenArgsList[1], popenArgsList)
+		stream = self._runner.popenStreamOrLog (popenArgsList, wsDir)
+		try:
+			try:
+				for attributes in self._iterAttributes (stream.output, tag):
+					yield attributes
+			except SyntaxError:
+				# Not XML, e.g. because AccuRev could not run the command:
+				self._checkErrors ("", self._text (stream.finish()), wsDir)
+				raise
+		finally:
+			errors = self._text (stream.finish())
+		self._debug ("errors: " + str (errors))
+		self._checkErrors ("", errors, wsDir)
+
+	def _iterAttributes (self, xmlFile, tag):
+		"""Yields the attributes of each tag element in the XML document read 
+		from xmlFile, and then drops the element, so the document is never built.
+		An empty xmlFile (effort only) yields nothing.
+		"""
+		root = None
+		try:
+			for (event, element) in iterparse (xmlFile, events=("start", "end")):
+				if root is None:
+					root = element
+				elif event == "end" and element.tag == tag:
+					yield dict (element.attrib)
+					# Drops every finished element, not just this one:
+					root.clear()
+		except SyntaxError as error:
+			if root is not None or not str (error).startswith (expat.errors.XML_ERROR_NO_ELEMENTS):
+				raise
+
 	def issueCommand (self, popenArgsList, wsDir=None):
 		"""Issue the command associated with the given Popen arguments list.
 		    Returns the results of the command in a (output, errors) tuple and does
@@ -127,13 +283,29 @@ class AccuRevCommand:
 		"""
 		self.dumpPopenArgs(popenArgsList[1], popenArgsList)
 		(output, errors) = self._runner.popenOrLog (popenArgsList, wsDir)
+		output = self._text (output)
+		errors = self._text (errors)
 		self._debug ("output: " + str (output))
 		self._debug ("errors: " + str (errors))
+		self._checkErrors (output, errors, wsDir)
+		return output
+
+	def _text (self, data):
+		"""Returns the output or errors of a command as a string.  Runner gives 
+		them as bytes, except in effort only mode.
+		"""
+		if isinstance (data, bytes):
+			return data.decode (errors="replace")
+		return data
+
+	def _checkErrors (self, output, errors, wsDir):
+		"""Raises Usage_Error if the command's output or errors show why AccuRev 
+		could not run it.
+		"""
 		if (self._ErrorStrings.NotAuthenticated in errors or self._ErrorStrings.NotLoggedIn in output):
 			raise self.Usage_Error ("Not logged in to AccuRev.")
 		if self._ErrorStrings.NotInWorkspace in errors:
-			raise self.Usage_Error (`wsDir` + " is not in a workspace.")
-		return output
+			raise self.Usage_Error (repr (wsDir) + " is not in a workspace.")
 
 	def dumpPopenArgs(self, commandName, popenArgsList):
 		"""Dumps the contents of the given Popen arguments list.
@@ -149,7 +321,7 @@ class AccuRevCommand:
 		"""Runs the AccuRev 'info' command on wsDir and returns a dictionary 
 		containing the results.
 		"""
-		self._debug ("getInfo (wsDir = " + `wsDir`)
+		self._debug ("getInfo (wsDir = " + repr (wsDir))
 		Popen_Args = [self._ClientProg, self._Commands.Info]		
 		info = self.parseInfo (self.issueCommand(Popen_Args, wsDir))
 		self.assertLoggedInInfo(info)
@@ -167,8 +339,8 @@ class AccuRevCommand:
 			Key, Dummy1, Dummy2 = Line.partition(":")
 			Key = Key.strip ()
 			Dummy1, Dummy2 ,Value = Line.rpartition("\t")
-			self._debug("Key=" + `Key`)
-			self._debug("Value=" + `Value`)
+			self._debug("Key=" + repr (Key))
+			self._debug("Value=" + repr (Value))
 			Info_Dict[Key] = Value
 		return Info_Dict        
 
@@ -177,7 +349,7 @@ class AccuRevCommand:
 		Returns the output from the command.  Raises Usage_Error if not in a 
 		Workspace.
 		"""
-		self._debug ("update (wsDir = " + `wsDir`)
+		self._debug ("update (wsDir = " + repr (wsDir))
 		# "accurev info:
 		Popen_Args = [self._ClientProg, self._Commands.Update]
 		return  self.issueCommand(Popen_Args, wsDir)
@@ -203,57 +375,68 @@ class AccuRevCommand:
 	def getStreams (self, Depot):
 		"""Get the info for all streams in Depot and return it as an XML object.
 		"""
-		self._debug ("getStreams (Depot = " + `Depot`)
+		self._debug ("getStreams (Depot = " + repr (Depot))
+		return self.issueCommandReturnXML(self._showStreamsArgs (Depot))   
+
+	def iterStreams (self, Depot):
+		"""Yields the attributes of each stream in Depot, as a dictionary 
+		(e.g. Stream [_XMLTags.Name]).
+		"""
+		self._debug ("iterStreams (Depot = " + repr (Depot))
+		return self.issueCommandIterXML(self._showStreamsArgs (Depot), self._XMLTags.Stream)
+
+	def _showStreamsArgs (self, Depot):
 		# "accurev show -fx -p <depot> streams":
-		Popen_Args = [
-					self._ClientProg, 
-					self._Commands.Show, 
-					self._Options.XMLFormat,
-					self._Options.Depot, Depot,
-					self._ObjectTypes.Streams]
-		return self.issueCommandReturnXML(Popen_Args)   
+		return [
+				self._ClientProg, 
+				self._Commands.Show, 
+				self._Options.XMLFormat,
+				self._Options.Depot, Depot,
+				self._ObjectTypes.Streams]
+
+	def getStreamGraph (self, Depot, refresh=False):
+		"""Returns the StreamGraph of Depot.  Reads the depot's streams the first 
+		time, when refresh is True, or when the last read is older than 
+		streamGraphSeconds, and otherwise returns the graph from that read.
+		"""
+		graph = self._streamGraphs.get (Depot)
+		if (refresh or graph is None or 
+			time.time() - graph.loadTime > self._streamGraphSeconds):
+			self._debug ("getStreamGraph: reading the streams of " + Depot)
+			graph = StreamGraph (self.iterStreams (Depot))
+			self._streamGraphs [Depot] = graph
+		return graph
 
 	def getAncestors (self, Depot, Stream_In):
-		"""Returns a list of the ancestors of Stream_In, with Stream_In 
-		first on the list.  
+		"""Returns a list of the ancestors of Stream_In, its basis first.  
 		"""
 		self._debug ("getParent (Depot = " + Depot + ", Stream_In = " + Stream_In)
-		Stream_XML_Doc = self.getStreams (Depot)
-		Streams = Stream_XML_Doc.getElementsByTagName (self._XMLTags.Stream)
-		# Get the basis and number for every stream:
-            # Snapshot views are frozen forever.  A snapshot's basis stream
-            # name may have changed since the snapshot was taken, but not 
-            # the basis stream number.  Therefore, we track ancestors by 
-            # number, not name.
-		Stream_Basis_Map = dict ()
-		Number_Stream_Map = dict ()
-		Stream_In_Found = False
+		Ancestors = self._streamGraphFor (Depot, [Stream_In]).ancestors (Stream_In)
+		self._debug (str (Ancestors))
+		return Ancestors
+
+	def getDescendants (self, Depot, Stream_In):
+		"""Returns a list of the descendants of Stream_In, nearest first.  
+		"""
+		return self._streamGraphFor (Depot, [Stream_In]).descendants (Stream_In)
+
+	def getCommonAncestor (self, Depot, Stream_1, Stream_2):
+		"""Returns the nearest stream that both streams are, or descend from, or 
+		None if there isn't one.
+		"""
+		return self._streamGraphFor (Depot, [Stream_1, Stream_2]).commonAncestor (Stream_1, Stream_2)
+
+	def _streamGraphFor (self, Depot, Streams):
+		"""Returns the StreamGraph of Depot, rereading it once if any of Streams 
+		isn't in it (e.g. it was made since the last read).
+		"""
+		graph = self.getStreamGraph (Depot)
 		for Stream in Streams:
-			self._debug ("----")
-			Name = Stream.attributes.get (self._XMLTags.Name).value
-			Number = Stream.attributes.get (self._XMLTags.Stream_Number).value
-			self._debug ("Stream: " + Name + "(" +  Number + ")")
-			Number_Stream_Map [Number] = Name
-			# The root stream has no basis:
-			if Stream.attributes.has_key (self._XMLTags.Basis):
-				Basis_Name = Stream.attributes.get (self._XMLTags.Basis).value
-				Basis_Number = Stream.attributes.get (self._XMLTags.Basis_Number).value
-				self._debug ("Basis: " + Basis_Name + "(" +  Basis_Number + ")")
-				Stream_Basis_Map [Number] = Basis_Number
-			if Name == Stream_In:
-				Stream_In_Found = True
-				Stream_In_Number = Number
-		if not Stream_In_Found:
-			raise self.Usage_Error ("Stream '" + Stream_In + "' not found.")
-		# Make an ancestor name map:
-		Ancestors = []
-		Ancestor_Number = Stream_In_Number
-		while Stream_Basis_Map.has_key (Ancestor_Number):
-			Ancestor_Number = Stream_Basis_Map [Ancestor_Number]
-			Ancestor = Number_Stream_Map [Ancestor_Number]
-			self._debug (Ancestor)
-			Ancestors.append (Ancestor)
-		return (Ancestors)
+			if Stream not in graph:
+				graph = self.getStreamGraph (Depot, refresh=True)
+				if Stream not in graph:
+					raise self.Usage_Error ("Stream '" + Stream + "' not found.")
+		return graph
 	
 	def getExternalElements(self, wsDir):
 		"""Returns all the external elements  in the workspace.  Does not honor 
@@ -280,21 +463,51 @@ class AccuRevCommand:
 								self._XMLStatArgs + [self._Options.AllModifiedElements, 
 												self._Options.NoTimestampOptimization], 
 								wsDir)
+
+	def iterExternalElements(self, wsDir):
+		"""Like getExternalElements, but yields the attributes of each element, 
+		as a dictionary (e.g. element [_XMLTags.Location]).
+		"""
+		# accurev stat -a -fx -x
+		return self.issueCommandIterXML(
+								self._XMLStatArgs + [self._Options.AllExternalElements], 
+								self._XMLTags.Element,
+								wsDir)
+
+	def iterMissingElements(self, wsDir):
+		"""Like getMissingElements, but yields the attributes of each element.
+		"""
+		# accurev stat -a -fx -M
+		return self.issueCommandIterXML(
+								self._XMLStatArgs + [self._Options.AllMissingElements], 
+								self._XMLTags.Element,
+								wsDir)
+
+	def iterModifiedElements(self, wsDir):
+		"""Like getModifiedElements, but yields the attributes of each element.
+		"""
+		# accurev stat -a -fx -m -O
+		return self.issueCommandIterXML(
+								self._XMLStatArgs + [self._Options.AllModifiedElements, 
+												self._Options.NoTimestampOptimization], 
+								self._XMLTags.Element,
+								wsDir)
+
 	def getExcludes(self, wsDir):
 		"""Returns a list of all the excludes explicitly set on this workspace.
 		"""
 		# accurev lsrules -d -fx
-		rulesXML = self.issueCommandReturnXML(
+		rules = self.issueCommandIterXML(
 										[self._ClientProg, 
 										self._Commands.ListRules,
 										self._Options.WorkspaceRulesOnly,
 										self._Options.XMLFormat],
+										self._XMLTags.Element,
 										wsDir)
-		rules = rulesXML.getElementsByTagName (self._XMLTags.Element)
 		excludes = []
 		for rule in rules:
-			if rule.attributes.get (self._XMLTags.Kind).value == self._XMLValues.Excluded:
-				excludes = excludes + [rule.attributes.get (self._XMLTags.Location).value]
+			if rule [self._XMLTags.Kind] == self._XMLValues.Excluded:
+				excludes.append (rule [self._XMLTags.Location])
 		return excludes
 		
 	################################################
@@ -305,19 +518,18 @@ class AccuRevCommand:
 		"""Adds all the external elements in the workspace.  honorIgnore (boolean)
 		controls whether this command honors ACCUREV_IGNORE_ELEMS.
 		"""
-		externalElementsXML=self.getExternalElements(wsDir)
-		externalElements=self._extractElements(externalElementsXML)
+		externalElements=self._extractElements(self.iterExternalElements(wsDir))
 		newElements=self._removeDirChildren(externalElements)		
 		# accurev add -c <comment> -x
- 		popenArgs=[self._ClientProg,
+		popenArgs=[self._ClientProg,
 							self._Commands.Add,
 							self._Options.Comment,
 							comment,
 							self._Options.AllExternalElements]
 		if not honorIgnore:
 			# accurev add -c <comment> -x -fi
- 			popenArgs=popenArgs + [self._Options.IgnoreIgnore]
- 		self.Elements.AddedElements.extend(newElements)
+			popenArgs=popenArgs + [self._Options.IgnoreIgnore]
+		self.Elements.AddedElements.extend(newElements)
 		return self.issueCommand(popenArgs, wsDir)
 	
 	def keepAllModifiedElements(self, wsDir, comment, ignoreTimestampOptimization):
@@ -326,66 +538,54 @@ class AccuRevCommand:
 		last update time for changes.
 		"""
 		# accurev keep -c <comment> -m
- 		popenArgs=[self._ClientProg,
+		popenArgs=[self._ClientProg,
 							self._Commands.Keep,
 							self._Options.Comment,
 							comment,
 							self._Options.AllModifiedElements]
- 		if  ignoreTimestampOptimization:
- 			# accurev keep -c <comment> -m -O
- 			popenArgs=popenArgs + [self._Options.NoTimestampOptimization]
+		if  ignoreTimestampOptimization:
+			# accurev keep -c <comment> -m -O
+			popenArgs=popenArgs + [self._Options.NoTimestampOptimization]
 		return self.issueCommand(popenArgs, wsDir)
 	
 	def defunctAllMissingElements(self, wsDir, comment):
 		"""Defuncts all missing elements in the workspace.
 		"""
-		missingElementsXML=self.getMissingElements(wsDir)
-		missingElements=self._extractElements(missingElementsXML)
+		missingElements=self._extractElements(self.iterMissingElements(wsDir))
 		defunctableElements=self._removeDirChildren(missingElements)
 		#accurev defunct -c <comment> <element list>
- 		popenArgs=[self._ClientProg,
+		popenArgs=[self._ClientProg,
 							self._Commands.Defunct,
 							self._Options.Comment,
-							comment] + defunctableElements
+							comment]
 		# Save the list of defuncted elements
 		self.Elements.DefunctedElements.extend(defunctableElements)
-		return self.issueCommand(popenArgs, wsDir)
+		return self.issueElementsCommand(popenArgs, defunctableElements, wsDir)
+	
+	def issueElementsCommand (self, popenArgsList, elements, wsDir=None):
+		"""Issues the command with elements added to its arguments, and returns 
+		its output.
+		"""
+		return self.issueCommand(popenArgsList + elements, wsDir)
 	
-	def _extractElements (self, XMLElements):
-		"""Given an XML doc of elements, returns the "/./" named element names.
-		"""
-		elements = XMLElements.getElementsByTagName (self._XMLTags.Element)
-		elementNames = []
-		for element in elements:
-			elementNames = elementNames + [element.attributes.get (self._XMLTags.Location).value]
-		return elementNames
+	def _extractElements (self, elements):
+		"""Given the attributes of elements, as the iter...Elements methods yield 
+		them, returns the "/./" named element names.
+		"""
+		return [element [self._XMLTags.Location] for element in elements]
 	
 	def _removeDirChildren(self, elements):
 		"""Given a list of elements, returns that list minus children of directories.
 		If you defunct a directory AND a child of that directory, the child becomes
 		a stranded defunct member of the workspace. 
 		"""
-		withoutDirChildren = []
-		for possibleChild in elements:
-			isChild = False
-			for possibleDir in elements:
-				if self._isInDir(possibleChild, possibleDir):
-					isChild = True
-			if not isChild:
-				withoutDirChildren = withoutDirChildren + [possibleChild]
-		return withoutDirChildren
+		return ElementIndex(elements).withoutDirChildren(elements)
 	
-	def _isInDir (self, possibleChild, possibleDir):
-		"""Returns True if possibleChild is in the directory PossibleDir
-		"""
-		# "in" is safe to use here because all element names begin with "./":		
-		return (possibleDir + "/") in possibleChild
-			
 	def promoteAllActiveElements(self,wsDir, comment):
 		"""Promotes all elements in the Default Group to the parent stream.
 		"""
 		#accurev promote -c <comment> -d
- 		popenArgs=[self._ClientProg,
+		popenArgs=[self._ClientProg,
 							self._Commands.Promote,
 							self._Options.Comment,
 							comment,
@@ -395,14 +595,122 @@ class AccuRevCommand:
 	def excludeElement(self, wsDir, element):
 		"""Excludes element from the workspace at wsDir
 		"""
-		excludes = self.getExcludes (wsDir)
-		if element in excludes:
+		# Only an exclude of element itself counts.  One of a directory of 
+		# element may be undone by an incl rule further down, which 
+		# getExcludes doesn't return:
+		if element in self.getExcludes (wsDir):
 			return 'Element "' + element + '" already excluded.  No excluded needed.'
 		else:
 			#accurev excl <element>
-			return self.issueCommand(
+			result = self.issueCommand(
 									[self._ClientProg,
 									self._Commands.Exclude,
 									element], 
 									wsDir)
-		
\ No newline at end of file
+			self._noteExcluded (wsDir, element)
+			return result
+
+	def _noteExcluded (self, wsDir, element):
+		"""Called after excludeElement excludes element.
+		"""
+		pass
+		
+
+class AccuRevSession (AccuRevCommand):
+	"""An AccuRevCommand that starts the accurev client as few times as it can, 
+	since starting it costs more than most commands do.  It remembers the info 
+	of each directory and the excludes of each workspace, instead of asking 
+	again, and runs each element command on many elements at once.  Call forget 
+	when something else may have changed the workspace.
+	"""
+	def __init__(self, debugOn, effortOnly, streamGraphSeconds=300, clientProg=None,
+				maxElementsPerCommand=500):
+		"""maxElementsPerCommand keeps each command line well under the system 
+		limit on its length.
+		"""
+		AccuRevCommand.__init__(self, debugOn, effortOnly, streamGraphSeconds, clientProg)
+		self._maxElementsPerCommand = maxElementsPerCommand
+		self._infos = dict ()
+		self._excludes = dict ()
+
+	def forget (self, wsDir=None):
+		"""Forgets what was remembered about wsDir, or about every directory.
+		"""
+		if wsDir is None:
+			self._infos.clear()
+			self._excludes.clear()
+		else:
+			self._infos.pop (wsDir, None)
+			self._excludes.pop (wsDir, None)
+
+	def getInfo (self, wsDir):
+		if wsDir not in self._infos:
+			self._infos [wsDir] = AccuRevCommand.getInfo (self, wsDir)
+		return dict (self._infos [wsDir])
+
+	def getExcludes (self, wsDir):
+		if wsDir not in self._excludes:
+			self._excludes [wsDir] = AccuRevCommand.getExcludes (self, wsDir)
+		return list (self._excludes [wsDir])
+
+	def _noteExcluded (self, wsDir, element):
+		if wsDir in self._excludes:
+			self._excludes [wsDir].append (element)
+
+	def excludeElements (self, wsDir, elements):
+		"""Excludes each of elements from the workspace at wsDir, and returns 
+		their results, in order.  "accurev excl" takes one element at a time, but 
+		the workspace's excludes are only read once.
+		"""
+		return [self.excludeElement (wsDir, element) for element in elements]
+
+	def update (self, wsDir):
+		self.forget (wsDir)
+		return AccuRevCommand.update (self, wsDir)
+
+	def issueElementsCommand (self, popenArgsList, elements, wsDir=None):
+		"""Issues the command on at most maxElementsPerCommand elements at a 
+		time, and returns all of its output.
+		"""
+		output = ""
+		for start in range (0, len (elements), self._maxElementsPerCommand):
+			output = output + self.issueCommand (
+								popenArgsList + elements [start:start + self._maxElementsPerCommand],
+								wsDir)
+		return output
+
+	def addElements (self, wsDir, comment, elements):
+		"""Adds elements to the workspace at wsDir.
+		"""
+		# accurev add -c <comment> <element list>
+		self.Elements.AddedElements.extend (elements)
+		return self.issueElementsCommand (
+							[self._ClientProg, self._Commands.Add, self._Options.Comment, comment],
+							elements, wsDir)
+
+	def keepElements (self, wsDir, comment, elements):
+		"""Keeps elements in the workspace at wsDir.
+		"""
+		# accurev keep -c <comment> <element list>
+		return self.issueElementsCommand (
+							[self._ClientProg, self._Commands.Keep, self._Options.Comment, comment],
+							elements, wsDir)
+
+	def defunctElements (self, wsDir, comment, elements):
+		"""Defuncts elements in the workspace at wsDir, except those in a 
+		directory that is also being defuncted.
+		"""
+		# accurev defunct -c <comment> <element list>
+		defunctableElements = self._removeDirChildren (elements)
+		self.Elements.DefunctedElements.extend (defunctableElements)
+		return self.issueElementsCommand (
+							[self._ClientProg, self._Commands.Defunct, self._Options.Comment, comment],
+							defunctableElements, wsDir)
+
+	def promoteElements (self, wsDir, comment, elements):
+		"""Promotes elements from the workspace at wsDir to its parent stream.
+		"""
+		# accurev promote -c <comment> <element list>
+		return self.issueElementsCommand (
+							[self._ClientProg, self._Commands.Promote, self._Options.Comment, comment],
+							elements, wsDir)
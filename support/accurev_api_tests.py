@@ -1,10 +1,14 @@
 #!/usr/bin/env python
-"""Runs unit tests on accurev_api.  Only works if you are logged into AccuRev.
+"""Runs unit tests on accurev_api.  Only works if you are logged into AccuRev, 
+except TestCase5Utilities and TestCase6Session, which runs fake_accurev instead.
 """
 import os
+import shutil
+import tempfile
 import unittest
 
-from  support.accurev_api import AccuRevCommand
+from  support import fake_accurev
+from  support.accurev_api import AccuRevCommand, AccuRevSession, ElementIndex, StreamGraph
 
 class BaseTestCase(unittest.TestCase):
 	
@@ -23,21 +27,21 @@ class BaseTestCase(unittest.TestCase):
 	def issueCommand(self, wsDir):
 		Popen_Args = [self.arc._ClientProg, 	self.arc._Commands.Info]
 		Results_Stream = self.arc.issueCommand(Popen_Args, wsDir)
-		self.assertEquals (Results_Stream[0:6], "Shell:")
+		self.assertEqual (Results_Stream[0:6], "Shell:")
 		# print (str (Results_Stream))
 				
 	def getInfo(self, wsDir):
 		Info = self.arc.getInfo (wsDir)
-		self.assert_ ("Shell" in Info)
-		self.assert_ (self.arc._Keys.User in Info)
-		self.assert_ ("Host" in Info)
-		self.assert_ ("Domain" in Info)
-		self.assert_ ("TZ" in Info)
-		self.assert_ ("Server name" in Info)
-		self.assert_ ("Port" in Info)
-		self.assert_ ("ACCUREV_BIN" in Info)
-		self.assert_ ("Client time" in Info)
-		self.assert_ ("Server time" in Info)
+		self.assertTrue ("Shell" in Info)
+		self.assertTrue (self.arc._Keys.User in Info)
+		self.assertTrue ("Host" in Info)
+		self.assertTrue ("Domain" in Info)
+		self.assertTrue ("TZ" in Info)
+		self.assertTrue ("Server name" in Info)
+		self.assertTrue ("Port" in Info)
+		self.assertTrue ("ACCUREV_BIN" in Info)
+		self.assertTrue ("Client time" in Info)
+		self.assertTrue ("Server time" in Info)
 		return Info
 
 class TestCase1InWorkspace(BaseTestCase):
@@ -50,10 +54,10 @@ class TestCase1InWorkspace(BaseTestCase):
 	
 	def test02_getInfo(self):
 		Info = self.getInfo(self.wsDir)
-		self.assert_ (self.arc._Keys.Depot in Info)
-		self.assert_ (self.arc._Keys.Workspace in Info)
-		self.assert_ (self.arc._Keys.Parent in Info)
-		self.assert_ ("Top" in Info)
+		self.assertTrue (self.arc._Keys.Depot in Info)
+		self.assertTrue (self.arc._Keys.Workspace in Info)
+		self.assertTrue (self.arc._Keys.Parent in Info)
+		self.assertTrue ("Top" in Info)
 		
 	def test03_getDepot(self):
 		depot = self.arc.getDepot (self.wsDir)
@@ -85,16 +89,16 @@ class TestCase1InWorkspace(BaseTestCase):
 class TestCase2NotInWorkspace (BaseTestCase):
 	
 	def test1_issueCommand(self):
-		self.failUnlessRaises(AccuRevCommand.Usage_Error, self.issueCommand, self.badWsDir)
+		self.assertRaises(AccuRevCommand.Usage_Error, self.issueCommand, self.badWsDir)
 	
 	def test2_getInfo(self):
-		self.failUnlessRaises(AccuRevCommand.Usage_Error, self.getInfo, self.badWsDir)
+		self.assertRaises(AccuRevCommand.Usage_Error, self.getInfo, self.badWsDir)
 		
 	def test3_getDepot(self):
-		self.failUnlessRaises(AccuRevCommand.Usage_Error, self.arc.getDepot, self.badWsDir)
+		self.assertRaises(AccuRevCommand.Usage_Error, self.arc.getDepot, self.badWsDir)
 		
 	def test4_getWorkspace(self):
-		self.failUnlessRaises(AccuRevCommand.Usage_Error, self.arc.getWorkspace, self.badWsDir)
+		self.assertRaises(AccuRevCommand.Usage_Error, self.arc.getWorkspace, self.badWsDir)
 		
 class TestCase3LongTests(BaseTestCase):
 	"""These tests each take a while.
@@ -153,9 +157,105 @@ class TestCase4StateChangers(BaseTestCase):
 class TestCase5Utilities(BaseTestCase):
 			
 	def testCase10_removeDirChildren(self):
-		self.assert_(self.arc._removeDirChildren(["./rational/config/flexlm.dat","./rational"]) == 
+		self.assertTrue(self.arc._removeDirChildren(["./rational/config/flexlm.dat","./rational"]) == 
 					["./rational"])
+		self.assertTrue(self.arc._removeDirChildren(["./a/b", "./a b", "./a/b/c", "./a", "./c/a/d"]) == 
+					["./a b", "./a", "./c/a/d"])
+
+	def testCase15_ElementIndex(self):
+		index = ElementIndex(["/./a", "/./b/c"])
+		self.assertTrue("/./a" in index and "/./b" not in index)
+		self.assertTrue(index.dirOf("/./a/x/y") == "/./a")
+		self.assertTrue(index.dirOf("/./b/c/d") == "/./b/c")
+		self.assertTrue(index.dirOf("/./a") is None)
+		self.assertTrue(index.dirOf("/./ab") is None)
+
+	def testCase20_iterAttributes(self):
+		# Bytes, as Runner gives the output:
+		from io import BytesIO
+		xmlFile = BytesIO (b'<AcResponse><element location="/./a" kind="excl"/>' +
+						b'<element location="/./b"/></AcResponse>')
+		self.assertTrue([element ["location"] for element in self.arc._iterAttributes(xmlFile, "element")] ==
+					["/./a", "/./b"])
+		self.assertTrue(list (self.arc._iterAttributes(BytesIO (b""), "element")) == [])
+		self.assertRaises(SyntaxError, list, self.arc._iterAttributes(BytesIO (b"Not logged in"), "element"))
+
+	def testCase25_StreamGraph(self):
+		graph = StreamGraph([
+							{"name" : "depot", "streamNumber" : "1"},
+							{"name" : "int", "streamNumber" : "2", "basis" : "depot", "basisStreamNumber" : "1"},
+							{"name" : "ws1", "streamNumber" : "3", "basis" : "int", "basisStreamNumber" : "2"},
+							{"name" : "ws2", "streamNumber" : "4", "basis" : "old_int", "basisStreamNumber" : "2"},
+							{"name" : "snap", "streamNumber" : "5", "basis" : "depot", "basisStreamNumber" : "1"}])
+		self.assertTrue(graph.ancestors("ws2") == ["int", "depot"])
+		self.assertTrue(graph.ancestors("depot") == [])
+		self.assertTrue(graph.descendants("depot") == ["int", "snap", "ws1", "ws2"])
+		self.assertTrue(graph.commonAncestor("ws1", "ws2") == "int")
+		self.assertTrue(graph.commonAncestor("ws1", "int") == "int")
+		self.assertTrue(graph.commonAncestor("ws1", "snap") == "depot")
+		self.assertRaises(KeyError, graph.ancestors, "missing")
+		
+class TestCase6Session(unittest.TestCase):
+	"""Counts the clients an AccuRevSession starts, with fake_accurev.
+	"""
+	def setUp(self):
+		unittest.TestCase.setUp(self)
+		self.dir = tempfile.mkdtemp()
+		self.logPath = os.path.join(self.dir, "log")
+		self.savedEnviron = dict(os.environ)
+		os.environ["FAKE_ACCUREV_SCRIPT"] = fake_accurev.writeScript(
+			os.path.join(self.dir, "script"),
+			{"info" : {"output" : "Principal:\tme\nDepot:\t\tdepot\nWorkspace/ref:\tws\n"},
+			"lsrules" : {"output" : '<AcResponse><element kind="excl" location="/./a"/>' +
+						'<element kind="incl" location="/./a/b"/></AcResponse>'},
+			"*" : {}})
+		os.environ["FAKE_ACCUREV_LOG"] = self.logPath
+		self.arc=AccuRevSession(
+							debugOn=False, 
+							effortOnly=False,
+							clientProg=fake_accurev.PATH,
+							maxElementsPerCommand=2)
+
+	def tearDown(self):
+		os.environ.clear()
+		os.environ.update(self.savedEnviron)
+		shutil.rmtree(self.dir)
+		unittest.TestCase.tearDown(self)
+
+	def commandsRun(self):
+		return [args [0] for (args, directory) in fake_accurev.readLog(self.logPath)]
+
+	def test10_info(self):
+		self.assertTrue(self.arc.getDepot(self.dir) == "depot")
+		self.assertTrue(self.arc.getWorkspace(self.dir) == "ws")
+		self.assertTrue(self.commandsRun() == ["info"])
+		self.arc.forget(self.dir)
+		self.arc.getDepot(self.dir)
+		self.assertTrue(self.commandsRun() == ["info", "info"])
+
+	def test20_excludeElements(self):
+		self.arc.excludeElements(self.dir, ["/./a", "/./c", "/./c"])
+		self.assertTrue(self.commandsRun() == ["lsrules", "excl"])
+		self.assertTrue(self.arc.getExcludes(self.dir) == ["/./a", "/./c"])
+
+	def test25_excludeReincludedChild(self):
+		# /./a is excluded, but /./a/b is included again, so /./a/b/x is in the 
+		# workspace and needs its own exclude:
+		for arc in (AccuRevCommand(debugOn=False, effortOnly=False, clientProg=fake_accurev.PATH), 
+					self.arc, self.arc):
+			arc.excludeElement(self.dir, "/./a/b/x")
+		runs = fake_accurev.readLog(self.logPath)
+		self.assertTrue([args for (args, directory) in runs] == 
+					[["lsrules", "-d", "-fx"], ["excl", "/./a/b/x"], 
+					["lsrules", "-d", "-fx"], ["excl", "/./a/b/x"]])
+		self.assertTrue(self.arc.getExcludes(self.dir) == ["/./a", "/./a/b/x"])
+
+	def test30_defunctElements(self):
+		self.arc.defunctElements(self.dir, "comment", ["/./a", "/./a/b", "/./c", "/./d", "/./e"])
+		runs = fake_accurev.readLog(self.logPath)
+		self.assertTrue([args [3:] for (args, directory) in runs] == 
+					[["/./a", "/./c"], ["/./d", "/./e"]])
 		
 if __name__ == '__main__':
 	unittest.main()
-	
\ No newline at end of file
+	
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+'''
+A stand-in for the accurev client, for testing and timing AccuRevCommand without an
+AccuRev server.  It answers from a script, and logs each time it is run, so a test
+can count how many clients it started.
+
+The script is a JSON file named by $FAKE_ACCUREV_SCRIPT:
+
+    {"seconds" : 0.05,
+     "commands" : {
+        "info" : {"output" : "Depot:\\t\\tmy_depot\\n..."},
+        "show" : {"output" : "<AcResponse>...</AcResponse>"},
+        "excl" : {"errors" : "Element excluded\\n"},
+        "*" : {"errors" : "Unknown command\\n", "status" : 1}}}
+
+For each run, the fake waits seconds (to stand in for the client's start up), picks
+the command whose key is the longest match for the start of its arguments (e.g.
+"stat -a -fx -x" before "stat"), or else "*", and writes its output and errors and
+exits with its status (all optional).  If $FAKE_ACCUREV_LOG is set, it appends the
+arguments and directory of the run to that file, one JSON list per line.
+
+writeScript and readLog make and read those files, e.g.:
+
+    os.environ["FAKE_ACCUREV_SCRIPT"] = fake_accurev.writeScript(scriptPath, commands)
+    os.environ["FAKE_ACCUREV_LOG"] = logPath
+    arc = AccuRevSession(debugOn=False, effortOnly=False, clientProg=fake_accurev.PATH)
+    ...
+    runs = fake_accurev.readLog(logPath)
+'''
+import json
+import os
+import sys
+import time
+
+# The script itself, even when imported from a .pyc:
+PATH = os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+
+def writeScript(path, commands, seconds=0):
+    ''' Writes a script for the fake to path, and returns path.
+    '''
+    with open(path, "w") as scriptFile:
+        json.dump({"seconds" : seconds, "commands" : commands}, scriptFile)
+    return path
+
+def readLog(path):
+    ''' Returns the [args, directory] of each run logged in path, oldest first.
+    '''
+    if not os.path.exists(path):
+        return []
+    with open(path) as logFile:
+        return [json.loads(line) for line in logFile]
+
+def findCommand(commands, args):
+    ''' Returns the entry in commands whose key matches the most of args, from the
+    start, or else the "*" entry, or else None.
+    '''
+    for count in range(len(args), 0, -1):
+        key = " ".join(args[:count])
+        if key in commands:
+            return commands[key]
+    return commands.get("*")
+
+def main(args):
+    with open(os.environ["FAKE_ACCUREV_SCRIPT"]) as scriptFile:
+        script = json.load(scriptFile)
+    logPath = os.environ.get("FAKE_ACCUREV_LOG")
+    if logPath:
+        with open(logPath, "a") as logFile:
+            logFile.write(json.dumps([args, os.getcwd()]) + "\n")
+    time.sleep(script.get("seconds", 0))
+    command = findCommand(script.get("commands", {}), args)
+    if command is None:
+        sys.stderr.write("fake_accurev: no command in the script for: " + " ".join(args) + "\n")
+        return 1
+    sys.stdout.write(command.get("output", ""))
+    sys.stderr.write(command.get("errors", ""))
+    return command.get("status", 0)
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
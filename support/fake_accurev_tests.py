@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Tests fake_accurev.py
+"""
+
+# Standard library imports
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add parent dir to path, so we can import from sibling directories:
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+#Local imports
+from support import fake_accurev
+from support.runner import Runner
+
+
+class TestCase(unittest.TestCase):
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.dir = tempfile.mkdtemp()
+        self.logPath = os.path.join(self.dir, "log")
+        self.savedEnviron = dict(os.environ)
+        os.environ["FAKE_ACCUREV_SCRIPT"] = fake_accurev.writeScript(
+            os.path.join(self.dir, "script"),
+            {"info" : {"output" : "Depot:\t\td\n"},
+             "stat" : {"output" : "<AcResponse/>"},
+             "stat -a -fx -x" : {"output" : "<AcResponse><element/></AcResponse>"},
+             "excl" : {"errors" : "No such element\n", "status" : 1}})
+        os.environ["FAKE_ACCUREV_LOG"] = self.logPath
+        self.runner = Runner()
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.savedEnviron)
+        shutil.rmtree(self.dir)
+        unittest.TestCase.tearDown(self)
+
+    def test_findCommand(self):
+        commands = {"stat" : 1, "stat -a" : 2, "*" : 3}
+        self.assertEqual(fake_accurev.findCommand(commands, ["stat", "-a", "-x"]), 2)
+        self.assertEqual(fake_accurev.findCommand(commands, ["stat", "-x"]), 1)
+        self.assertEqual(fake_accurev.findCommand(commands, ["info"]), 3)
+        self.assertEqual(fake_accurev.findCommand({}, ["info"]), None)
+
+    def test_run(self):
+        (output, errors) = self.runner.popenOrLog([fake_accurev.PATH, "info"], self.dir)
+        self.assertEqual(output, b"Depot:\t\td\n")
+        (output, errors) = self.runner.popenOrLog([fake_accurev.PATH, "stat", "-a", "-fx", "-x"])
+        self.assertEqual(output, b"<AcResponse><element/></AcResponse>")
+        self.assertEqual(fake_accurev.readLog(self.logPath),
+                         [[["info"], os.path.realpath(self.dir)],
+                          [["stat", "-a", "-fx", "-x"], os.getcwd()]])
+
+    def test_errors(self):
+        with self.runner.popenStreamOrLog([fake_accurev.PATH, "excl", "/./a"]) as stream:
+            self.assertEqual(stream.output.read(), b"")
+        self.assertEqual(stream.finish(), b"No such element\n")
+        self.assertEqual(stream.returncode, 1)
+        with self.runner.popenStreamOrLog([fake_accurev.PATH, "update"]) as stream:
+            pass
+        self.assertTrue(b"no command in the script" in stream.finish())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,30 @@
 """Contains the Runner class, which supports effort-only behavior by logging a 
 command instead of running it.
+
+Besides exec'ing command strings, Runner does the common file operations (copy,
+symlink, link, remove, rmtree, makedirs) directly on their arguments, singly or
+in a Batch, so that paths need no quoting and nothing is compiled:
+
+    runner.copyOrLog(source, target)
+
+    with runner.batch() as batch:
+        batch.makedirs(targetDir)
+        batch.copy(source, target)
+
+Its coroutines popen and call run commands without blocking, so that independent
+commands can overlap, at most maxConcurrent at a time:
+
+    runner = Runner(maxConcurrent=4)
+    results = runner.runAll(*[runner.popen(args, directory) for args in argsList])
 """
 
 # Standard library imports
+import asyncio
+import io
 import os
+import shutil
 import subprocess
+import tempfile
 
 #Local imports
 from .local_logging import Logger
@@ -38,6 +58,26 @@ def _check_call_info(args, directory):
 #        (str(args), str(os.environ), str(directory))
 
 
+# The file operations Runner.doOrLog and Batch do, with the names they are logged as:
+_FILE_OPERATIONS = {
+    "copy": ("shutil.copy2", shutil.copy2),
+    "symlink": ("os.symlink", os.symlink),
+    "link": ("os.link", os.link),
+    "remove": ("os.remove", os.remove),
+    "rmtree": ("shutil.rmtree", shutil.rmtree),
+    "makedirs": ("os.makedirs", os.makedirs),
+}
+
+
+def _operation_info(operation, args):
+    return "%s(%s)" % \
+           (_FILE_OPERATIONS[operation][0], ", ".join(repr(arg) for arg in args))
+
+
+def _batch_info(batch):
+    return "\n".join(_operation_info(operation, args) for operation, args in batch.operations)
+
+
 def _exception_info(e):
     return '%s args:%s' % (type(e), str(e))
 
@@ -50,15 +90,19 @@ class Runner:
     class Failed(Exception):
         pass
 
-    def __init__(self, effortOnly=False):
+    def __init__(self, effortOnly=False, maxConcurrent=None):
         self._effortOnly = effortOnly
         self._logger = Logger(
             name='support.runner.Runner',
             level=Logger.DEBUG)
+        self.setMaxConcurrent(maxConcurrent)
 
     def setEffortOnly(self, effortOnly):
         self._effortOnly = effortOnly
 
+    def isEffortOnly(self):
+        return self._effortOnly
+
     # exec ---------------------------------------------------------------------
 
     def execOrLog(self, command, globals=None, locals=None, doReraise=False):
@@ -144,6 +188,42 @@ class Runner:
             raise self.Failed() from e
         return output, errors
 
+    # streaming Popen ----------------------------------------------------------
+
+    def popenStreamOrLog(self, callArgs, directory=None):
+        """Like popenOrLog, but returns a PopenStream as soon as the command
+        starts, so that the caller can read the output as the command writes it,
+        instead of all at once when it finishes.  In effort-only mode, the output
+        is empty.
+        """
+        info_message = "\n%s" % _popen_info(callArgs, directory)
+        if self._effortOnly:
+            self._logger.info("Would do:%s" % info_message)
+            return PopenStream(None)
+        else:
+            self._logger.info("Doing:%s" % info_message)
+            return self.tryPopenStream(callArgs, directory)
+
+    def tryPopenStream(self, callArgs, directory=None):
+        """Starts the command in callArgs and returns its PopenStream.  Raises
+        Runner.Failed if Popen raises OSError.
+        """
+        # A file, not a pipe, so the command never waits for its errors to be
+        # read while the caller is reading its output:
+        errors = tempfile.TemporaryFile()
+        try:
+            process = subprocess.Popen(
+                args=callArgs,
+                env=os.environ,
+                cwd=directory,
+                stdout=subprocess.PIPE,
+                stderr=errors)
+        except OSError as e:
+            errors.close()
+            # Raise without the message, as tryPopen does:
+            raise self.Failed() from e
+        return PopenStream(process, errors)
+
     # check_call ---------------------------------------------------------------
 
     def callOrLog(self, callArgs, directory=None):
@@ -177,8 +257,293 @@ class Runner:
             # Raise without the message, since we already logged it:
             raise self.Failed() from e
 
+    # asyncio ------------------------------------------------------------------
+
+    def setMaxConcurrent(self, maxConcurrent):
+        """Limits the commands that popen and call run at the same time to
+        maxConcurrent, or not at all if it is None.
+        """
+        self._maxConcurrent = maxConcurrent
+        self._limiter = None
+
+    def _limit(self):
+        """Returns the limiter for the running event loop, for "async with".
+        """
+        if self._maxConcurrent is None:
+            return _NO_LIMIT
+        loop = asyncio.get_running_loop()
+        # A semaphore belongs to the loop it is first used in:
+        if self._limiter is None or self._limiter[0] is not loop:
+            self._limiter = (loop, asyncio.Semaphore(self._maxConcurrent))
+        return self._limiter[1]
+
+    async def popen(self, callArgs, directory=None):
+        """Like popenOrLog, but a coroutine, so that other commands can run while
+        this one does.
+        """
+        info_message = "\n%s" % _popen_info(callArgs, directory)
+        if self._effortOnly:
+            self._logger.info("Would do:%s" % info_message)
+            # Caller expects a tuple:
+            return "", ""
+        else:
+            self._logger.info("Doing:%s" % info_message)
+            return await self.tryPopenAsync(callArgs, directory)
+
+    async def tryPopenAsync(self, callArgs, directory=None):
+        """Like tryPopen, but waits for a turn under maxConcurrent first.
+        """
+        async with self._limit():
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *callArgs,
+                    env=os.environ,
+                    cwd=directory,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE)
+            except OSError as e:
+                # Raise without the message, as tryPopen does:
+                raise self.Failed() from e
+            return await process.communicate()
+
+    async def call(self, callArgs, directory=None):
+        """Like callOrLog, but a coroutine, so that other commands can run while
+        this one does.  The command's output and errors go to the logger's stream
+        as it writes them, as with callOrLog, but a line at a time, so the lines of
+        concurrent commands may be interleaved.
+        """
+        info_message = "\n%s" % _check_call_info(callArgs, directory)
+        if self._effortOnly:
+            self._logger.info("Would do:%s" % info_message)
+        else:
+            self._logger.info("Doing:%s" % info_message)
+            await self.tryCallAsync(callArgs, directory)
+
+    async def tryCallAsync(self, callArgs, directory=None):
+        """Like tryCall, but waits for a turn under maxConcurrent first, and
+        copies the command's output and errors to the logger's stream a line at a
+        time, instead of handing it the stream.
+        """
+        async with self._limit():
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *callArgs,
+                    env=os.environ,
+                    cwd=directory,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT)
+            except OSError as e:
+                raise self.Failed() from e
+            stream = self._logger.get_stream()
+            async for line in process.stdout:
+                stream.write(line.decode(errors="replace"))
+                stream.flush()
+            await process.wait()
+        if process.returncode != 0:
+            raise self.Failed() from subprocess.CalledProcessError(
+                process.returncode, callArgs)
+
+    async def gather(self, *awaitables):
+        """Awaits all of awaitables at once, and returns their results in order.
+        Raises the first exception any of them raises.
+        """
+        return await asyncio.gather(*awaitables)
+
+    def runAll(self, *awaitables):
+        """For synchronous callers: runs gather(*awaitables) in a new event loop,
+        and returns the results.  Coroutines, e.g. popen(...), only start running
+        here.
+        """
+        return asyncio.run(self.gather(*awaitables))
+
+    # file operations ----------------------------------------------------------
+
+    def doOrLog(self, operation, *args, doReraise=False):
+        """Does operation (a key of _FILE_OPERATIONS, e.g. "copy") on args,
+        without building and exec'ing a command string.
+        """
+        info_message = "\n%s" % _operation_info(operation, args)
+        if self._effortOnly:
+            self._logger.info("Would do:%s" % info_message)
+        else:
+            self._logger.info("Doing:%s" % info_message)
+            self.tryDo(operation, args, doReraise)
+
+    def tryDo(self, operation, args, doReraise=False):
+        """Does operation on args.  Logs any Exception, and then continues, or
+        raises Runner.Failed if doReraise, like tryExec.
+        """
+        try:
+            _FILE_OPERATIONS[operation][1](*args)
+        except Exception as e:
+            message = _exception_message(e, _operation_info(operation, args))
+            self._logger.exception(message)
+            if doReraise:
+                self._logger.error("Raising Runner.Failed")
+                raise self.Failed(message) from e
+            else:
+                self._logger.info("Continuing...")
+
+    def copyOrLog(self, source, target, doReraise=False):
+        """Copies source to target with its attributes, like shutil.copy2.
+        """
+        self.doOrLog("copy", source, target, doReraise=doReraise)
+
+    def symlinkOrLog(self, source, target, doReraise=False):
+        self.doOrLog("symlink", source, target, doReraise=doReraise)
+
+    def linkOrLog(self, source, target, doReraise=False):
+        self.doOrLog("link", source, target, doReraise=doReraise)
+
+    def removeOrLog(self, path, doReraise=False):
+        self.doOrLog("remove", path, doReraise=doReraise)
+
+    def rmtreeOrLog(self, path, doReraise=False):
+        self.doOrLog("rmtree", path, doReraise=doReraise)
+
+    def makedirsOrLog(self, path, doReraise=False):
+        self.doOrLog("makedirs", path, doReraise=doReraise)
+
+    # batches ------------------------------------------------------------------
+
+    def batch(self, doReraise=False):
+        """Returns a new, empty Batch that runs with this runner.
+        """
+        return Batch(self, doReraise)
+
+    def runBatchOrLog(self, batch, doReraise=False):
+        """Logs all the operations in batch as one message, and then does them
+        in order.  In effort-only mode, the message is the plan.  With
+        doReraise, stops at the first failure.
+        """
+        if not batch.operations:
+            return
+        info_message = " %d file operations:\n%s" % (len(batch.operations), _batch_info(batch))
+        if self._effortOnly:
+            self._logger.info("Would do%s" % info_message)
+        else:
+            self._logger.info("Doing%s" % info_message)
+            for operation, args in batch.operations:
+                self.tryDo(operation, args, doReraise)
+
     # Synonyms
     runOrLog = execOrLog
 
 
+class _NoLimit:
+    """The limiter when there is no maxConcurrent.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_LIMIT = _NoLimit()
+
+
+class Batch:
+    """File operations to be done (or, in effort-only mode, logged) together by
+    Runner.runBatchOrLog.  As a context manager, runs when the with block ends,
+    unless it ends with an exception.
+    """
+
+    def __init__(self, runner, doReraise=False):
+        self._runner = runner
+        self._doReraise = doReraise
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.run()
+        return False
+
+    def add(self, operation, *args):
+        if operation not in _FILE_OPERATIONS:
+            raise ValueError("unknown file operation %r" % (operation,))
+        self.operations.append((operation, args))
+
+    def copy(self, source, target):
+        self.add("copy", source, target)
+
+    def symlink(self, source, target):
+        self.add("symlink", source, target)
+
+    def link(self, source, target):
+        self.add("link", source, target)
+
+    def remove(self, path):
+        self.add("remove", path)
+
+    def rmtree(self, path):
+        self.add("rmtree", path)
+
+    def makedirs(self, path):
+        self.add("makedirs", path)
+
+    def run(self):
+        """Runs the operations, and empties the batch.
+        """
+        try:
+            self._runner.runBatchOrLog(self, self._doReraise)
+        finally:
+            self.operations = []
+
+
+class PopenStream:
+    """A command started by Runner.popenStreamOrLog.  Read its output from the
+    output file as the command writes it, and then call finish.  As a context
+    manager, finishes when the with block ends.
+    """
+
+    def __init__(self, process, errors=None):
+        self._process = process
+        self._errorsFile = errors
+        self._errors = None
+        if process is None:
+            self.output = io.BytesIO()
+        else:
+            self.output = process.stdout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish()
+        return False
+
+    def finish(self):
+        """Closes the output, waits for the command to end, and returns its
+        errors, as popenOrLog does.  Output left unread is discarded: the command
+        gets a broken pipe if it writes more.
+        """
+        if self._errors is None:
+            self.output.close()
+            if self._process is None:
+                # As popenOrLog returns in effort-only mode:
+                self._errors = ""
+            else:
+                self._process.wait()
+                self._errorsFile.seek(0)
+                self._errors = self._errorsFile.read()
+                self._errorsFile.close()
+        return self._errors
+
+    @property
+    def returncode(self):
+        """The command's exit status, once finished (None in effort-only mode).
+        """
+        if self._process is None:
+            return None
+        return self._process.returncode
+
+
 runner = Runner()
@@ -3,8 +3,13 @@
 """
 
 # Standard library imports
+import asyncio
+import io
 import os
+import shutil
 import sys
+import tempfile
+import time
 import unittest
 
 # Add parent dir to path, so we can import from sibling directories:
@@ -34,6 +39,7 @@ class TestCase1ExecOrLog(unittest.TestCase):
         self.logger.info("test01_EffortOnly: Exercising execOrLog with effortOnly=True.")
         self.logger.info("Command should not execute.")
         self.runner.setEffortOnly(True)
+        self.assertTrue(self.runner.isEffortOnly())
         self.runner.execOrLog(self.command)
 
     def test02_DoIt(self):
@@ -180,6 +186,131 @@ class TestCase4Popen(unittest.TestCase):
             self.runner.popenOrLog, self.args, self.badDir)
 
 
+class TestCase4aPopenStream(unittest.TestCase):
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.logger = Logger("support.runner_tests.TestCase4aPopenStream")
+        self.runner = Runner()
+        self.dir = "/"
+        self.args = [sys.executable, "-c",
+                     "import sys\n"
+                     "for i in range(3): print('line %d' % i)\n"
+                     "sys.stderr.write('error')"]
+        self.badArgs = ["nosuchprog", ]
+        self.logger.info("")
+
+    def tearDown(self):
+        self.runner = None
+        unittest.TestCase.tearDown(self)
+
+    def test01_EffortOnly(self):
+        self.logger.info("test01_EffortOnly: Exercising popenStreamOrLog with effortOnly=True.")
+        self.runner.setEffortOnly(True)
+        with self.runner.popenStreamOrLog(self.args, self.dir) as stream:
+            self.assertEqual(stream.output.read(), b"")
+        self.assertEqual(stream.finish(), "")
+        self.assertEqual(stream.returncode, None)
+
+    def test02_DoIt(self):
+        self.logger.info("test02_DoIt: Exercising popenStreamOrLog with effortOnly=False.")
+        self.runner.setEffortOnly(False)
+        stream = self.runner.popenStreamOrLog(self.args, self.dir)
+        # Readable before the command finishes:
+        self.assertEqual(stream.output.readline().strip(), b"line 0")
+        self.assertEqual([line.strip() for line in stream.output], [b"line 1", b"line 2"])
+        self.assertEqual(stream.finish(), b"error")
+        self.assertEqual(stream.finish(), b"error")
+        self.assertEqual(stream.returncode, 0)
+
+    def test04_ReraiseExcep(self):
+        self.logger.info("test04_ReraiseExcep: Exercising popenStreamOrLog with bad args.")
+        self.assertRaises(
+            Runner.Failed,
+            self.runner.popenStreamOrLog, self.badArgs, self.dir)
+
+
+class TestCase4bAsync(unittest.TestCase):
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.logger = Logger("support.runner_tests.TestCase4bAsync")
+        self.runner = Runner()
+        self.dir = "/"
+        self.args = [sys.executable, "-c", "print('foo')"]
+        self.sleepArgs = [sys.executable, "-c", "import time; time.sleep(0.5)"]
+        self.failArgs = [sys.executable, "-c", "import sys; sys.exit(1)"]
+        self.badArgs = ["nosuchprog", ]
+        self.logger.info("")
+
+    def tearDown(self):
+        self.runner = None
+        unittest.TestCase.tearDown(self)
+
+    def runTimed(self, *coroutines):
+        start = time.time()
+        results = self.runner.runAll(*coroutines)
+        return results, time.time() - start
+
+    def test01_EffortOnly(self):
+        self.logger.info("test01_EffortOnly: Exercising popen and call with effortOnly=True.")
+        self.logger.info("Commands should not execute.")
+        self.runner.setEffortOnly(True)
+        results = self.runner.runAll(
+            self.runner.popen(self.badArgs, self.dir),
+            self.runner.call(self.badArgs, self.dir))
+        self.assertEqual(results, [("", ""), None])
+
+    def test02_DoIt(self):
+        self.logger.info("test02_DoIt: Exercising popen and call with effortOnly=False.")
+        self.runner.setEffortOnly(False)
+        results = self.runner.runAll(
+            self.runner.popen(self.args, self.dir),
+            self.runner.call(self.args, self.dir))
+        self.assertEqual(results[0][0].strip(), b"foo")
+        self.assertEqual(results[1], None)
+
+    def test03_Concurrent(self):
+        self.logger.info("test03_Concurrent: Exercising popen with and without maxConcurrent.")
+        (results, seconds) = self.runTimed(*[self.runner.popen(self.sleepArgs) for _ in range(3)])
+        self.assertEqual(len(results), 3)
+        self.assertTrue(seconds < 1.2, seconds)
+        self.runner.setMaxConcurrent(1)
+        (results, seconds) = self.runTimed(*[self.runner.popen(self.sleepArgs) for _ in range(3)])
+        self.assertTrue(seconds >= 1.5, seconds)
+
+    def test04_ReraiseExcep(self):
+        self.logger.info("test04_ReraiseExcep: Exercising popen and call with bad args.")
+        self.logger.info("Runner.Failed should be raised.")
+        self.assertRaises(
+            Runner.Failed,
+            self.runner.runAll, self.runner.popen(self.badArgs, self.dir))
+        self.assertRaises(
+            Runner.Failed,
+            self.runner.runAll, self.runner.call(self.failArgs, self.dir))
+
+    def test05_CallLogsOutput(self):
+        self.logger.info("test05_CallLogsOutput: Exercising call on a failing command.")
+        self.logger.info("Its output and errors should be logged as it writes them.")
+        log = io.StringIO()
+        self.runner._logger = Logger("support.runner_tests.TestCase4bAsync.call", stream=log)
+        failArgs = [sys.executable, "-c",
+                    "import sys, time; print('out', flush=True); time.sleep(1); "
+                    "sys.stderr.write('err\\n'); sys.exit(1)"]
+
+        async def logSoFar():
+            await asyncio.sleep(0.5)
+            return log.getvalue()
+
+        async def both():
+            return await asyncio.gather(
+                self.runner.call(failArgs, self.dir), logSoFar(), return_exceptions=True)
+
+        (failure, soFar) = asyncio.run(both())
+        self.assertIsInstance(failure, Runner.Failed)
+        self.assertIn("out\n", soFar)
+        self.assertNotIn("\nerr\n", soFar)
+        self.assertIn("out\nerr\n", log.getvalue())
+
+
 class TestCase5Call(unittest.TestCase):
     def setUp(self):
         unittest.TestCase.setUp(self)
@@ -229,5 +360,89 @@ class TestCase5Call(unittest.TestCase):
             self.runner.callOrLog, self.args, self.badDir)
 
 
+
+class TestCase6FileOperations(unittest.TestCase):
+    def setUp(self):
+        unittest.TestCase.setUp(self)
+        self.logger = Logger("support.runner_tests.TestCase6FileOperations")
+        self.runner = Runner()
+        self.dir = tempfile.mkdtemp()
+        # A quote in a path broke the exec'd command strings:
+        self.source = os.path.join(self.dir, 'it\'s "source"')
+        with open(self.source, "w") as source:
+            source.write("foo")
+        self.logger.info("")
+
+    def tearDown(self):
+        self.runner = None
+        shutil.rmtree(self.dir)
+        unittest.TestCase.tearDown(self)
+
+    def path(self, *names):
+        return os.path.join(self.dir, *names)
+
+    def test01_EffortOnly(self):
+        self.logger.info("test01_EffortOnly: Exercising the file operations with effortOnly=True.")
+        self.logger.info("Nothing should change.")
+        self.runner.setEffortOnly(True)
+        self.runner.copyOrLog(self.source, self.path("copy"))
+        self.runner.makedirsOrLog(self.path("a", "b"))
+        self.runner.removeOrLog(self.source)
+        self.assertEqual(os.listdir(self.dir), [os.path.basename(self.source)])
+
+    def test02_DoIt(self):
+        self.logger.info("test02_DoIt: Exercising the file operations with effortOnly=False.")
+        self.runner.makedirsOrLog(self.path("a", "b"))
+        self.runner.copyOrLog(self.source, self.path("a", "b", "copy"))
+        self.runner.symlinkOrLog(self.source, self.path("symlink"))
+        self.runner.linkOrLog(self.source, self.path("link"))
+        for path in (self.path("a", "b", "copy"), self.path("symlink"), self.path("link")):
+            with open(path) as target:
+                self.assertEqual(target.read(), "foo")
+        self.assertTrue(os.path.islink(self.path("symlink")))
+        self.runner.removeOrLog(self.path("link"))
+        self.runner.rmtreeOrLog(self.path("a"))
+        self.assertFalse(os.path.exists(self.path("a")))
+        self.assertFalse(os.path.exists(self.path("link")))
+
+    def test03_HandleExcep(self):
+        self.logger.info("test03_HandleExcep: Exercising removeOrLog on a missing file.")
+        self.logger.info("Last log should be: '--- (support.runner.Runner) Continuing...'")
+        self.runner.removeOrLog(self.path("nosuchfile"))
+
+    def test04_ReraiseExcep(self):
+        self.logger.info("test04_ReraiseExcep: Exercising removeOrLog on a missing file with doReraise=True.")
+        self.assertRaises(
+            Runner.Failed,
+            self.runner.removeOrLog, self.path("nosuchfile"), doReraise=True)
+        self.assertRaises(
+            ValueError,
+            self.runner.batch().add, "chmod", self.source)
+
+    def test05_Batch(self):
+        self.logger.info("test05_Batch: Exercising a batch, with effortOnly=True and then False.")
+        self.runner.setEffortOnly(True)
+        with self.runner.batch() as batch:
+            batch.makedirs(self.path("a"))
+            batch.copy(self.source, self.path("a", "copy"))
+            self.assertEqual(len(batch), 2)
+        self.assertEqual(len(batch), 0)
+        self.assertFalse(os.path.exists(self.path("a")))
+        self.runner.setEffortOnly(False)
+        with self.runner.batch() as batch:
+            batch.makedirs(self.path("a"))
+            batch.copy(self.source, self.path("a", "copy"))
+            batch.remove(self.path("nosuchfile"))
+            batch.symlink("copy", self.path("a", "symlink"))
+        with open(self.path("a", "symlink")) as target:
+            self.assertEqual(target.read(), "foo")
+        # Stops at the first failure with doReraise:
+        batch = self.runner.batch(doReraise=True)
+        batch.remove(self.path("nosuchfile"))
+        batch.rmtree(self.path("a"))
+        self.assertRaises(Runner.Failed, batch.run)
+        self.assertTrue(os.path.exists(self.path("a")))
+
+
 if __name__ == "__main__":
     unittest.main()
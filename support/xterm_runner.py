@@ -4,6 +4,7 @@ command in an xterm.
 '''
 from support.runner import Runner
 
+import asyncio
 import os
 import subprocess
 
@@ -11,8 +12,13 @@ class XtermRunner(Runner):
     ''' Extends Runner to run a command in an xterm.
     '''
 
-    def __init__(self, effortOnly=False):
-        Runner.__init__ (self, effortOnly)
+    def __init__(self, effortOnly=False, maxConcurrent=None):
+        Runner.__init__ (self, effortOnly, maxConcurrent)
+
+    def _commandMessage(self, popenArgs, run_dir=None):
+        """The command line in popenArgs, and where it runs, for the log.
+        """
+        return " ".join(popenArgs) + " (in " + str(run_dir) + ")"
         
     def xtermOrLog(self, xtermArgs, popenArgs, run_dir=None):
 #        xtermArgs = ["-geometry", "90x40"]
@@ -26,6 +32,27 @@ class XtermRunner(Runner):
             self._logger.info(self._commandMessage(popenArgs, run_dir))
             return self.tryXterm(popenArgs, run_dir)
 
+    async def xterm(self, xtermArgs, popenArgs, run_dir=None):
+        """Like xtermOrLog, but a coroutine, so that other commands can run 
+        while the xterm is open.
+        """
+        popenArgs = ["xterm", "-hold"] + xtermArgs + ["-e",] + popenArgs
+        if self._effortOnly:
+            self._logger.info("Would do " + self._commandMessage(popenArgs, run_dir))
+            return ("", "")
+        else:
+            self._logger.info(self._commandMessage(popenArgs, run_dir))
+            async with self._limit():
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                                          *popenArgs, 
+                                          env = os.environ, 
+                                          cwd = run_dir)
+                except OSError as e:
+                    # Raise without the message, as Runner.tryPopen does:
+                    raise self.Failed () from e
+                return await process.communicate()
+
     def tryXterm(self, popenArgs, run_dir=None):
         """Issue the command associated with the given Popen arguments list.
         Does not return the results of the command.
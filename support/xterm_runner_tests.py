@@ -34,6 +34,18 @@ class TestCase1(unittest.TestCase):
 #        self.assertTrue(output=="")
 #        self.assertTrue(errors=="")
         
+    def test01a_EffortOnlyAsync(self):
+        self.logger.log("Exercising xterm with effortOnly=True.  Command should not execute.")
+        self.runner.setEffortOnly(True)
+        self.assertEqual(
+                        self.runner.runAll(self.runner.xterm(self.xtermArgs1, self.popenArgs, self.dir)),
+                        [("", "")])
+        
+    def test01b_MaxConcurrent(self):
+        self.logger.log("Exercising maxConcurrent passed to XtermRunner.")
+        self.assertEqual(XtermRunner(maxConcurrent=2)._maxConcurrent, 2)
+        self.assertEqual(self.runner._maxConcurrent, None)
+        
     def test02_DoIt(self):
         self.logger.log("Exercising effortOnly=False.  Command should execute.")
         self.runner.setEffortOnly(False)
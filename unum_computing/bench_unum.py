@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+""" Benchmarks for the unum conversion and view layer.
+
+Times setenv across all (esizesize, fsizesize) pairs, x2u and u2f on random
+and adversarial inputs (subnormals, values near maxreal, exact powers of
+two), u2g and ubound2g, and utagview rendering.
+
+Results are written one JSON object per line: first a header describing
+the run (git commit, python version, settings), then one line per
+benchmark, with the best time per call over the repeats.  Inputs come from
+a seeded random.Random, so two runs time the same work and their output
+files can be compared with --compare:
+
+    python bench_unum.py -o before.txt
+    (change something)
+    python bench_unum.py -o after.txt
+    python bench_unum.py --compare before.txt after.txt
+
+A benchmark whose function raises is recorded with an "error" instead of
+timings, so one broken primitive does not hide the rest.
+"""
+
+import fractions
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+from argparse import ArgumentParser
+
+# Add this dir to path, so we can import the unum package in it:
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import unum
+
+# Every environment this prototype supports:
+ALL_ENVS = [(e, f) for e in range(0, 5) for f in range(0, 12)]
+# Environments whose values u2f and u2g can still return as floats:
+DEFAULT_ENVS = [(0, 0), (1, 1), (2, 2), (2, 3), (3, 4), (3, 5), (3, 7)]
+
+class Options(object):
+    """ Benchmark settings; see _parse_args.
+    """
+    def __init__(self, envs=None, count=200, repeat=5, seed=1):
+        self.envs = envs or DEFAULT_ENVS
+        self.count = count
+        self.repeat = repeat
+        self.seed = seed
+
+# Inputs.  Each returns count values for env, from the seeded rng.
+
+def random_xs(env, rng, count):
+    """ Floats spread evenly over the exponent range of env, both signs.
+    """
+    lo = max(unum.scale(env.smallnormal), -1022)
+    hi = min(unum.scale(env.maxreal), 1023)
+    return [rng.choice((-1, 1)) * rng.uniform(1, 2) * 2.0**rng.randint(lo, hi)
+            for _i in range(count)]
+
+def subnormal_xs(env, rng, count):
+    """ Exact multiples of smallsubnormal, and values between them, as
+    Fractions so that they do not underflow.
+    """
+    smallsubnormal = fractions.Fraction(2)**(2 - 2**(env.esizemax - 1) - env.fsizemax)
+    kmax = 2**env.fsizemax
+    return [rng.randint(1, kmax) * smallsubnormal / rng.choice((1, 1, 3))
+            for _i in range(count)]
+
+def near_maxreal_xs(env, rng, count):
+    """ Values within a few ULPs either side of maxreal, as Fractions.
+    """
+    ulp = fractions.Fraction(env.maxreal) / 2**(env.fsizemax + 1)
+    return [env.maxreal + rng.randint(-4, 4) * ulp / rng.choice((1, 2))
+            for _i in range(count)]
+
+def power_of_two_xs(env, rng, count):
+    """ Exact powers of two, from smallsubnormal to maxreal.
+    """
+    lo = unum.scale(fractions.Fraction(env.smallsubnormal)) if env.smallsubnormal else -1074
+    hi = unum.scale(env.maxreal)
+    return [rng.choice((-1, 1)) * fractions.Fraction(2)**rng.randint(lo, hi)
+            for _i in range(count)]
+
+INPUTS = (
+    ('random', random_xs),
+    ('subnormal', subnormal_xs),
+    ('near_maxreal', near_maxreal_xs),
+    ('power_of_two', power_of_two_xs),
+)
+
+# Benchmarks.  Each generates (name, env, calls, fn, args) cases, where
+# fn(*args) is one timed run making calls calls to the primitive.
+
+def _each(fn, items, env):
+    for item in items:
+        fn(item, env)
+
+def _times(fn, args, count):
+    for _i in xrange(count):
+        fn(*args)
+
+def setenv_cases(options, rng):
+    """ setenv for every environment: building it the first time, and then
+    switching to it again (from the cache).
+    """
+    for ef in ALL_ENVS:
+        yield 'UnumEnv', ef, options.count, _times, (unum.UnumEnv, ef, options.count)
+    for ef in ALL_ENVS:
+        yield 'setenv', ef, options.count, _times, (unum.setenv, (ef,), options.count)
+
+def conversion_cases(options, rng):
+    """ x2u, u2f, u2g, ubound2g and utagview, for each input kind.  (Not
+    unumview: it builds Mathematica Grid/StringForm expressions that don't
+    exist here, so it can't render yet.)
+    """
+    for ef in options.envs:
+        env = unum.getenv(ef)
+        for kind, make_xs in INPUTS:
+            xs = make_xs(env, rng, options.count)
+            us = [unum.x2u(x, env) for x in xs]
+            yield 'x2u/%s' % kind, ef, len(xs), _each, (unum.x2u, xs, env)
+            exact = [u for u in us if not unum.inexQ(u, env)]
+            if exact:
+                yield 'u2f/%s' % kind, ef, len(exact), _each, (unum.u2f, exact, env)
+            yield 'u2g/%s' % kind, ef, len(us), _each, (unum.u2g, us, env)
+            ubs = [unum.g2u([sorted(pair), [unum.closed, unum.closed]], env)
+                   for pair in zip(xs, xs[1:])]
+            yield 'ubound2g/%s' % kind, ef, len(ubs), _each, (unum.ubound2g, ubs, env)
+        us = [unum.x2u(x, env) for x in random_xs(env, rng, options.count)]
+        yield 'utagview', ef, len(us), _each, (unum.utagview, us, env)
+
+BENCHMARKS = (setenv_cases, conversion_cases)
+
+# Running.
+
+def _time(fn, args, repeat):
+    """ Best time over repeat runs of fn(*args), after one untimed run.
+    """
+    fn(*args)
+    return min(timeit.Timer(lambda: fn(*args)).repeat(repeat, 1))
+
+def run(options):
+    """ Generate the benchmark results for options, one dict per benchmark.
+    """
+    old_ef = (unum.esizesize, unum.fsizesize)
+    rng = random.Random(options.seed)
+    try:
+        for cases in BENCHMARKS:
+            for name, ef, calls, fn, args in cases(options, rng):
+                result = {'name': name, 'env': list(ef)}
+                try:
+                    seconds = _time(fn, args, options.repeat)
+                except Exception as e:
+                    result['error'] = '%s: %s' % (type(e).__name__, e)
+                else:
+                    result['calls'] = calls
+                    result['seconds'] = seconds
+                    result['usec_per_call'] = seconds * 1e6 / calls
+                yield result
+    finally:
+        unum.setenv(old_ef)
+
+def header(options):
+    """ What the results were measured on.
+    """
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=SCRIPT_DIR,
+            stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'benchmark': 'unum',
+        'commit': commit,
+        'python': platform.python_version(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'envs': [list(ef) for ef in options.envs],
+        'count': options.count,
+        'repeat': options.repeat,
+        'seed': options.seed,
+    }
+
+def write(options, out):
+    out.write(json.dumps(header(options), sort_keys=True) + '\n')
+    for result in run(options):
+        out.write(json.dumps(result, sort_keys=True) + '\n')
+        out.flush()
+
+def read(path):
+    """ The header and results from a file written by write.
+    """
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    return lines[0], lines[1:]
+
+def compare(old_path, new_path, out):
+    """ Print new/old time ratios for the benchmarks in both files, slowest
+    ratio first.
+    """
+    old_header, old_results = read(old_path)
+    new_header, new_results = read(new_path)
+    old = dict(((r['name'], tuple(r['env'])), r) for r in old_results)
+    rows = []
+    for r in new_results:
+        key = (r['name'], tuple(r['env']))
+        if key in old and 'seconds' in r and 'seconds' in old[key]:
+            rows.append((r['seconds'] / old[key]['seconds'], key))
+    rows.sort(reverse=True)
+    out.write('old: %s\nnew: %s\n' % (old_header['commit'], new_header['commit']))
+    for ratio, (name, ef) in rows:
+        out.write('%6.2fx  %-24s %s\n' % (ratio, name, ef))
+
+def _parse_env(s):
+    e, f = s.split(',')
+    return int(e), int(f)
+
+def _parse_args(argv):
+    parser = ArgumentParser(description='Time the unum conversion and view layer.')
+    parser.add_argument('-o', '--output', default='bench_output.txt',
+                        help='file to write the results to, or - for stdout')
+    parser.add_argument('-e', '--env', dest='envs', action='append', type=_parse_env,
+                        metavar='E,F', help='environment to time conversions in (repeatable)')
+    parser.add_argument('-n', '--count', type=int, default=200,
+                        help='inputs per benchmark')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='timings per benchmark; the best is kept')
+    parser.add_argument('-s', '--seed', type=int, default=1)
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two results files instead of running')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.compare:
+        compare(args.compare[0], args.compare[1], sys.stdout)
+    else:
+        options = Options(args.envs, args.count, args.repeat, args.seed)
+        if args.output == '-':
+            write(options, sys.stdout)
+        else:
+            with open(args.output, 'w') as out:
+                write(options, out)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+""" This module tests:
+g2u
+plusg, minusg, timesg, divideg
+plusu, minusu, timesu, divideu
+"""
+
+import fractions
+import itertools
+import unittest
+import unum
+from unum import arith, open, closed
+
+class TestArith(unittest.TestCase):
+
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+        arith.setcachesize(2**16)
+
+    def tearDown(self):
+        arith.setcachesize(2**16)
+        unum.setenv ((self.old_e, self.old_f))
+
+    def test_10_g2u(self):
+        unum.setenv((3, 4))
+        self.assertEqual(unum.g2u(unum.f2g(1.5)), [unum.x2u(1.5)])
+        self.assertEqual(unum.g2u([[1.0, 2.0], [closed, closed]]), [unum.x2u(1.0), unum.x2u(2.0)])
+        self.assertEqual(unum.u2g(unum.g2u([[1.0, 2.0], [open, open]])), [[1.0, 2.0], [open, open]])
+        self.assertEqual(unum.u2g(unum.g2u([[-2.0, 0.0], [open, open]])), [[-2.0, 0.0], [open, open]])
+        self.assertEqual(unum.u2g(unum.g2u([[unum.NegInfinity, unum.Infinity], [open, open]])),
+                         [[unum.NegInfinity, unum.Infinity], [open, open]])
+        for g in ([[unum.NaN, 1.0], [open, closed]],
+                  [[2.0, 1.0], [closed, closed]],
+                  [[1.0, 1.0], [open, closed]]):
+            self.assertEqual(unum.g2u(g), [unum.qNaNu])
+
+    def test_11_g2u_rounds_outwards(self):
+        unum.setenv((3, 4))
+        third = fractions.Fraction(1, 3)
+        (lo, hi), (lo_b, hi_b) = unum.u2g(unum.g2u([[third, third], [closed, closed]]))
+        self.assertTrue(lo < third < hi)
+        self.assertEqual((lo_b, hi_b), (open, open))
+        huge = fractions.Fraction(10)**400
+        self.assertEqual(unum.u2g(unum.g2u([[huge, huge], [closed, closed]])),
+                         [[unum.maxreal, unum.Infinity], [open, open]])
+
+    def test_20_exact_results(self):
+        unum.setenv((3, 4))
+        x2u = unum.x2u
+        self.assertEqual(unum.plusu(x2u(1.0), x2u(2.0)), [x2u(3.0)])
+        self.assertEqual(unum.minusu(x2u(1.0), x2u(2.5)), [x2u(-1.5)])
+        self.assertEqual(unum.timesu(x2u(-3.0), x2u(0.25)), [x2u(-0.75)])
+        self.assertEqual(unum.divideu(x2u(3.0), x2u(-4.0)), [x2u(-0.75)])
+        self.assertEqual(unum.plusu([x2u(1.0), x2u(2.0)], x2u(1.0)), [x2u(2.0), x2u(3.0)])
+        self.assertEqual(unum.timesu([x2u(-1.0), x2u(2.0)], [x2u(-3.0), x2u(1.0)]),
+                         [x2u(-6.0), x2u(3.0)])
+
+    def test_21_inexact_results(self):
+        unum.setenv((3, 4))
+        (lo, hi), (lo_b, hi_b) = unum.u2g(unum.divideu(unum.x2u(1.0), unum.x2u(3.0)))
+        self.assertTrue(lo < 1.0/3 < hi)
+        self.assertEqual((lo_b, hi_b), (open, open))
+
+    def test_22_exceptions(self):
+        unum.setenv((3, 4))
+        x2u = unum.x2u
+        self.assertEqual(unum.plusu(unum.posinfu, unum.neginfu), [unum.qNaNu])
+        self.assertEqual(unum.plusu(unum.posinfu, x2u(1.0)), [unum.posinfu])
+        self.assertEqual(unum.minusu(x2u(1.0), unum.posinfu), [unum.neginfu])
+        self.assertEqual(unum.timesu(0, unum.posinfu), [unum.qNaNu])
+        self.assertEqual(unum.divideu(x2u(1.0), 0), [unum.qNaNu])
+        self.assertEqual(unum.divideu(x2u(1.0), [x2u(-1.0), x2u(1.0)]), [unum.qNaNu])
+        self.assertEqual(unum.divideu(x2u(1.0), unum.posinfu), [0])
+        self.assertEqual(unum.plusu(unum.qNaNu, x2u(1.0)), [unum.qNaNu])
+        self.assertEqual(unum.u2g(unum.divideu(x2u(1.0), unum.g2u([[0.0, 1.0], [open, closed]]))),
+                         [[1.0, unum.Infinity], [closed, open]])
+
+    def test_30_results_contain_exact_values(self):
+        """ Every pair of unums in a small environment, with a value from
+        inside each.
+        """
+        env = unum.setenv((0, 0))
+        operands = []
+        for u in range(0, env.sNaNu + 1):
+            if u in (env.qNaNu, env.sNaNu):
+                continue
+            try:
+                (lo, hi), _ = unum.u2g(u)
+            except AssertionError:
+                # One of the last few unums before the NaNs; see unum2g.
+                continue
+            if lo <= hi and unum.Infinity not in (abs(lo), abs(hi)):
+                operands.append((u, (fractions.Fraction(lo) + fractions.Fraction(hi)) / 2))
+        ops = ((unum.plusu, lambda a, b: a + b),
+               (unum.minusu, lambda a, b: a - b),
+               (unum.timesu, lambda a, b: a * b),
+               (unum.divideu, lambda a, b: a / b))
+        for (u, a), (v, b) in itertools.product(operands, operands):
+            for opu, op in ops:
+                r = opu(u, v)
+                self.assertTrue(unum.uboundQ(r))
+                if r == [env.qNaNu]:
+                    continue
+                x = op(a, b)
+                (lo, hi), (lo_b, hi_b) = unum.u2g(r)
+                self.assertTrue(lo < x < hi or (x == lo and not lo_b) or (x == hi and not hi_b),
+                                '%s(%s, %s) = %s does not contain %s' % (opu.__name__, u, v, r, x))
+
+    def test_40_cache(self):
+        unum.setenv((3, 4))
+        one, three = unum.x2u(1.0), unum.x2u(3.0)
+        result = unum.divideu(one, three)
+        hits = arith.opcache.hits
+        self.assertEqual(unum.divideu(one, three), result)
+        self.assertEqual(arith.opcache.hits, hits + 1)
+        # Keyed on the environment too, so the same bits in another
+        # environment are not a hit:
+        env = unum.getenv((2, 3))
+        self.assertEqual(unum.divideu(one, three, env),
+                         unum.g2u(unum.divideg(unum.u2g(one, env), unum.u2g(three, env)), env))
+        self.assertEqual(arith.opcache.hits, hits + 1)
+
+    def test_41_cache_size(self):
+        arith.setcachesize(2)
+        for x in (1.0, 2.0, 3.0):
+            unum.plusu(unum.x2u(x), unum.x2u(x))
+        self.assertEqual(len(arith.opcache), 2)
+        arith.setcachesize(0)
+        unum.plusu(unum.x2u(1.0), unum.x2u(1.0))
+        self.assertEqual(len(arith.opcache), 0)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestArith)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+""" This module tests:
+bench_unum, the benchmark harness (that it runs and what it writes, not
+how fast anything is)
+"""
+
+import json
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+import unum
+
+import bench_unum
+
+class TestBench(unittest.TestCase):
+
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        unum.setenv ((self.old_e, self.old_f))
+
+    def do_write(self, name, **kwargs):
+        """ Support routine.  Run the benchmarks quickly, into a file in
+        self.dir.
+        """
+        path = os.path.join(self.dir, name)
+        options = bench_unum.Options(count=3, repeat=1, **kwargs)
+        with open(path, 'w') as out:
+            bench_unum.write(options, out)
+        return path
+
+    def test_10_write(self):
+        unum.setenv((2, 2))
+        path = self.do_write('out.txt', envs=[(1, 1)])
+        header, results = bench_unum.read(path)
+        self.assertEqual(header['envs'], [[1, 1]])
+        self.assertEqual(header['count'], 3)
+        names = set(r['name'] for r in results)
+        for name in ('UnumEnv', 'setenv', 'x2u/random', 'x2u/subnormal', 'x2u/near_maxreal',
+                     'x2u/power_of_two', 'u2f/power_of_two', 'u2g/random', 'ubound2g/random',
+                     'utagview'):
+            self.assertIn(name, names)
+        self.assertEqual(len([r for r in results if r['name'] == 'setenv']),
+                         len(bench_unum.ALL_ENVS))
+        for r in results:
+            self.assertNotIn('error', r)
+            self.assertTrue(r['calls'] > 0 and r['seconds'] >= 0, r)
+        # Every line is JSON on its own:
+        with open(path) as f:
+            for line in f:
+                json.loads(line)
+        # Leaves the environment as it found it:
+        self.assertEqual((unum.esizesize, unum.fsizesize), (2, 2))
+
+    def test_20_same_inputs(self):
+        """ The same seed times the same work.
+        """
+        rng1 = bench_unum.random.Random(5)
+        rng2 = bench_unum.random.Random(5)
+        env = unum.getenv((3, 4))
+        for _kind, make_xs in bench_unum.INPUTS:
+            self.assertEqual(make_xs(env, rng1, 10), make_xs(env, rng2, 10))
+
+    def test_30_compare(self):
+        old = self.do_write('old.txt', envs=[(0, 0)])
+        new = self.do_write('new.txt', envs=[(0, 0)])
+        out = StringIO.StringIO()
+        bench_unum.compare(old, new, out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('old: '))
+        self.assertTrue(any('x2u/random' in line for line in lines[2:]))
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestBench)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+""" This module tests:
+setchecking
+"""
+
+import unittest
+import unum
+
+class TestChecking(unittest.TestCase):
+
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+
+    def tearDown(self):
+        unum.setchecking(True)
+        unum.setenv ((self.old_e, self.old_f))
+
+    def results(self):
+        """ Support routine
+        """
+        xs = (0.0, 1.0, -1.5, 1.0/3, 100.0, -1e30, 1e-30, unum.NaN, unum.Infinity)
+        us = [unum.x2u(x) for x in xs]
+        return repr((us,
+                     [unum.u2g(u) for u in us],
+                     [unum.u2g([u, unum.x2u(200.0)]) for u in us[:5]],
+                     [unum.u2f(unum.exact(u)) for u in us[:7]],
+                     [unum.colorcode(u) for u in us],
+                     [unum.bigu(u) for u in us],
+                     [unum.expovalue(u) for u in us]))
+
+    def test_10_same_results(self):
+        for ef in ((0, 0), (1, 2), (2, 2), (3, 4), (4, 5)):
+            unum.setenv(ef)
+            unum.setchecking(True)
+            checked = self.results()
+            unum.setchecking(False)
+            self.assertEqual(self.results(), checked)
+
+    def test_20_primitives_unchecked(self):
+        unum.setenv((0, 1))
+        unum.setchecking(False)
+        # Inexact, so u2f would normally raise:
+        unum.u2f(2)
+        unum.expo(2)
+        unum.setchecking(True)
+        with self.assertRaises(AssertionError):
+            unum.u2f(2)
+
+    def test_30_boundary_still_checked(self):
+        unum.setenv((2, 2))
+        unum.setchecking(False)
+        with self.assertRaises(AssertionError):
+            unum.x2u('foo')
+        with self.assertRaises(AssertionError):
+            unum.u2g(unum.sNaNu + 1)
+        with self.assertRaises(AssertionError):
+            unum.u2g([unum.x2u(2.0), unum.x2u(1.0)])
+        self.assertFalse(unum.uboundQ([unum.sNaNu + 1]))
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestChecking)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+""" This module tests:
+decode
+"""
+
+import unittest
+import unum
+
+class TestDecode(unittest.TestCase):
+
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+
+    def tearDown(self):
+        unum.setenv ((self.old_e, self.old_f))
+
+    def test_10_decode_matches_accessors(self):
+        for ef in ((0, 0), (0, 1), (1, 0), (1, 2), (2, 1), (2, 2)):
+            env = unum.setenv(ef)
+            for u in range(0, env.sNaNu + 1):
+                d = unum.decode(u)
+                self.assertEqual(
+                    (d.sign, d.expo, d.frac, d.ubit, d.esizeminus1, d.fsizeminus1),
+                    (unum.sign(u), unum.expo(u), unum.frac(u), unum.Boole(unum.inexQ(u)),
+                     unum.esizeminus1(u), unum.fsizeminus1(u)))
+
+    def test_20_decode_explicit_env(self):
+        env = unum.getenv((4, 11))
+        d = unum.decode(unum.x2u(-1.5, env), env)
+        self.assertEqual((d.sign, d.expo, d.frac, d.ubit, d.esizeminus1, d.fsizeminus1),
+                         (1, 1, 1, 0, 1, 0))
+        d = unum.decode(env.posinfu, env)
+        self.assertEqual((d.sign, d.expo, d.frac, d.ubit),
+                         (0, 2**env.esizemax - 1, 2**env.fsizemax - 1, 0))
+
+    def test_30_decode_raises(self):
+        unum.setenv((2, 2))
+        for u in (-1, unum.sNaNu + 1, 1.5):
+            with self.assertRaises(AssertionError):
+                unum.decode(u)
+
+    def test_40_fields_have_slots(self):
+        d = unum.decode(0)
+        with self.assertRaises(AttributeError):
+            d.not_a_field = 0
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestDecode)
+
+if __name__ == '__main__':
+    unittest.main()
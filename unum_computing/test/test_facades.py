@@ -0,0 +1,50 @@
+""" This module tests:
+unum/unum_computing.py and unum_ubox, the compatibility modules over unum
+"""
+
+import os
+import sys
+import unittest
+import unum
+
+# Add the repository root and unum dirs to path, so we can import both:
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+sys.path.append(REPO_DIR)
+sys.path.append(os.path.join(REPO_DIR, 'unum'))
+
+import unum_computing
+import unum_ubox
+
+class TestFacades(unittest.TestCase):
+
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+
+    def tearDown(self):
+        unum.setenv ((self.old_e, self.old_f))
+
+    def test_10_same_functions(self):
+        for facade in (unum_computing, unum_ubox):
+            self.assertIs(facade.x2u, unum.x2u)
+            self.assertIs(facade.u2g, unum.u2g)
+            self.assertIs(facade.BitShiftLeft, unum.BitShiftLeft)
+            self.assertIs(facade.IntegerQ, unum.IntegerQ)
+
+    def test_20_setenv_e_f(self):
+        for facade in (unum_computing, unum_ubox):
+            env = facade.setenv(2, 3)
+            self.assertIs(env, unum.getenv((2, 3)))
+            self.assertIs(unum.current_env, env)
+            self.assertEqual((facade.esizesize, facade.fsizesize), (2, 3))
+            self.assertEqual(facade.maxrealu, env.maxrealu)
+            self.assertEqual(facade.x2u(1.5), unum.x2u(1.5, env))
+            facade.setenv(4, 11)
+            self.assertEqual(facade.esizesize, 4)
+            self.assertEqual(facade.maxubits, unum.getenv((4, 11)).maxubits)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestFacades)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+""" This module tests:
+setenv(..., tables=True)
+gettables
+"""
+
+import unittest
+import unum
+
+class TestTables(unittest.TestCase):
+
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+
+    def tearDown(self):
+        unum.setenv ((self.old_e, self.old_f))
+
+    def computed(self, ef):
+        """ Support routine.  Everything table mode tabulates, computed
+        without tables.
+        """
+        env = unum.setenv(ef)
+        self.assertIsNone(unum.current_tables)
+        result = []
+        for u in range(0, env.sNaNu + 1):
+            try:
+                g = unum.unum2g(u)
+            except AssertionError:
+                g = None
+            result.append((unum.u2f(u) if unum.exQ(u) else None,
+                           g,
+                           unum.bigu(u),
+                           unum.numbits(u),
+                           unum.colorcode(u)))
+        return result
+
+    def looked_up(self, ef):
+        """ Support routine.  Same as computed, in table mode.
+        """
+        env = unum.setenv(ef, tables=True)
+        self.assertIs(unum.current_tables.env, env)
+        result = []
+        for u in range(0, env.sNaNu + 1):
+            try:
+                g = unum.unum2g(u)
+            except AssertionError:
+                g = None
+            result.append((unum.u2f(u) if unum.exQ(u) else None,
+                           g,
+                           unum.bigu(u),
+                           unum.numbits(u),
+                           unum.colorcode(u)))
+        return result
+
+    def test_10_tables_match_computed(self):
+        for ef in ((0, 0), (0, 1), (1, 0), (1, 1), (1, 2)):
+            # repr, so that NaN compares equal to NaN:
+            self.assertEqual(repr(self.looked_up(ef)), repr(self.computed(ef)))
+
+    def test_20_tables_are_cached(self):
+        unum.setenv((1, 1), tables=True)
+        tables = unum.current_tables
+        unum.setenv((1, 1))
+        self.assertIsNone(unum.current_tables)
+        unum.setenv((1, 1), tables=True)
+        self.assertIs(unum.current_tables, tables)
+        self.assertIs(unum.gettables(unum.getenv((1, 1))), tables)
+
+    def test_30_unum2g_returns_new_lists(self):
+        unum.setenv((1, 1), tables=True)
+        g = unum.unum2g(unum.x2u(1.5))
+        g[0][0] = 99.0
+        self.assertEqual(unum.unum2g(unum.x2u(1.5)), [[1.5, 1.5], [unum.closed, unum.closed]])
+
+    def test_40_assertions_kept(self):
+        unum.setenv((0, 1), tables=True)
+        for u in (2, 3, 6, 7):
+            with self.assertRaises(AssertionError):
+                unum.u2f(u)
+        with self.assertRaises(AssertionError):
+            unum.bigu(unum.sNaNu + 1)
+
+    def test_45_inexact_u2f_computed(self):
+        # The unchecked kernel, as big and unum2g use it, on inexact unums
+        # (NaN in the table):
+        env = unum.setenv((0, 1))
+        computed = [unum._u2f(u, env) for u in (2, 3, 6, 7)]
+        unum.setenv((0, 1), tables=True)
+        self.assertEqual([unum._u2f(u, env) for u in (2, 3, 6, 7)], computed)
+
+    def test_50_other_env_not_tabulated(self):
+        unum.setenv((1, 1), tables=True)
+        env = unum.getenv((3, 4))
+        self.assertEqual(unum.u2f(unum.x2u(1000.0, env), env), 1000.0)
+
+    def test_60_too_big(self):
+        unum.setenv((1, 1))
+        with self.assertRaises(AssertionError):
+            unum.setenv((3, 4), tables=True)
+        self.assertEqual(unum.current_env, unum.getenv((1, 1)))
+        self.assertEqual(unum.esizesize, 1)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestTables)
+
+if __name__ == '__main__':
+    unittest.main()
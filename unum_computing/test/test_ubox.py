@@ -0,0 +1,108 @@
+""" This module tests:
+unum_ubox: uboxlistg, uboxlist, uboxlistinexact, uboxcount, uboxes, coalesce1D
+"""
+
+import itertools
+import os
+import sys
+import unittest
+import unum
+
+# Add the repository root to path, so we can import unum_ubox:
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(SCRIPT_DIR)))
+
+import unum_ubox
+from unum import open, closed
+
+class TestUbox(unittest.TestCase):
+
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+
+    def tearDown(self):
+        unum.setenv ((self.old_e, self.old_f))
+
+    def assertTiles(self, us, g):
+        """ Support routine.  Check that the unums us, in order, exactly
+        cover the general interval g.
+        """
+        gs = [unum.u2g(u) for u in us]
+        self.assertEqual((gs[0][0][0], gs[0][1][0]), (g[0][0], g[1][0]))
+        self.assertEqual((gs[-1][0][1], gs[-1][1][1]), (g[0][1], g[1][1]))
+        for left, right in zip(gs, gs[1:]):
+            self.assertEqual(left[0][1], right[0][0])
+            self.assertNotEqual(left[1][1], right[1][0])
+
+    def test_10_whole_line(self):
+        for ef in ((0, 0), (1, 1), (2, 2)):
+            env = unum.setenv(ef)
+            g = [[unum.NegInfinity, unum.Infinity], [closed, closed]]
+            us = list(unum_ubox.uboxlistg(g))
+            self.assertEqual(us[0], env.neginfu)
+            self.assertEqual(us[-1], env.posinfu)
+            self.assertTiles(us, g)
+            for u in us:
+                self.assertEqual(unum.esize(u), env.esizemax)
+                self.assertEqual(unum.fsize(u), env.fsizemax)
+
+    def test_20_uboxlist_tiles_ubound(self):
+        env = unum.setenv((2, 2))
+        xs = (unum.NegInfinity, -100.0, -1.0, -0.3, 0.0, 0.1, 1.0, 3.5, 100.0, unum.Infinity)
+        for x, y in itertools.combinations(xs, 2):
+            ub = [unum.x2u(x), unum.x2u(y)]
+            us = list(unum_ubox.uboxlist(ub))
+            self.assertTiles(us, unum.u2g(ub))
+            self.assertEqual(unum_ubox.uboxcount(ub), len(us))
+            self.assertEqual(list(unum_ubox.coalesce1D(us)), [us[0:1] + us[-1:]])
+
+    def test_21_exceptions(self):
+        env = unum.setenv((2, 2))
+        self.assertEqual(list(unum_ubox.uboxlist(env.qNaNu)), [env.qNaNu])
+        self.assertEqual(list(unum_ubox.uboxlist(env.posinfu)), [env.posinfu])
+        self.assertEqual(list(unum_ubox.uboxlistg([[1.0, 1.0], [open, open]])), [])
+        self.assertEqual(unum_ubox.uboxcount([unum.x2u(0.0)]), 1)
+
+    def test_30_uboxlistinexact(self):
+        unum.setenv((1, 2))
+        ub = [unum.x2u(-2.0), unum.x2u(2.0)]
+        inexact = list(unum_ubox.uboxlistinexact(ub))
+        self.assertEqual(inexact, [u for u in unum_ubox.uboxlist(ub) if unum.inexQ(u)])
+        self.assertEqual(len(inexact), unum_ubox.uboxcount(ub) // 2)
+
+    def test_40_uboxes(self):
+        unum.setenv((1, 1))
+        ubs = ([unum.x2u(0.0), unum.x2u(1.0)], unum.x2u(2.0), [unum.x2u(-1.0), unum.x2u(0.0)])
+        boxes = list(unum_ubox.uboxes(ubs))
+        self.assertEqual(boxes, list(itertools.product(*[unum_ubox.uboxlist(ub) for ub in ubs])))
+        self.assertEqual(len(boxes), unum_ubox.uboxcount(ubs[0]) * unum_ubox.uboxcount(ubs[2]))
+
+    def test_50_coalesce1D(self):
+        unum.setenv((2, 2))
+        x2u = unum.x2u
+        boxes = [x2u(-1.0), [x2u(0.0), x2u(1.0)], x2u(1.0), x2u(3.0), [x2u(3.0), x2u(4.0)]]
+        self.assertEqual(list(unum_ubox.coalesce1D(boxes)),
+                         [[x2u(-1.0)], [x2u(0.0), x2u(1.0)], [x2u(3.0), x2u(4.0)]])
+        # Open intervals meeting at a point they both leave out do not touch:
+        left = unum.g2u([[0.0, 1.0], [open, open]])
+        right = unum.g2u([[1.0, 2.0], [open, open]])
+        self.assertEqual(len(list(unum_ubox.coalesce1D([left, right]))), 2)
+        with self.assertRaises(AssertionError):
+            list(unum_ubox.coalesce1D([x2u(2.0), x2u(1.0)]))
+
+    def test_60_streaming(self):
+        """ Far too many uboxes to list, but they can still be counted and
+        generated.
+        """
+        env = unum.getenv((4, 8))
+        ub = [unum.x2u(1.0, env), unum.x2u(2.0, env)]
+        self.assertEqual(unum_ubox.uboxcount(ub, env), 2**(env.fsizemax + 1) + 1)
+        first = list(itertools.islice(unum_ubox.uboxlist(ub, env), 3))
+        self.assertEqual(unum.u2g(first[0], env), [[1.0, 1.0], [closed, closed]])
+        self.assertEqual(first[1:], [first[0] + env.ubitmask, first[0] + env.ulpu])
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestUbox)
+
+if __name__ == '__main__':
+    unittest.main()
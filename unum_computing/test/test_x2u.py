@@ -3,6 +3,7 @@ u2f
 x2u
 """
 
+import fractions
 import unittest
 import unum
 
@@ -330,6 +331,39 @@ class TestX2u(unittest.TestCase):
         self.assertFalse(unum.unumQ(unum.NegInfinity))
         self.assertFalse(unum.unumQ('foo'))
 
+    def do_x2u_contains(self, x):
+        """ Support routine
+        """
+        (lo, hi), (lo_open, hi_open) = unum.u2g(unum.x2u(x))
+        self.assertTrue(lo < x < hi or (x == lo and not lo_open) or (x == hi and not hi_open),
+                        'In environment (%s, %s), unum.x2u(%r) gives %s, which does not contain it' %
+                        (unum.esizesize, unum.fsizesize, x, [[lo, hi], [lo_open, hi_open]]))
+
+    def test_50_x2u_exact(self):
+        """ Values whose float Log is off by one, integers too big for a
+        float, and Fractions.
+        """
+        unum.setenv((3, 4))
+        for x in (1.0 - 2.0**-53, 2.0**-125, 2.0**-125 * (1 + 2.0**-52), 3.0 * 2**-130,
+                  fractions.Fraction(1, 3), fractions.Fraction(-7, 5),
+                  2**100 + 1, -(2**127 + 2**110)):
+            self.do_x2u_contains(x)
+        self.assertEqual(unum.u2g(unum.x2u(2**100)), [[2.0**100, 2.0**100], [unum.closed, unum.closed]])
+        self.assertEqual(unum.x2u(10**40), unum.maxrealu + unum.ubitmask)
+        self.assertEqual(unum.x2u(fractions.Fraction(3, 4)), unum.x2u(0.75))
+        self.assertEqual(unum.x2u(fractions.Fraction(1, 3)), unum.x2u(1.0/3))
+        # 2**-126 is the smallest normal number; just below it is subnormal:
+        self.assertEqual(unum.esize(unum.x2u(2.0**-126)), 8)
+        self.assertEqual(unum.u2g(unum.x2u(2.0**-127)), [[2.0**-127, 2.0**-127], [unum.closed, unum.closed]])
+
+    def test_51_maxreal_exact(self):
+        env = unum.setenv((0, 4))
+        self.assertEqual(env.maxreal, 4 - fractions.Fraction(1, 2**14))
+        self.assertEqual(unum.u2g(unum.x2u(env.maxreal)), unum.u2g(env.maxrealu))
+        self.assertEqual(unum.x2u(4.0), env.maxrealu + env.ubitmask)
+        self.assertEqual(unum.getenv((1, 3)).maxreal, 8 - fractions.Fraction(1, 2**5))
+        self.assertEqual(unum.getenv((3, 4)).maxreal, 2**129 - 2**113)
+
 
 suite = unittest.TestLoader().loadTestsFromTestCase(TestX2u)
 
@@ -0,0 +1,105 @@
+""" This module tests:
+u2f_array
+x2u_array
+"""
+
+import random
+import unittest
+import unum
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestX2uArray(unittest.TestCase):
+    def setUp(self):
+        self.old_e = unum.esizesize
+        self.old_f = unum.fsizesize
+
+    def tearDown(self):
+        unum.setenv ((self.old_e, self.old_f))
+
+    def sample_xs(self, env):
+        """ Support routine.  Values from every branch of x2u.
+        """
+        rng = random.Random(env.esizesize * 100 + env.fsizesize)
+        xs = [0.0, -0.0, 1.0, -1.0, 1.5, 2.0, 3.0, 10.0, 100.0, 1000.0, 10000.0,
+              0.1, -0.3, 1.0/3, 1e300, -1e300, 1e-300, -1e-300,
+              unum.Infinity, unum.NegInfinity]
+        xs += [rng.uniform(-10, 10) for _i in range(100)]
+        xs += [rng.randint(-64, 64) / 8.0 for _i in range(100)]
+        xs += [rng.randint(-64, 64) * float(env.smallsubnormal) for _i in range(50)]
+        return xs
+
+    def do_x2u_array_matches_x2u(self, ef):
+        env = unum.setenv(ef)
+        xs = self.sample_xs(env)
+        us = unum.x2u_array(numpy.array(xs))
+        self.assertEqual(us.shape, (len(xs),))
+        for x, u in zip(xs, us):
+            self.assertEqual(int(u), unum.x2u(x),
+                'In environment %s, x2u_array gives %s for %r, not %s' % (ef, u, x, unum.x2u(x)))
+
+    def test_10_x2u_array_uint64(self):
+        for e in range(0, 4):
+            for f in range(0, 5):
+                self.do_x2u_array_matches_x2u((e, f))
+        self.assertEqual(unum.x2u_array([1.0]).dtype, numpy.uint64)
+
+    def test_11_x2u_array_nan(self):
+        unum.setenv((2, 3))
+        us = unum.x2u_array([unum.NaN, 1.0, float('nan')])
+        self.assertEqual(list(us), [unum.qNaNu, unum.x2u(1.0), unum.qNaNu])
+
+    def test_12_x2u_array_shape(self):
+        unum.setenv((2, 3))
+        us = unum.x2u_array([[0.0, 1.0, 1.5], [2.0, 3.0, 10.0]])
+        self.assertEqual(us.shape, (2, 3))
+        self.assertEqual(int(us[1, 2]), 1617)
+
+    def test_13_x2u_array_object(self):
+        env = unum.getenv((4, 11))
+        us = unum.x2u_array([1.0, -3.5, unum.NaN], env)
+        self.assertEqual(us.dtype, object)
+        self.assertEqual(list(us), [unum.x2u(1.0, env), unum.x2u(-3.5, env), env.qNaNu])
+
+    def test_20_u2f_array_uint64(self):
+        for ef in ((0, 0), (0, 1), (1, 0), (1, 2), (2, 2)):
+            env = unum.setenv(ef)
+            us = [u for u in range(0, env.sNaNu + 1)
+                  if unum.exQ(u) and u != env.qNaNu and u != env.sNaNu]
+            fs = unum.u2f_array(numpy.array(us, dtype=numpy.uint64))
+            self.assertEqual(list(fs), [unum.u2f(u) for u in us])
+
+    def test_21_u2f_array_object(self):
+        env = unum.getenv((4, 11))
+        us = [unum.x2u(x, env) for x in (0.0, 1.0, -3.5, 1000.0)]
+        self.assertEqual(list(unum.u2f_array(us, env)), [0.0, 1.0, -3.5, 1000.0])
+
+    def test_22_u2f_array_raises(self):
+        unum.setenv((0, 1))
+        with self.assertRaises(AssertionError):
+            unum.u2f_array([0, 2])
+        with self.assertRaises(AssertionError):
+            unum.u2f_array([unum.sNaNu + 1])
+
+    def test_23_u2f_array_empty(self):
+        unum.setenv((2, 3))
+        for us in ([], numpy.array([], dtype=numpy.uint64), unum.x2u_array([])):
+            fs = unum.u2f_array(us)
+            self.assertEqual(fs.dtype, numpy.float64)
+            self.assertEqual(fs.shape, (0,))
+        fs = unum.u2f_array([], unum.getenv((4, 11)))
+        self.assertEqual((fs.dtype, fs.shape), (numpy.float64, (0,)))
+
+    def test_30_round_trip(self):
+        unum.setenv((3, 4))
+        xs = numpy.arange(-1000, 1000) / 4.0
+        self.assertTrue(numpy.array_equal(unum.u2f_array(unum.x2u_array(xs)), xs))
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestX2uArray)
+
+if __name__ == '__main__':
+    unittest.main()
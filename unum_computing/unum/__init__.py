@@ -1,8 +1,17 @@
 """ Implements unum from John Gustafson's Mathematica prototype, 4/2015
 """
 
+import array
 import fractions
 import math
+import struct
+import sys
+
+try:
+    import numpy
+except ImportError:
+    # Only the batch conversions (x2u_array, u2f_array) need NumPy:
+    numpy = None
 
 # Declarations that replace built-in Mathematica declarations:
 
@@ -145,7 +154,8 @@ def Max(a, b):
     return max(a, b)
 
 def NumericQ(x):
-    return IntegerQ(x) or isinstance(x, float) or isinstance(x, complex)
+    return (IntegerQ(x) or isinstance(x, float) or isinstance(x, complex) or
+            isinstance(x, fractions.Fraction))
     #    if x == Infinity or x == NegInfinity or x is NaN, Mathematica returns False
 
 def Row(exprs, separator=''):
@@ -225,6 +235,126 @@ _UBIT_ON_SYMBOL = '_'  # Somewhere between this number and the next
 unset_int = -99
 unset_real = -99.9
 
+class UnumEnv(object):
+    """ Immutable snapshot of every environment value derived from one
+    (esizesize, fsizesize) pair.  Use getenv() rather than constructing these
+    directly, so that each pair is only ever computed once.
+    """
+    __slots__ = (
+        'esizesize',
+        'fsizesize',
+        'esizemax',
+        'fsizemax',
+        'utagsize',
+        'maxubits',
+        'ubitmask',
+        'fsizemask',
+        'esizemask',
+        'efsizemask',
+        'utagmask',
+        'ulpu',
+        'smallsubnormalu',
+        'smallnormalu',
+        'signbigu',
+        'posinfu',
+        'maxrealu',
+        'minrealu',
+        'neginfu',
+        'negbigu',
+        'qNaNu',
+        'sNaNu',
+        'negopeninfu',
+        'posopeninfu',
+        'negopenzerou',
+        'maxreal',
+        'smallsubnormal',
+        'smallnormal')
+
+    def __init__(self, e, f):
+        assert(0 <= e <= 4)
+        assert(0 <= f <= 11)
+        values = dict(esizesize=e, fsizesize=f)
+        values['esizemax'] = esizemax = 2**e
+        values['fsizemax'] = fsizemax = 2**f
+        values['utagsize'] = utagsize = 1 + f + e
+        values['maxubits'] = maxubits = 1 + esizemax + fsizemax + utagsize
+
+        values['ubitmask'] = ubitmask = BitShiftLeft(1, (utagsize - 1))
+        values['fsizemask'] = fsizemask = (1 << f) - 1
+        values['esizemask'] = esizemask = (ubitmask - 1) - fsizemask
+        values['efsizemask'] = efsizemask = BitOr(esizemask, fsizemask)
+        values['utagmask'] = BitOr(ubitmask, efsizemask)
+
+        values['ulpu'] = ulpu = BitShiftLeft(1, utagsize)
+        values['smallsubnormalu'] = efsizemask + ulpu
+        values['smallnormalu'] = efsizemask + BitShiftLeft(1, maxubits - 1 - esizemax)
+        values['signbigu'] = signbigu = BitShiftLeft(1, maxubits - 1)
+        values['posinfu'] = posinfu = signbigu - 1 - ubitmask
+        values['maxrealu'] = maxrealu = posinfu - ulpu
+        values['minrealu'] = maxrealu + signbigu
+        values['neginfu'] = neginfu = posinfu + signbigu
+        values['negbigu'] = neginfu - ulpu
+        values['qNaNu'] = posinfu + ubitmask
+        values['sNaNu'] = neginfu + ubitmask
+        values['negopeninfu'] = 0b1101 if utagsize == 1 else BitShiftLeft(0b1111, utagsize - 1)
+        values['posopeninfu'] = 0b0101 if utagsize == 1 else  BitShiftLeft(0b0111, utagsize - 1)
+        values['negopenzerou'] = BitShiftLeft(0b1001, utagsize - 1)
+
+        # Can't use float (2) bbelow otherwise we get:
+        #   OverflowError: (34, 'Numerical result out of range')
+        # on the bigger (e.g. (4, 11)) environments.  Exact, as an int where
+        # it is a whole number (not floored by integer division) and as a
+        # Fraction otherwise, e.g. (2**16 - 1)/2**14 in (0, 4):
+        maxreal = fractions.Fraction(2**2**(esizemax - 1) * (2**fsizemax - 1), 2**(fsizemax - 1))
+        values['maxreal'] = maxreal.numerator if maxreal.denominator == 1 else maxreal
+        values['smallsubnormal'] = 2**(2 - 2**(esizemax - 1) - fsizemax)
+        # Same value as u2f(smallnormalu), which x2u compares against on
+        # every call:
+        values['smallnormal'] = float(2)**(2 - 2**(esizemax - 1))
+
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError('UnumEnv is immutable; cannot set %s' % name)
+
+    def __delattr__(self, name):
+        raise AttributeError('UnumEnv is immutable; cannot delete %s' % name)
+
+    def __reduce__(self):
+        return getenv, ((self.esizesize, self.fsizesize),)
+
+    def __repr__(self):
+        return 'UnumEnv(%s, %s)' % (self.esizesize, self.fsizesize)
+
+# One UnumEnv per (esizesize, fsizesize) pair, built on first use:
+_envs = {}
+
+def getenv(ef_seq):
+    """ Return the (cached) UnumEnv for an (esizesize, fsizesize) pair,
+    without changing the current environment.
+    """
+    assert(isinstance(ef_seq, (list, tuple)))
+    key = (ef_seq[0], ef_seq[1])
+    try:
+        return _envs[key]
+    except KeyError:
+        result = _envs[key] = UnumEnv(*key)
+        return result
+
+# The current UnumEnv, as chosen by setenv.  Every primitive below takes an
+# optional env argument, and falls back to this one when it is omitted:
+current_env = None
+
+# The UnumTables for current_env, when setenv was asked to build them.  The
+# primitives that have a table (u2f, unum2g, bigu, numbits, colorcode) look
+# their results up there instead of computing them:
+current_tables = None
+
+# Whether the primitives assert that their arguments are valid; see
+# setchecking:
+checking = True
+
 esizesize = unset_int
 esizemax = unset_int
 fsizesize = unset_int
@@ -252,87 +382,59 @@ posopeninfu = unset_int
 negopenzerou = unset_int
 maxreal = unset_real
 smallsubnormal = unset_real
+smallnormal = unset_real
 # END Environment
 
-def setenv(ef_seq):
+def setenv(ef_seq, tables=False):
     """ Set the environment variables based on the esizesize and
     fsizesize. In this prototype, the maximum esizesize is 4 and the
     maximum fsizesize is 11.
+
+    The values themselves come from the cached UnumEnv for the pair, so
+    switching back and forth between environments recomputes nothing.  They
+    are also copied into the module globals of the same names, for callers
+    that read e.g. unum.maxrealu directly.  Returns the new current UnumEnv.
+
+    If tables is true, also switch on table mode for the environment: see
+    UnumTables.  Only small environments (up to about (2, 3)) are allowed.
     """
-    assert(isinstance(ef_seq, (list, tuple)))
-    e = ef_seq[0]
-    f = ef_seq[1]
-    assert(0 <= e <= 4)
-    assert(0 <= f <= 11)
-
-    global \
-        esizesize,\
-        fsizesize,\
-        esizemax,\
-        fsizemax,\
-        utagsize,\
-        maxubits,\
-        ubitmask,\
-        fsizemask,\
-        esizemask,\
-        efsizemask,\
-        utagmask,\
-        ulpu,\
-        smallsubnormalu,\
-        smallnormalu,\
-        signbigu,\
-        posinfu,\
-        maxrealu,\
-        minrealu,\
-        neginfu,\
-        negbigu,\
-        qNaNu,\
-        sNaNu,\
-        negopeninfu,\
-        posopeninfu,\
-        negopenzerou,\
-        maxreal,\
-        smallsubnormal
-
-    esizesize, fsizesize = e, f
-    esizemax, fsizemax = 2**e, 2**f
-    utagsize = 1 + f + e
-    maxubits = 1 + esizemax + fsizemax + utagsize
-
-    ubitmask = BitShiftLeft(1, (utagsize - 1))
-    fsizemask = (1 << f) - 1
-    esizemask = (ubitmask - 1) - fsizemask
-    efsizemask = BitOr(esizemask, fsizemask)
-    utagmask = BitOr(ubitmask, efsizemask)
-
-    ulpu = BitShiftLeft(1, utagsize)
-    smallsubnormalu = efsizemask + ulpu
-    smallnormalu = efsizemask + BitShiftLeft(1, maxubits - 1 - esizemax)
-    signbigu = BitShiftLeft(1, maxubits - 1)
-    posinfu = signbigu - 1 - ubitmask
-    maxrealu = posinfu - ulpu
-    minrealu = maxrealu + signbigu
-    neginfu = posinfu + signbigu
-    negbigu = neginfu - ulpu
-    qNaNu = posinfu + ubitmask
-    sNaNu = neginfu + ubitmask
-    negopeninfu = 0b1101 if utagsize == 1 else BitShiftLeft(0b1111, utagsize - 1)
-    posopeninfu = 0b0101 if utagsize == 1 else  BitShiftLeft(0b0111, utagsize - 1)
-    negopenzerou = BitShiftLeft(0b1001, utagsize - 1)
-
-    # Can't use float (2) bbelow otherwise we get:
-    #   OverflowError: (34, 'Numerical result out of range')
-    # on the bigger (e.g. (4, 11)) environments:
-    maxreal = 2**2**(esizemax - 1) * (2**fsizemax - 1)/2**(fsizemax - 1)
-    smallsubnormal = 2**(2 - 2**(esizemax - 1) - fsizemax)
+    global current_env, current_tables
+    env = getenv(ef_seq)
+    current_tables = gettables(env) if tables else None
+    current_env = env
+    _copyenv(env, globals())
 
     # debug:
     # print("================================================================================")
     # print(str(globals()).replace(", ", "\n"))
+    return env
+
+def _copyenv(env, namespace):
+    """ Copy env's values into namespace (a module's globals()), under the
+    same names, and make it the namespace's current_env.  Also used by the
+    compatibility modules that re-export this one (unum/unum_computing.py,
+    unum_ubox).
+    """
+    for name in UnumEnv.__slots__:
+        namespace[name] = getattr(env, name)
+    namespace['current_env'] = env
 
 # Make sure values are initialized to something, to start.
 setenv((3, 4))
 
+def setchecking(flag):
+    """ Turn argument checking in the primitives on (the default) or off.
+
+    With checking off ("fast mode"), arguments are only validated once, at
+    the API boundary: x2u asserts floatQ, u2g asserts uQ, and uboundQ is a
+    check in itself.  Those then call the unchecked kernels (_decode, _u2f,
+    _unum2g, _ubound2g) directly, and the other primitives skip their
+    unumQ/exQ assertions.  Unlike running under python -O, assertions
+    elsewhere in the program are unaffected.
+    """
+    global checking
+    checking = bool(flag)
+
 # Local palette definitions.
 gogreen = RGBColor((0, .75, .625)) # Traffic light color
 cautionamber = RGBColor((.96, .72, 0))  # Traffic light color
@@ -347,16 +449,17 @@ chartreuse = RGBColor((.875, 1, .5)) # Background for general interval table
 
 # View the three fields of a utag as a color-coded binary string. 
 
-def utagview(u): 
-    e = BitShiftRight(BitAnd(u, esizemask), fsizesize)
-    f = BitAnd(u, fsizemask)
-    i = BitShiftRight(u, utagsize - 1)
+def utagview(u, env=None):
+    env = env or current_env
+    e = BitShiftRight(BitAnd(u, env.esizemask), env.fsizesize)
+    f = BitAnd(u, env.fsizemask)
+    i = BitShiftRight(u, env.utagsize - 1)
 
     result = Grid(
         (
             (Style(i, Magenta, "Input"),
-             Style(IntegerString(e, 2, esizesize), sanegreen, "Input"),
-             Style(IntegerString(f, 2, fsizesize), Gray, "Input")
+             Style(IntegerString(e, 2, env.esizesize), sanegreen, "Input"),
+             Style(IntegerString(f, 2, env.fsizesize), Gray, "Input")
              ),
             ((_UBIT_ON_SYMBOL
              if i == 1 else
@@ -375,164 +478,255 @@ def utagview(u):
     return result
 
 # Test if a value is a legitimate unum. (Must be integer, and in-range.)
-def unumQ(x):
-    return IntegerQ(x) and 0 <= x <= sNaNu
+def unumQ(x, env=None):
+    env = env or current_env
+    return IntegerQ(x) and 0 <= x <= env.sNaNu
 
 # Values and bit masks for taking apart a unum bit string.
 # Independent of the contents of the utag.
-def fsizeminus1(u):
-    assert unumQ(u)
-    result = BitAnd(u, fsizemask)
+def fsizeminus1(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitAnd(u, env.fsizemask)
     return result
 
-def fsize(u):
-    assert unumQ(u)
-    result = 1 + fsizeminus1(u)
+def fsize(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = 1 + fsizeminus1(u, env)
     return result
 
-def esizeminus1(u):
-    assert unumQ(u)
-    result = BitShiftRight(BitAnd(u, esizemask), fsizesize)
+def esizeminus1(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitShiftRight(BitAnd(u, env.esizemask), env.fsizesize)
     return result
 
-def esize(u):
-    assert unumQ(u)
-    result = 1 + esizeminus1(u)
+def esize(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = 1 + esizeminus1(u, env)
     return result
 
-def utag(esize, fsize):
+def utag(esize, fsize, env=None):
+    env = env or current_env
     assert isinstance(esize, int)
-    assert 1 <= esize <= esizemax
+    assert 1 <= esize <= env.esizemax
     assert isinstance(fsize, int)
-    assert 1 <= fsize <= fsizemax
-    result = BitOr(fsize - 1, BitShiftLeft(esize - 1, fsizesize))
+    assert 1 <= fsize <= env.fsizemax
+    result = BitOr(fsize - 1, BitShiftLeft(esize - 1, env.fsizesize))
     return result
 
-def numbits(u):
-    assert unumQ(u)
-    result = 1 + esize(u) + fsize(u) + utagsize
+def numbits(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    if current_tables is not None and current_tables.env is env:
+        return current_tables.numbits[u]
+    result = 1 + esize(u, env) + fsize(u, env) + env.utagsize
     return result
 
-def signmask(u):
-    assert unumQ(u)
-    result = BitShiftLeft(1, numbits(u) - 1)
+def signmask(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitShiftLeft(1, numbits(u, env) - 1)
     return result
 
-def hiddenmask(u):
-    assert unumQ(u)
-    result = BitShiftLeft(1, fsize(u) + utagsize)
+def hiddenmask(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitShiftLeft(1, fsize(u, env) + env.utagsize)
     return result
 
-def fracmask(u):
-    assert unumQ(u)
-    result = BitShiftLeft(BitShiftLeft(1, fsize(u)) - 1, utagsize)
+def fracmask(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitShiftLeft(BitShiftLeft(1, fsize(u, env)) - 1, env.utagsize)
     return result
 
-def expomask(u):
-    assert unumQ(u)
-    result = BitShiftLeft(BitShiftLeft(1, esize(u)) - 1, fsize(u) + utagsize)
+def expomask(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitShiftLeft(BitShiftLeft(1, esize(u, env)) - 1, fsize(u, env) + env.utagsize)
     return result
 
-def floatmask(u):
-    assert unumQ(u)
-    result = signmask(u) + expomask(u) + fracmask(u)
+def floatmask(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = signmask(u, env) + expomask(u, env) + fracmask(u, env)
     return result
 
 
 # Values and bit masks that depend on what is stored in the utag. 
-def bias(u):
-    assert unumQ(u)
-    result = 2**esizeminus1(u) - 1
+def bias(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = 2**esizeminus1(u, env) - 1
     return result
 
-def sign(u):
-    assert unumQ(u)
-    result = Boole(BitAnd(u, signmask(u)) > 0)
+def sign(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = Boole(BitAnd(u, signmask(u, env)) > 0)
     return result
 
-def expo(u):
-    assert unumQ(u)
-    result = BitShiftRight(BitAnd(u, expomask(u)), utagsize + fsize(u))
+def expo(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitShiftRight(BitAnd(u, expomask(u, env)), env.utagsize + fsize(u, env))
     return result
 
-def hidden(u):
-    assert unumQ(u)
-    result = Boole(expo(u) > 0)
+def hidden(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = Boole(expo(u, env) > 0)
     return result
 
-def frac(u):
-    assert unumQ(u)
-    result = BitShiftRight(BitAnd(u, fracmask(u)), utagsize)
+def frac(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitShiftRight(BitAnd(u, fracmask(u, env)), env.utagsize)
     return result
 
-def inexQ(u):
-    assert unumQ(u)
-    result = BitAnd(ubitmask, u) > 0
+def inexQ(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitAnd(env.ubitmask, u) > 0
     return result
 
-def exQ(u):
-    assert unumQ(u)
-    result = BitAnd(ubitmask, u) == 0
+def exQ(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitAnd(env.ubitmask, u) == 0
     return result
 
-def exact(u):
-    assert unumQ(u)
-    result = BitXor(u, ubitmask) if inexQ(u) else u
+def exact(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = BitXor(u, env.ubitmask) if inexQ(u, env) else u
     return result
 
-def colorcode(u):
+class UnumFields(object):
+    """ The six fields of a unum bit string, as returned by decode.
+    """
+    __slots__ = ('sign', 'expo', 'frac', 'ubit', 'esizeminus1', 'fsizeminus1')
+
+    def __init__(self, sign, expo, frac, ubit, esizeminus1, fsizeminus1):
+        self.sign = sign
+        self.expo = expo
+        self.frac = frac
+        self.ubit = ubit
+        self.esizeminus1 = esizeminus1
+        self.fsizeminus1 = fsizeminus1
+
+    def __repr__(self):
+        return 'UnumFields(sign=%s, expo=%s, frac=%s, ubit=%s, esizeminus1=%s, fsizeminus1=%s)' % (
+            self.sign, self.expo, self.frac, self.ubit, self.esizeminus1, self.fsizeminus1)
+
+def decode(u, env=None):
+    """ Take apart a unum bit string in one pass.  Gives the same values as
+    sign, expo, frac, Boole(inexQ), esizeminus1 and fsizeminus1, without
+    each of those recomputing the masks the others need.
+    """
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    return _decode(u, env)
+
+def _decode(u, env):
+    """ Unchecked kernel of decode.
+    """
+    fsizeminus1 = BitAnd(u, env.fsizemask)
+    esizeminus1 = BitShiftRight(BitAnd(u, env.esizemask), env.fsizesize)
+    # Shift each field down to the bottom in turn:
+    rest = BitShiftRight(u, env.utagsize)
+    frac = BitAnd(rest, BitShiftLeft(1, fsizeminus1 + 1) - 1)
+    rest = BitShiftRight(rest, fsizeminus1 + 1)
+    expo = BitAnd(rest, BitShiftLeft(1, esizeminus1 + 1) - 1)
+    sign = BitAnd(BitShiftRight(rest, esizeminus1 + 1), 1)
+    ubit = Boole(BitAnd(u, env.ubitmask))
+    return UnumFields(sign, expo, frac, ubit, esizeminus1, fsizeminus1)
+
+def colorcode(u, env=None):
     """Display the six fields of a unum bit string, color-coded and spaced.
     """
-    assert unumQ(u)
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    if current_tables is not None and current_tables.env is env:
+        return current_tables.colorcode[u]
+    d = _decode(u, env)
     result = Row(
-        (Style(sign(u), Red, Bold),
+        (Style(d.sign, Red, Bold),
          " ",
-         Style(IntegerString(expo(u), 2, esize(u)), brightblue, Bold),
+         Style(IntegerString(d.expo, 2, d.esizeminus1 + 1), brightblue, Bold),
          " ",
-         Style(IntegerString(frac(u), 2, fsize(u)), Bold),
+         Style(IntegerString(d.frac, 2, d.fsizeminus1 + 1), Bold),
          " ",
-         Style(Boole(inexQ(u)), Magenta),
+         Style(d.ubit, Magenta),
          " ",
-         Style(IntegerString(esizeminus1(u), 2, esizesize), sanegreen),
+         Style(IntegerString(d.esizeminus1, 2, env.esizesize), sanegreen),
          " ",
-         Style(IntegerString(fsizeminus1(u), 2, fsizesize), Gray)))
+         Style(IntegerString(d.fsizeminus1, 2, env.fsizesize), Gray)))
     return result
 
 # Numerical value meant by exponent bits; helper function for u2f:
-def expovalue(u):
-    assert unumQ(u)
-    result = expo(u) - bias(u) + 1 - hidden(u)
+def expovalue(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = expo(u, env) - bias(u, env) + 1 - hidden(u, env)
     return result
 
 # Convert an exact unum to its float value.
-def u2f(u):
-    assert unumQ(u)
-    assert exQ(u)
-    if u == posinfu:
+def u2f(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    assert not checking or exQ(u, env)
+    return _u2f(u, env)
+
+def _u2f(u, env):
+    """ Unchecked kernel of u2f.
+    """
+    if current_tables is not None and current_tables.env is env:
+        x = current_tables.u2f[u]
+        # NaN marks an inexact unum, which the table leaves to us:
+        if x == x:
+            return x
+    if u == env.posinfu:
         result = Infinity
-    elif u == neginfu:
+    elif u == env.neginfu:
         result = NegInfinity
     else:
-        # signn = (-1)**sign(u)
-        # exponentt = 2**expovalue(u)
-        # hiddenn = hidden(u)
-        # fracc = frac(u)
-        # fsizee = fsize(u)
-        # result = signn * exponentt * (hiddenn + fracc/float(2)**fsizee)
-        result = (-1)**sign(u) * 2**expovalue(u) * (hidden(u) + frac(u)/float(2)**fsize(u))
+        d = _decode(u, env)
+        hiddenn = Boole(d.expo > 0)
+        # Same as expovalue(u):
+        exponentt = d.expo - (2**d.esizeminus1 - 1) + 1 - hiddenn
+        result = (-1)**d.sign * 2**exponentt * (hiddenn + d.frac/float(2)**(d.fsizeminus1 + 1))
     return float(result)
 
 # Biggest unum possible with identical utag contents.
-def bigu(u):
-    assert unumQ(u)
-    result = expomask(u) + fracmask(u) + BitAnd(efsizemask, u) \
-        - ulpu * Boole(BitAnd(u, efsizemask) == efsizemask)
+def bigu(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    if current_tables is not None and current_tables.env is env:
+        return current_tables.bigu[u]
+    result = _bigu(u, _decode(u, env), env)
+    return result
+
+def _bigu(u, d, env):
+    """ bigu, given u already decoded into d.
+    """
+    esizee = d.esizeminus1 + 1
+    fsizee = d.fsizeminus1 + 1
+    # Same as expomask(u) + fracmask(u):
+    masks = (BitShiftLeft(BitShiftLeft(1, esizee) - 1, fsizee + env.utagsize) +
+             BitShiftLeft(BitShiftLeft(1, fsizee) - 1, env.utagsize))
+    result = masks + BitAnd(env.efsizemask, u) \
+        - env.ulpu * Boole(BitAnd(u, env.efsizemask) == env.efsizemask)
     return result
 
 # Biggest numerical value representable with identical utag contents.
-def big(u):
-    assert unumQ(u)
-    result = u2f(bigu(u))
+def big(u, env=None):
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    result = _u2f(bigu(u, env), env)
     return result
 
 # Some synonyms.
@@ -582,35 +776,39 @@ def gQ(x):
     result = is_2_float_bool_pairs(x) and (contains_NaN(x) or equal_endpoints(x) or lower_higher_endpoints(x))
     return result
 
-def uboundQ(x):
+def uboundQ(x, env=None):
     """ Test for a value being in the form of a ubound, with one or two unums. 
     """
+    env = env or current_env
     def is_1_or_2_list(x):
         return isinstance(x, (list, tuple)) and len(x)in (1, 2)
 
     if is_1_or_2_list(x):
         xL = x[0]
         xR = x[-1]
-        if unumQ(xL) and unumQ(xR):
-            gL = unum2g(xL)
-            gR = unum2g(xR)
-            result = ((len(x) == 1 or xL == qNaNu or xL == sNaNu or xR == qNaNu or xR == sNaNu) or
-                (gL[0][0] < gR[0][1] or (gL[0][0] == gR[0][1] and exQ(xL) and exQ(xR))))
+        if unumQ(xL, env) and unumQ(xR, env):
+            gL = _unum2g(xL, env)
+            gR = _unum2g(xR, env)
+            result = ((len(x) == 1 or xL == env.qNaNu or xL == env.sNaNu or
+                       xR == env.qNaNu or xR == env.sNaNu) or
+                (gL[0][0] < gR[0][1] or
+                 (gL[0][0] == gR[0][1] and
+                  BitAnd(env.ubitmask, xL) == 0 and BitAnd(env.ubitmask, xR) == 0)))
         else:
             result = False
     else:
         result = False
     return result
 
-def uboundpairQ(x):
+def uboundpairQ(x, env=None):
     """ Test for a value being in the form of a ubound with two unums.
     """
-    return uboundQ(x) and len(x) == 2
+    return uboundQ(x, env) and len(x) == 2
 
-def uQ(x):
+def uQ(x, env=None):
     """ Test for a value being in the u-layer: unum or ubound.
     """
-    return unumQ(x) or uboundQ(x)
+    return unumQ(x, env) or uboundQ(x, env)
 
 def f2g(x):
     """Trivial expression of a floatable value in the form of a general interval.
@@ -624,57 +822,234 @@ def f2g(x):
                 [closed, closed]]
     return result
 
-def unum2g(u):
+def unum2g(u, env=None):
     """ Conversion of a unum to a general interval.
     """
-    assert unumQ(u)
-    if u == qNaNu or u == sNaNu:
+    env = env or current_env
+    assert not checking or unumQ(u, env)
+    return _unum2g(u, env)
+
+def _unum2g(u, env):
+    """ Unchecked kernel of unum2g.
+    """
+    if current_tables is not None and current_tables.env is env:
+        g = current_tables.unum2g[u]
+        if g is not None:
+            return [[g[0], g[1]],
+                    [g[2], g[3]]]
+    if u == env.qNaNu or u == env.sNaNu:
         result = [[NaN, NaN],
                 [open, open]]
     else:
-        x = u2f(exact(u))
-        y = u2f(exact(u) + ulpu)
-        if exQ(u):
+        d = _decode(u, env)
+        exact_u = BitXor(u, env.ubitmask) if d.ubit else u
+        x = _u2f(exact_u, env)
+        if not d.ubit:
             result = [[x, x],
                     [closed, closed]]
-        elif u == bigu(u) + ubitmask:
-            result = [[big(u), Infinity],
-                    [open, open]]
-        elif u == signmask(u) + bigu(u) + ubitmask:
-            result = [[NegInfinity, -big(u)],
-                    [open, open]]
-        elif sign(u) == 1:
-            result = [[y, x],
-                    [open, open]]
         else:
-            # If negative, the left endpoint is the one farther from zero.
-            result = [[x, y],
-                    [open, open]]
+            # Not a validity check that fast mode could skip: unum2g has no
+            # answer for the last few inexact unums before the NaNs.
+            assert exact_u + env.ulpu <= env.sNaNu
+            y = _u2f(exact_u + env.ulpu, env)
+            big_u = _bigu(u, d, env)
+            # Same as signmask(u):
+            sign_mask = BitShiftLeft(1, d.esizeminus1 + d.fsizeminus1 + 2 + env.utagsize)
+            if u == big_u + env.ubitmask:
+                result = [[_u2f(big_u, env), Infinity],
+                        [open, open]]
+            elif u == sign_mask + big_u + env.ubitmask:
+                result = [[NegInfinity, -_u2f(big_u, env)],
+                        [open, open]]
+            elif d.sign == 1:
+                result = [[y, x],
+                        [open, open]]
+            else:
+                # If negative, the left endpoint is the one farther from zero.
+                result = [[x, y],
+                        [open, open]]
     return result
 
-def ubound2g(ub):
+def ubound2g(ub, env=None):
     """ Conversion of a ubound to a general interval.
     """
-    assert uboundQ(ub)
+    env = env or current_env
+    assert not checking or uboundQ(ub, env)
+    return _ubound2g(ub, env)
+
+def _ubound2g(ub, env):
+    """ Unchecked kernel of ubound2g.
+    """
     uL = ub[0]
     uR = ub[-1]
-    if uL == qNaNu or uL == sNaNu or uR == qNaNu or uR == sNaNu:
+    if uL == env.qNaNu or uL == env.sNaNu or uR == env.qNaNu or uR == env.sNaNu:
         result = [[NaN, NaN],
                 [open, open]]
     else:
-        gL, gR = (unum2g(uL), unum2g(uR))
+        gL, gR = (_unum2g(uL, env), _unum2g(uR, env))
         result = [[gL[0][0], gR[0][1]],
                 [gL[1][0], gR[1][1]]]
     return result
 
-def u2g(u):
+def u2g(u, env=None):
     """ Conversion of a unum or ubound to a general interval.
     """
-    assert uQ(u)
-    if unumQ(u):
-        return unum2g(u)
+    env = env or current_env
+    # Always checked, even in fast mode; see setchecking.
+    assert uQ(u, env)
+    if unumQ(u, env):
+        return _unum2g(u, env)
     else:
-        return ubound2g(u)
+        return _ubound2g(u, env)
+
+# Conversion of general intervals back to the u-layer.
+#
+# The g-layer arithmetic in unum.arith computes its endpoints exactly, as
+# fractions.Fraction values (or infinities), so g2u first rounds each
+# endpoint outwards to a float.  An endpoint that rounding moves becomes
+# open, which keeps the resulting ubound an enclosure of the exact result.
+
+def _next_float(x, direction):
+    """ The float adjacent to the finite float x, towards +Infinity if
+    direction > 0, otherwise towards -Infinity.
+    """
+    if x == 0:
+        return math.ldexp(direction, -1074)
+    bits = struct.unpack('<Q', struct.pack('<d', x))[0]
+    # Away from zero is one up in the magnitude bits, whatever the sign:
+    bits += 1 if (x > 0) == (direction > 0) else -1
+    return struct.unpack('<d', struct.pack('<Q', bits))[0]
+
+def _round_endpoint(x, direction):
+    """ Round an exact endpoint to a float, down if direction < 0 and up if
+    direction > 0.  Returns the float and whether it differs from x.
+    """
+    if isinstance(x, float):
+        return x, False
+    try:
+        result = float(x)
+    except OverflowError:
+        result = Infinity if x > 0 else NegInfinity
+    if result == Infinity and direction < 0:
+        result = sys.float_info.max
+    elif result == NegInfinity and direction > 0:
+        result = -sys.float_info.max
+    elif (result < x) if direction > 0 else (result > x):
+        result = _next_float(result, direction)
+    return result, result != x
+
+def g2u(g, env=None):
+    """ Conversion of a general interval to a ubound that contains it.  The
+    endpoints may be floats or exact fractions.Fraction values.
+
+    Exact, representable endpoints give exact unums (or, if open, the
+    inexact unum just inside them); anything else gives the inexact unum
+    around it.  The result is a one-unum ubound if both ends come out the
+    same, and {qNaNu} if g is NaN or empty.
+    """
+    env = env or current_env
+    (lo, hi), (lo_open, hi_open) = g
+    if lo != lo or hi != hi or lo > hi or (lo == hi and (lo_open or hi_open)):
+        return [env.qNaNu]
+    lo, lo_moved = _round_endpoint(lo, -1)
+    hi, hi_moved = _round_endpoint(hi, 1)
+    lo_open = lo_open or lo_moved
+    hi_open = hi_open or hi_moved
+    # Left end:
+    uL = x2u(lo, env)
+    if lo_open and BitAnd(env.ubitmask, uL) == 0:
+        # The inexact unum just to the right of lo.  Above zero it is the
+        # next one up; below zero it is one ULP nearer zero.
+        uL = uL + env.ubitmask if lo >= 0 else uL - env.ulpu + env.ubitmask
+    # Right end, the same in reverse:
+    uR = x2u(hi, env)
+    if hi_open and BitAnd(env.ubitmask, uR) == 0:
+        if hi > 0:
+            uR = uR - env.ulpu + env.ubitmask
+        elif hi == 0:
+            # Negative inexact zero, (-ULP, 0):
+            uR = signmask(0, env) + env.ubitmask
+        else:
+            uR = uR + env.ubitmask
+    return [uL] if uL == uR else [uL, uR]
+
+# Lookup tables for small environments.
+#
+# Environments up to about (2, 3) have few enough unums to enumerate them
+# all.  Table mode computes the u2f, unum2g, bigu, numbits and colorcode
+# results of every unum once, so that later calls are just list indexing.
+
+# The biggest environment that table mode accepts; (2, 3) and (3, 2) have
+# 2**19 unums:
+_TABLES_MAX_UBITS = 19
+
+class UnumTables(object):
+    """ The u2f, unum2g, bigu, numbits and colorcode results for every unum of
+    one environment, indexed by unum.  Entries that the primitive itself
+    cannot compute (u2f of an inexact unum, unum2g of a unum next to sNaNu)
+    are left as NaN or None, and the primitive falls back to its own
+    computation, and assertion, for those.
+    """
+    __slots__ = ('env', 'u2f', 'unum2g', 'bigu', 'numbits', 'colorcode')
+
+    def __init__(self, env):
+        assert env.maxubits <= _TABLES_MAX_UBITS, \
+            'Environment %s is too big for table mode' % ((env.esizesize, env.fsizesize),)
+        us = xrange(env.sNaNu + 1)
+        u2f_table = array.array('d', [u2f(u, env) if exQ(u, env) else NaN for u in us])
+        bigu_table = array.array('l', [bigu(u, env) for u in us])
+        numbits_table = array.array('B', [numbits(u, env) for u in us])
+        object.__setattr__(self, 'env', env)
+        object.__setattr__(self, 'u2f', u2f_table)
+        object.__setattr__(self, 'unum2g', [
+            self._unum2g_entry(u, env, u2f_table, bigu_table, numbits_table) for u in us])
+        object.__setattr__(self, 'bigu', bigu_table)
+        object.__setattr__(self, 'numbits', numbits_table)
+        object.__setattr__(self, 'colorcode', [colorcode(u, env) for u in us])
+
+    @staticmethod
+    def _unum2g_entry(u, env, u2f_table, bigu_table, numbits_table):
+        """ unum2g(u, env) as a (left, right, left open, right open) tuple,
+        following unum2g step by step but looking up u2f, bigu and numbits
+        in the tables already built.
+        """
+        if u == env.qNaNu or u == env.sNaNu:
+            return NaN, NaN, open, open
+        exact_u = BitAnd(u, BitXor(env.sNaNu, env.ubitmask))
+        x = u2f_table[exact_u]
+        if exact_u == u:
+            return x, x, closed, closed
+        if exact_u + env.ulpu > env.sNaNu:
+            # unum2g's own u2f(exact(u) + ulpu) fails its assertion.
+            return None
+        y = u2f_table[exact_u + env.ulpu]
+        big_u = bigu_table[u]
+        sign_mask = BitShiftLeft(1, numbits_table[u] - 1)
+        if u == big_u + env.ubitmask:
+            return u2f_table[big_u], Infinity, open, open
+        elif u == sign_mask + big_u + env.ubitmask:
+            return NegInfinity, -u2f_table[big_u], open, open
+        elif BitAnd(u, sign_mask) > 0:
+            return y, x, open, open
+        else:
+            # If negative, the left endpoint is the one farther from zero.
+            return x, y, open, open
+
+    def __setattr__(self, name, value):
+        raise AttributeError('UnumTables is immutable; cannot set %s' % name)
+
+# One UnumTables per (esizesize, fsizesize) pair, built on first use:
+_tables = {}
+
+def gettables(env):
+    """ Return the (cached) UnumTables for an UnumEnv.
+    """
+    key = (env.esizesize, env.fsizesize)
+    try:
+        return _tables[key]
+    except KeyError:
+        result = _tables[key] = UnumTables(env)
+        return result
 
 # def x2u_orig(x):
 #     """ Conversion of a floatable real to a unum. Same as the "^"
@@ -762,100 +1137,334 @@ def u2g(u):
 #             result = y
 #     return result
 
-def x2u(x):
+def x2u(x, env=None):
     """ Conversion of a floatable real to a unum. Same as the "^"
     annotation. Most of the complexity stems from seeking the shortest
     possible bit string.
+
+    Works on |x| as an exact integer ratio (see _ratio), so ints, longs and
+    fractions.Fraction values convert exactly too, and no step rounds.
     """
+    env = env or current_env
+    # Always checked, even in fast mode; see setchecking.
     assert floatQ(x)
     # Exceptional nonnumeric values:
-    if x is NaN:
-        result = qNaNu
+    if x != x:
+        result = env.qNaNu
     elif x == Infinity:
-        result = posinfu
+        result = env.posinfu
     elif x == NegInfinity:
-        result = neginfu
-    # Magnitudes too large to represent:
-    elif Abs(x) > maxreal:
-        result = maxrealu + ubitmask + (signbigu if x < 0 else 0)
+        result = env.neginfu
     # Zero is a special case. The smallest unum for it is just 0:
-    elif  x == 0:
+    elif x == 0:
         result = 0
-    # Magnitudes too small to represent become
-    # "inexact zero" with the maximum exponent and fraction field sizes:
-    elif Abs(x) < smallsubnormal:
-        result = utagmask + (signbigu if x < 0 else 0)
-    # For subnormal numbers, divide by the ULP value to get the fractional part.
-    # The While loop strips off trailing bits.
-    elif Abs(x) < u2f(smallnormalu):
-        y = Abs(x)/float(smallsubnormal)
-        y = ((signbigu if x < 0 else 0) + efsizemask +
-             (ubitmask if y != Floor(y) else 0) +
-             BitShiftLeft (Floor(y), utagsize))
-        while BitAnd(BitShiftLeft(3, utagsize - 1), y) == 0:
-            # /float(2) not needed below:
-            y = (y - BitAnd(efsizemask, y)) / 2 + BitAnd(efsizemask, y) - 1
-        result = y
-    # All remaining cases are in the normalized range.
     else:
-        y = Abs(x)/float(2)**scale(x)
-        n = 0
-        while Floor(y) != y and n < fsizemax:
-            n += 1
-            y *= 2
-        if y == Floor(y): # then the value is representable
-            # exactly. Fill in fields from right to left:
-            # Size of fraction field,
-            # fits in the rightmost fsizesize bits...
-            fraction_size = n - Boole(n > 0)
-            # Size of exponent field minus 1,
-            # fits in the esizesize bits...
-            exponent_size = BitShiftLeft(ne(x) - 1, fsizesize)
-            # Significant bits after hidden bit,
-            # fits left of the unum tag bits...
-            fraction = (0 if n == 0 else BitShiftLeft(Floor(y) - 2**scale(y), utagsize))
-            # Value of exponent bits, adjusted for bias...
-            exponent = BitShiftLeft(scale(x) + 2**(ne(x) - 1) - 1,
-                                    utagsize + n + Boole(n == 0))
-            # If negative, add the sign bit
-            sign_bit = (BitShiftLeft(1, utagsize + n + Boole(n == 0) + ne(x)) if x < 0 else 0)
-            y = sign_bit + exponent + fraction + exponent_size + fraction_size
-            # If a number is more concise as a subnormal, make it one.
-            z1 =  Log(2, Abs(x))
-            if IntegerQ(z1) and z1 >= 1:
-                z = Log(2, 1 - z1)
-                if IntegerQ(z) and z >= 0:
-                    result = (BitShiftLeft(z, fsizesize) + ulpu +
-                            Boole(x < 0) * signmask(BitShiftLeft(z, fsizesize)))
-                else:
-                    result = y
+        num, den = _ratio(x)
+        s = _scale_ratio(num, den)
+        bias = 2**(env.esizemax - 1) - 1
+        sign_u = env.signbigu if x < 0 else 0
+        if s < 1 - bias:
+            # Below smallnormal: count multiples of smallsubnormal (that is,
+            # of 2**(1 - bias - fsizemax)).
+            k, r = divmod(BitShiftLeft(num, bias + env.fsizemax - 1), den)
+            if k == 0:
+                # Magnitudes too small to represent become "inexact zero"
+                # with the maximum exponent and fraction field sizes:
+                result = env.utagmask + sign_u
+            elif r:
+                result = sign_u + env.efsizemask + env.ubitmask + BitShiftLeft(k, env.utagsize)
             else:
-                result = y
+                # Strip off the trailing zero bits of the fraction, reducing
+                # the fraction size by one for each:
+                t = _trailing_zeros(k)
+                result = (BitShiftRight(sign_u + BitShiftLeft(k, env.utagsize), t) +
+                          env.efsizemask - t)
         else:
-            # else inexact. Use all available fraction bits.
-            z = (Ceiling(Abs(x)/float(2)**(scale(x) - fsizemax)) *
-                 2**(scale(x) - fsizemax))
-            n = Max(ne(x), ne(z))
-            # All bits on for the fraction size, since we're using the maximum
-            y = (fsizemask
-                # Store the exponent size minus 1 in the exponent size field
-                + BitShiftLeft(n - 1, fsizesize)
-                # Back off by one ULP and make it inexact
-                + ubitmask - ulpu
-                # Fraction bits are the ones to the left of the binary point
-                # after removing hidden bit and scaling
-                + BitShiftLeft(Floor((z/float(2)**scale(z) - 1) * 2**fsizemax), utagsize)
-                # Exponent value goes in the exponent field
-                + BitShiftLeft(scale(z) + 2**(n - 1) - 1, utagsize + fsizemax))
-            # If x is negative, set the sign bit in the unum.
-            if x < 0:
-                y += signmask(y)
-            result = y
+            # The significand, scaled to fsizemax bits after the binary
+            # point, and the remainder below that:
+            z, r = divmod(BitShiftLeft(num, Max(env.fsizemax - s, 0)),
+                          BitShiftLeft(den, Max(s - env.fsizemax, 0)))
+            zmax = 2**(env.fsizemax + 1) - 2  # The significand of maxreal
+            # Magnitudes too large to represent:
+            if s > bias + 1 or (s == bias + 1 and (z > zmax or (z == zmax and r))):
+                result = env.maxrealu + env.ubitmask + sign_u
+            elif r == 0: # then the value is representable
+                # exactly. Fill in fields from right to left:
+                # Number of significant bits after the hidden bit,
+                n = env.fsizemax - _trailing_zeros(z)
+                # Size of fraction field,
+                # fits in the rightmost fsizesize bits...
+                fraction_size = n - Boole(n > 0)
+                # Size of exponent field minus 1,
+                # fits in the esizesize bits...
+                e = _ne_scale(s)
+                exponent_size = BitShiftLeft(e - 1, env.fsizesize)
+                # Significant bits after hidden bit,
+                # fits left of the unum tag bits...
+                fraction = (0 if n == 0 else
+                            BitShiftLeft(BitShiftRight(z, env.fsizemax - n) - 2**n, env.utagsize))
+                # Value of exponent bits, adjusted for bias...
+                exponent = BitShiftLeft(s + 2**(e - 1) - 1, env.utagsize + n + Boole(n == 0))
+                # If negative, add the sign bit
+                sign_bit = (BitShiftLeft(1, env.utagsize + n + Boole(n == 0) + e) if x < 0 else 0)
+                # The prototype then looks for a shorter subnormal form for
+                # x = 1, 1/2, 1/8, ...  Its IntegerQ(Log(...)) test was never
+                # true here (Log returns floats), so that step is left out
+                # to keep the results unchanged.
+                result = sign_bit + exponent + fraction + exponent_size + fraction_size
+            else:
+                # else inexact. Use all available fraction bits, rounding
+                # the significand up...
+                z += 1
+                # ...which may carry into the next binade:
+                sz = s + 1 if z == 2**(env.fsizemax + 1) else s
+                e = Max(_ne_scale(s), _ne_scale(sz))
+                # All bits on for the fraction size, since we're using the maximum
+                y = (env.fsizemask
+                    # Store the exponent size minus 1 in the exponent size field
+                    + BitShiftLeft(e - 1, env.fsizesize)
+                    # Back off by one ULP and make it inexact
+                    + env.ubitmask - env.ulpu
+                    # Fraction bits are the ones to the left of the binary point
+                    # after removing hidden bit and scaling
+                    + BitShiftLeft(BitShiftRight(z, sz - s) - 2**env.fsizemax, env.utagsize)
+                    # Exponent value goes in the exponent field
+                    + BitShiftLeft(sz + 2**(e - 1) - 1, env.utagsize + env.fsizemax))
+                # If x is negative, set the sign bit in the unum (signmask(y)).
+                if x < 0:
+                    y += BitShiftLeft(1, e + env.fsizemax + env.utagsize)
+                result = y
     return result
 
+# Exact helpers for x2u, scale and ne.
+
+def _ratio(x):
+    """ |x| as an exact (numerator, denominator) pair of integers.
+    """
+    if isinstance(x, float):
+        result = Abs(x).as_integer_ratio()
+    elif isinstance(x, fractions.Fraction):
+        result = (Abs(x.numerator), x.denominator)
+    else:
+        result = (Abs(x), 1)
+    return result
+
+def _scale_ratio(n, d):
+    """ Floor(Log(2, n/d)), exactly, for positive integers n and d.
+    """
+    s = n.bit_length() - d.bit_length()
+    if s >= 0:
+        below = n < BitShiftLeft(d, s)
+    else:
+        below = BitShiftLeft(n, -s) < d
+    return s - 1 if below else s
+
+def _ne_scale(s):
+    """ ne for a nonzero value with scale s:
+    Ceiling(Log(2, 1 + Abs(s - 1))) + 1, which is 1 when s is 1.
+    """
+    return Abs(s - 1).bit_length() + 1
+
+def _trailing_zeros(k):
+    """ Number of trailing zero bits of a positive integer.
+    """
+    return BitAnd(k, -k).bit_length() - 1
+
 # Assign the x2u function to the "^" notation. *)
 OverHat = x2u
 
+# Batch conversions between NumPy arrays of floats and arrays of unums.
+#
+# When every unum of the environment fits in 64 bits (maxubits <= 64), the
+# fields are extracted and packed with vectorized integer operations on
+# uint64 arrays.  The exponent and fraction of each float come from
+# numpy.frexp, so unlike x2u no Log or Floor calls and no doubling loops are
+# needed.  Bigger environments fall back to calling x2u/u2f on each element
+# of an object array.
+
+def _require_numpy():
+    if numpy is None:
+        raise RuntimeError('NumPy is required for the batch conversions')
+
+def _fits_uint64(env):
+    return env.maxubits <= 64
+
+def _as_float(x):
+    """ float(x), or +/-Infinity if x is an integer too large for a float.
+    """
+    try:
+        return float(x)
+    except OverflowError:
+        return Infinity if x > 0 else NegInfinity
+
+def _bit_length_array(k):
+    """ Vectorized int.bit_length for an array of non-negative integers
+    below 2**53.
+    """
+    return numpy.frexp(k.astype(numpy.float64))[1].astype(numpy.int64)
+
+def _trailing_zeros_array(k):
+    """ Number of trailing zero bits of each (positive) element of an int64
+    array.
+    """
+    return _bit_length_array(k & -k) - 1
+
+def _shift_left(values, shifts):
+    """ values << shifts, as uint64.  Both operands are converted first, since
+    NumPy promotes a mix of int64 and uint64 to float64.
+    """
+    return numpy.left_shift(numpy.asarray(values).astype(numpy.uint64),
+                            numpy.asarray(shifts).astype(numpy.uint64))
+
+def _ne_array(scale_array):
+    """ Vectorized ne(), given the scale of each value rather than the value.
+    """
+    return _bit_length_array(numpy.abs(scale_array - 1)) + 1
+
+def x2u_array(xs, env=None):
+    """ Convert an array of floatable reals to an array of unums, giving the
+    same unum as x2u for each element.  Returns a uint64 array when the
+    environment's unums fit in 64 bits, otherwise an object array of Python
+    integers.
+    """
+    _require_numpy()
+    env = env or current_env
+    xs = numpy.asarray(xs, dtype=numpy.float64)
+    if not _fits_uint64(env):
+        # x2u recognizes NaN by identity, so hand it the module's NaN:
+        return numpy.frompyfunc(lambda x: x2u(NaN if x != x else float(x), env), 1, 1)(xs)
+    # NaNs are dealt with explicitly; don't warn about comparing them:
+    with numpy.errstate(invalid='ignore'):
+        return _x2u_array_uint64(xs, env)
+
+def _x2u_array_uint64(xs, env):
+    u64 = numpy.uint64
+    result = numpy.zeros(xs.shape, dtype=u64)
+    ax = numpy.abs(xs)
+    negative = xs < 0
+    sign_big = numpy.where(negative, u64(env.signbigu), u64(0))
+    finite = numpy.isfinite(xs)
+
+    # Exceptional nonnumeric values:
+    result[numpy.isnan(xs)] = env.qNaNu
+    result[xs == Infinity] = env.posinfu
+    result[xs == NegInfinity] = env.neginfu
+    # Magnitudes too large to represent:
+    too_big = finite & (ax > _as_float(env.maxreal))
+    result[too_big] = u64(env.maxrealu + env.ubitmask) + sign_big[too_big]
+    # Zero stays 0.  Magnitudes too small to represent become "inexact zero":
+    remaining = finite & ~too_big & (xs != 0)
+    too_small = remaining & (ax < _as_float(env.smallsubnormal))
+    result[too_small] = u64(env.utagmask) + sign_big[too_small]
+    remaining &= ~too_small
+
+    # Subnormal numbers:
+    subnormal = remaining & (ax < env.smallnormal)
+    if subnormal.any():
+        y = ax[subnormal] / float(env.smallsubnormal)
+        whole = numpy.floor(y)
+        inexact = y != whole
+        whole = whole.astype(numpy.int64)
+        # An exact subnormal loses its trailing zero fraction bits, and its
+        # fraction size shrinks to match.  The sign bit moves down with them:
+        drop = numpy.where(inexact, 0, _trailing_zeros_array(whole))
+        y = numpy.right_shift(sign_big[subnormal] + _shift_left(whole, env.utagsize),
+                              drop.astype(u64))
+        y += u64(env.efsizemask) - drop.astype(u64)
+        y[inexact] += u64(env.ubitmask)
+        result[subnormal] = y
+    remaining &= ~subnormal
+
+    # All remaining cases are in the normalized range.  With
+    # |x| = m * 2**exponent and 0.5 <= m < 1, the 53 significant bits of x
+    # are the integer m * 2**53, and scale(x) is exponent - 1:
+    if remaining.any():
+        m, exponent = numpy.frexp(ax[remaining])
+        bits = numpy.ldexp(m, 53).astype(numpy.int64)
+        scale_x = exponent.astype(numpy.int64) - 1
+        negative_r = negative[remaining]
+        ne_x = _ne_array(scale_x)
+        # Number of fraction bits needed after the hidden bit:
+        n = 52 - _trailing_zeros_array(bits)
+        exact = n <= env.fsizemax
+        y = numpy.zeros(bits.shape, dtype=u64)
+
+        if exact.any():
+            n_e = n[exact]
+            ne_e = ne_x[exact]
+            n_or_1 = numpy.maximum(n_e, 1)
+            fraction = numpy.right_shift(bits[exact], 52 - n_e) - numpy.left_shift(1, n_e)
+            y_e = ((numpy.maximum(n_e - 1, 0)).astype(u64) +
+                   _shift_left(ne_e - 1, env.fsizesize) +
+                   _shift_left(fraction, env.utagsize) +
+                   _shift_left(scale_x[exact] + numpy.left_shift(1, ne_e - 1) - 1,
+                               env.utagsize + n_or_1))
+            sign_bit = _shift_left(numpy.ones_like(n_e), env.utagsize + n_or_1 + ne_e)
+            y_e[negative_r[exact]] += sign_bit[negative_r[exact]]
+            y[exact] = y_e
+
+        inexact = ~exact
+        if inexact.any():
+            # Round the magnitude up to fsizemax fraction bits; that may
+            # carry into the next power of 2:
+            drop = 52 - env.fsizemax
+            rounded = numpy.right_shift(bits[inexact] + ((1 << drop) - 1), drop)
+            carry = rounded >> (env.fsizemax + 1)
+            scale_z = scale_x[inexact] + carry
+            fraction = numpy.right_shift(rounded, carry) - (1 << env.fsizemax)
+            n_i = numpy.maximum(ne_x[inexact], _ne_array(scale_z))
+            y_i = (u64(env.fsizemask) +
+                   _shift_left(n_i - 1, env.fsizesize) +
+                   u64(env.ubitmask) +
+                   _shift_left(fraction, env.utagsize) +
+                   _shift_left(scale_z + numpy.left_shift(1, n_i - 1) - 1,
+                               env.utagsize + env.fsizemax))
+            # Back off by one ULP:
+            y_i -= u64(env.ulpu)
+            sign_bit = _shift_left(numpy.ones_like(n_i), n_i + env.fsizemax + env.utagsize)
+            y_i[negative_r[inexact]] += sign_bit[negative_r[inexact]]
+            y[inexact] = y_i
+        result[remaining] = y
+    return result
+
+def u2f_array(us, env=None):
+    """ Convert an array of exact unums to an array of floats, giving the same
+    value as u2f for each element.
+    """
+    _require_numpy()
+    env = env or current_env
+    if not _fits_uint64(env):
+        us = numpy.asarray(us, dtype=object)
+        return numpy.frompyfunc(lambda u: u2f(int(u), env), 1, 1)(us).astype(numpy.float64)
+
+    us = numpy.asarray(us)
+    if us.size == 0:
+        # An empty list comes in as float64, which the dtype check refuses:
+        return numpy.zeros(us.shape, dtype=numpy.float64)
+    assert us.dtype.kind in 'iuO'
+    assert numpy.all((us >= 0) & (us <= env.sNaNu))
+    us = us.astype(numpy.uint64)
+    assert not numpy.any(us & numpy.uint64(env.ubitmask))
+
+    u64 = numpy.uint64
+    fs = (us & u64(env.fsizemask)) + u64(1)
+    es = ((us & u64(env.esizemask)) >> u64(env.fsizesize)) + u64(1)
+    one = numpy.ones_like(us)
+    frac_bits = (us >> u64(env.utagsize)) & ((one << fs) - one)
+    expo_bits = (us >> (u64(env.utagsize) + fs)) & ((one << es) - one)
+    signs = (us >> (u64(env.utagsize) + fs + es)) & one
+
+    hidden_bits = (expo_bits > 0).astype(numpy.int64)
+    bias_values = numpy.left_shift(1, es.astype(numpy.int64) - 1) - 1
+    expo_values = expo_bits.astype(numpy.int64) - bias_values + 1 - hidden_bits
+    fs = fs.astype(numpy.int64)
+    significand = numpy.left_shift(hidden_bits, fs) + frac_bits.astype(numpy.int64)
+    result = numpy.ldexp(significand.astype(numpy.float64), expo_values - fs)
+    result[signs == 1] *= -1
+    result[us == u64(env.posinfu)] = Infinity
+    result[us == u64(env.neginfu)] = NegInfinity
+    return result
+
 def autoN(x):
     """ View a float as a decimal, using as many digits as needed to be exact.
     """
@@ -876,19 +1485,20 @@ def autoN(x):
     #         print ('type(x): %s; y: %s; Floor(y): %s' % (type(x), y, Floor(y)))
     #         return "?"
 
-def unumview(u):
+def unumview(u, env=None):
     """ Display a unum with color-coding and annotation. Warning: there are some negative spaces in the StringForm
     expressions.
     """
-    e = expo(u)
-    es = esizeminus1(u)
-    f = frac(u)
-    fs = fsizeminus1(u)
-    g = u2g(u)
-    i = inexQ(u)
-    NaNQ = (u == sNaNu or u == qNaNu)
-    s = sign(u)
-    specQ = (u == sNaNu or u == qNaNu or u == posinfu or u == neginfu)
+    env = env or current_env
+    e = expo(u, env)
+    es = esizeminus1(u, env)
+    f = frac(u, env)
+    fs = fsizeminus1(u, env)
+    g = u2g(u, env)
+    i = inexQ(u, env)
+    NaNQ = (u == env.sNaNu or u == env.qNaNu)
+    s = sign(u, env)
+    specQ = (u == env.sNaNu or u == env.qNaNu or u == env.posinfu or u == env.neginfu)
 
     return Grid(
         (
@@ -898,24 +1508,24 @@ def unumview(u):
                     Frame=True,
                     Alignment="Left"),
                 Item(
-                    Style(IntegerString(e, 2, esize(u)), brightblue, "Input"),
+                    Style(IntegerString(e, 2, esize(u, env)), brightblue, "Input"),
                     Frame=True),
                 " ",
                 Item(
-                    Style(IntegerString(f, 2, fsize(u)), "Input"),
+                    Style(IntegerString(f, 2, fsize(u, env)), "Input"),
                     Frame="True"),
                 Item(
                     Style(Boole(i), Magenta, "Input", Plain),
                     Frame="True"),
                 Item(
-                    Style(IntegerString(es, 2, esizesize), sanegreen, "Input", Plain),
+                    Style(IntegerString(es, 2, env.esizesize), sanegreen, "Input", Plain),
                     Frame=True),
                 Item(
-                    Style(IntegerString(fs, 2, fsizesize), Gray, "Input", Plain),
+                    Style(IntegerString(fs, 2, env.fsizesize), Gray, "Input", Plain),
                     Frame=True),
                 " ",
-                u2f(u)
-                if not NaNQ and not i and u2f(u) != Floor(u2f(u)) else
+                u2f(u, env)
+                if not NaNQ and not i and u2f(u, env) != Floor(u2f(u, env)) else
                 Row(
                     (
                         Item(
@@ -928,8 +1538,7 @@ def unumview(u):
                                     if g[1][0] else
                                     "[``,",
                                     g[0][0])
-                            )
-                        ),
+                            ),
                         Item(
                             " "
                             if NaNQ or (g[0][0] == Floor(g[0][0]) and g[0][1] == Floor(g[0][1])) else
@@ -948,8 +1557,8 @@ def unumview(u):
                     if s == 0 else
                     "-",
                     Red),
-                Style(StringForm("``\[Times]", Superscript(2, expovalue(u))), brightblue),
-                Style(StringForm("\[NegativeThickSpace]``+\[NegativeThickSpace]\\[NegativeThickSpace]", hidden(u))),
+                Style(StringForm("``\[Times]", Superscript(2, expovalue(u, env))), brightblue),
+                Style(StringForm("\[NegativeThickSpace]``+\[NegativeThickSpace]\\[NegativeThickSpace]", hidden(u, env))),
                 DisplayForm(FractionBox(f, 2^(fs + 1))),
                 Style(
                     "\[CenterEllipsis]"
@@ -974,8 +1583,8 @@ def unumview(u):
                             StringForm(
                                 "= (``,"
                                 if g[1][0] else
-                                "= [``,"),
-                                autoN(g[0][0])
+                                "= [``,",
+                                autoN(g[0][0]))
                         )
                         *
                         Item(
@@ -1003,21 +1612,27 @@ def unumview(u):
 
 def scale (x):
     """ Helper function for conversion; find the scale factor, with exceptions.
+    Floor(Log(2, Abs(x))), computed exactly.
     """
-    assert floatQ(x) and x != Infinity and x is not NaN
+    assert not checking or (floatQ(x) and x != Infinity and x is not NaN)
     if x == 0:
         result = 0
+    elif isinstance(x, float):
+        result = math.frexp(x)[1] - 1
     else:
-        result = Floor(Log(2, Abs(x)))
+        result = _scale_ratio(*_ratio(x))
     return result
 
 def ne(x):
     """ Find a concise number of exponent bits, accounting for subnormals.
     """
-    assert floatQ(x) and x != Infinity and x is not NaN
-    if x == 0 or scale(x) == 1:
+    assert not checking or (floatQ(x) and x != Infinity and x is not NaN)
+    if x == 0:
         result = 1
     else:
-        result = Ceiling(Log(2, 1 + Abs(scale(x) - 1))) + 1
+        result = _ne_scale(scale(x))
     return result
 
+
+# Ubound arithmetic lives in its own module, built on the conversions above:
+from unum.arith import plusg, minusg, timesg, divideg, plusu, minusu, timesu, divideu
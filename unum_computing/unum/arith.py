@@ -0,0 +1,249 @@
+""" Ubound arithmetic (plusu, minusu, timesu, divideu), after John
+Gustafson's Mathematica prototype.
+
+Each operation converts its operands to general intervals with u2g, works
+on those in the g-layer, and converts the result back with g2u.  The
+g-layer operations (plusg, minusg, timesg, divideg) are exact: finite
+endpoints are carried as fractions.Fraction values, so the only rounding is
+g2u's, outwards.
+
+The u-layer operations are memoized in an LRU cache keyed on the
+environment and the operand bits, since the same unum operands tend to come
+round again and again (e.g. in ubox methods).
+"""
+
+import collections
+import fractions
+
+import unum
+from unum import Infinity, NegInfinity, NaN, open, closed, IntegerQ, u2g, g2u
+
+class LRUCache(object):
+    """ A dict-like cache that holds at most maxsize entries, discarding the
+    least recently used one when full.
+    """
+
+    def __init__(self, maxsize):
+        assert maxsize >= 0
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """ Return the entry for key, or None if there isn't one.
+        """
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        # Re-insert, to make it the most recently used:
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries.pop(key, None)
+        if self.maxsize > 0:
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+# The results of plusu, minusu, timesu and divideu:
+opcache = LRUCache(maxsize=2**16)
+
+def setcachesize(maxsize):
+    """ Change the number of results the u-layer operations remember.  0
+    turns memoization off.  Clears the cache.
+    """
+    global opcache
+    opcache = LRUCache(maxsize)
+
+# The g-layer.
+
+def _nang():
+    return [[NaN, NaN],
+            [open, open]]
+
+def _nangQ(g):
+    return g[0][0] != g[0][0] or g[0][1] != g[0][1]
+
+def _exact(x):
+    """ An endpoint as an exact Fraction.  Infinities stay as they are.
+    """
+    if x == Infinity or x == NegInfinity:
+        return x
+    return fractions.Fraction(x)
+
+def _exactg(g):
+    return [[_exact(g[0][0]), _exact(g[0][1])],
+            [g[1][0], g[1][1]]]
+
+def negateg(g):
+    """ Negation of a general interval.
+    """
+    if _nangQ(g):
+        return _nang()
+    return [[-g[0][1], -g[0][0]],
+            [g[1][1], g[1][0]]]
+
+def _plusleft(xv, xb, yv, yb):
+    """ Left endpoint of a sum; NaN if there is none.
+    """
+    if (xv == NegInfinity and not xb) or (yv == NegInfinity and not yb):
+        if (xv == Infinity and not xb) or (yv == Infinity and not yb):
+            return NaN, open
+        return NegInfinity, closed
+    if (xv == Infinity and not xb) or (yv == Infinity and not yb):
+        return Infinity, closed
+    if xv == NegInfinity or yv == NegInfinity:
+        return NegInfinity, open
+    return xv + yv, xb or yb
+
+def _plusright(xv, xb, yv, yb):
+    """ Right endpoint of a sum; NaN if there is none.
+    """
+    if (xv == Infinity and not xb) or (yv == Infinity and not yb):
+        if (xv == NegInfinity and not xb) or (yv == NegInfinity and not yb):
+            return NaN, open
+        return Infinity, closed
+    if (xv == NegInfinity and not xb) or (yv == NegInfinity and not yb):
+        return NegInfinity, closed
+    if xv == Infinity or yv == Infinity:
+        return Infinity, open
+    return xv + yv, xb or yb
+
+def plusg(x, y):
+    """ Addition in the g-layer.
+    """
+    if _nangQ(x) or _nangQ(y):
+        return _nang()
+    x, y = _exactg(x), _exactg(y)
+    lo, lo_b = _plusleft(x[0][0], x[1][0], y[0][0], y[1][0])
+    hi, hi_b = _plusright(x[0][1], x[1][1], y[0][1], y[1][1])
+    if lo != lo or hi != hi:
+        return _nang()
+    return [[lo, hi],
+            [lo_b, hi_b]]
+
+def minusg(x, y):
+    """ Subtraction in the g-layer.
+    """
+    return plusg(x, negateg(y))
+
+def _sgn(x):
+    return (x > 0) - (x < 0)
+
+def _timescorner(xv, xb, xside, yv, yb, yside):
+    """ The values, each with its open/closed flag, that a product of one
+    endpoint of x with one endpoint of y contributes to the product's
+    bounds; None if the product is NaN.  side is +1 for a left endpoint and
+    -1 for a right one: it gives the sign of the values next to an open zero.
+    """
+    xinf = xv == Infinity or xv == NegInfinity
+    yinf = yv == Infinity or yv == NegInfinity
+    # 0 times anything finite is exactly 0, but 0 times Infinity is NaN:
+    if (xv == 0 and not xb) or (yv == 0 and not yb):
+        if (xinf and not xb) or (yinf and not yb):
+            return None
+        return [(0, closed)]
+    if xinf or yinf:
+        xsign = xside if xv == 0 else _sgn(xv)
+        ysign = yside if yv == 0 else _sgn(yv)
+        inf = Infinity if xsign * ysign > 0 else NegInfinity
+        # Infinity times anything nonzero is exactly infinite:
+        b = (xb or not xinf) and (yb or not yinf)
+        if (xv == 0 or yv == 0) and b:
+            # An open infinity next to an open zero: the products fill
+            # everything in between.
+            return [(0, open), (inf, open)]
+        return [(inf, b)]
+    return [(xv * yv, xb or yb)]
+
+def timesg(x, y):
+    """ Multiplication in the g-layer.  The bounds of a product of two
+    intervals come from the products of their endpoints.
+    """
+    if _nangQ(x) or _nangQ(y):
+        return _nang()
+    x, y = _exactg(x), _exactg(y)
+    candidates = []
+    for i, xside in ((0, 1), (1, -1)):
+        for j, yside in ((0, 1), (1, -1)):
+            corner = _timescorner(x[0][i], x[1][i], xside, y[0][j], y[1][j], yside)
+            if corner is None:
+                return _nang()
+            candidates.extend(corner)
+    # On a tie, the closed endpoint wins (closed is False):
+    lo, lo_b = min(candidates)
+    hi, hi_b = max(candidates, key=lambda c: (c[0], not c[1]))
+    return [[lo, hi],
+            [lo_b, hi_b]]
+
+def _recipg(y):
+    """ Reciprocal of a general interval that does not contain zero.
+    """
+    def recip(v, inf):
+        if v == Infinity or v == NegInfinity:
+            return 0
+        if v == 0:
+            # An open zero; the values next to it are on the side of inf.
+            return inf
+        return 1 / v
+    return [[recip(y[0][1], NegInfinity), recip(y[0][0], Infinity)],
+            [y[1][1], y[1][0]]]
+
+def divideg(x, y):
+    """ Division in the g-layer.  NaN if the divisor contains zero.
+    """
+    if _nangQ(x) or _nangQ(y):
+        return _nang()
+    y = _exactg(y)
+    (lo, hi), (lo_b, hi_b) = y
+    if ((lo < 0 < hi) or (lo == 0 and not lo_b) or (hi == 0 and not hi_b)):
+        return _nang()
+    return timesg(x, _recipg(y))
+
+# The u-layer.
+
+def _operandkey(u):
+    return (u,) if IntegerQ(u) else tuple(u)
+
+def _memoized(opname, gop, u, v, env):
+    env = env or unum.current_env
+    key = (opname, env, _operandkey(u), _operandkey(v))
+    result = opcache.get(key)
+    if result is None:
+        result = tuple(g2u(gop(u2g(u, env), u2g(v, env)), env))
+        opcache.put(key, result)
+    return list(result)
+
+def plusu(u, v, env=None):
+    """ Addition of unums or ubounds.  Returns a ubound.
+    """
+    return _memoized('plus', plusg, u, v, env)
+
+def minusu(u, v, env=None):
+    """ Subtraction of unums or ubounds.  Returns a ubound.
+    """
+    return _memoized('minus', minusg, u, v, env)
+
+def timesu(u, v, env=None):
+    """ Multiplication of unums or ubounds.  Returns a ubound.
+    """
+    return _memoized('times', timesg, u, v, env)
+
+def divideu(u, v, env=None):
+    """ Division of unums or ubounds.  Returns a ubound, {qNaNu} if the
+    divisor contains zero.
+    """
+    return _memoized('divide', divideg, u, v, env)
@@ -1,154 +1,191 @@
 __author__ = 'reynolds12'
+""" Ubox routines, from John Gustafson's Mathematica prototype.
 
+The unum primitives come from the unum package in ../unum_computing, which
+is re-exported here, with setenv taking (e, f) rather than an (e, f)
+sequence.  Module-level environment values (esizesize, maxrealu, ...)
+reflect the last setenv made through this module.
+"""
 
-def BitShiftLeft(a, b):
-    """
-    :param a: integer
-    :param b: integer
-    :return:  integer
-    """
-    return a<<b
+import fractions
+import os
+import sys
 
-def BitShiftRight(a, b):
-    """
-    :param a: integer
-    :param b: integer
-    :return:  integer
-    """
-    return a>>b
+# Add the unum_computing dir to path, so we can import the unum package in it:
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(SCRIPT_DIR), 'unum_computing'))
 
-def BitOr(a, b):
-    """
-    :param a: integer
-    :param b: integer
-    :return:  integer
-    """
-    return a|b
-
-def BitAnd(a, b):
-    """
-    :param a: integer
-    :param b: integer
-    :return:  integer
-    """
-    return a&b
-
-def RGBColor(r, g, b):
-    """
-    :param r: integer
-    :param g: integer
-    :param b: integer
-    :return:  color
-    """
-    #TODO: implement
-    assert False
-    return 1
-
-def IntegerQ(x):
-    """
-
-    :param x: unum
-    :return: boolean
-    """
-    #TODO: implement
-    assert False
-    return x in integer
+import unum as _core
+from unum import *
+from unum import _copyenv
 
 def setenv(e, f):
     """
-    :param e:
-    :param f:
-    :return:
+    :param e: esizesize, 0 to 4
+    :param f: fsizesize, 0 to 11
+    :return: the new current UnumEnv
     """
-    assert (e in range(0, 4))
-    assert (f in range(0, 11))
-    global esizesize, fsizesize, esizemax, fsizemax, utagsize, maxubits,\
-        ubitmask, fsizemask, esizemask, efsizemask, utagmask,\
-        ulpu, smallsubnormalu, smallnormalu, signbigu,\
-        posinfu, maxrealu, minrealu, neginfu, negbigu, qNaNu, sNaNu,\
-        negopeninfu, posopeninfu, negopenzerou, maxreal, smallsubnormal
-    esizesize = e
-    fsizesize = f
-    esizemax = 2**esizesize
-    fsizemax = 2**fsizesize
-    utagsize = 1 + f + e
-    maxubits = 1 + esizemax + fsizemax + utagsize
-    ubitmask = BitShiftLeft(1, utagsize - 1)
-    fsizemask = BitShiftLeft(1, f) - 1
-    esizemask = (ubitmask - 1) - fsizemask
-    efsizemask = BitOr(esizemask, fsizemask)
-    utagmask = BitOr(ubitmask, efsizemask)
-    ulpu = BitShiftLeft(1, utagsize)
-    smallsubnormalu = efsizemask + ulpu
-    smallnormalu = efsizemask + BitShiftLeft(1, maxubits - 1 - esizemax)
-    signbigu = BitShiftLeft(1, maxubits - 1)
-    posinfu = signbigu - 1 - ubitmask
-    maxrealu = posinfu - ulpu
-    minrealu = maxrealu + signbigu
-    neginfu = posinfu + signbigu
-    negbigu = neginfu - ulpu
-    qNaNu = posinfu + ubitmask
-    sNaNu = neginfu + ubitmask
-
-    if utagsize == 1:
-        negopeninfu = 0b1101
-        posopeninfu = 0b0101
-    else:
-        negopeninfu = BitShiftLeft(0b1111, utagsize - 1)
-        posopeninfu = BitShiftLeft(0b0111, utagsize - 1)
-    negopenzerou = BitShiftLeft(0b1001, utagsize - 1)
-    maxreal = 2**2**(esizemax - 1)*(2**fsizemax - 1)/2**(fsizemax - 1)
-    smallsubnormal = 2**(2 - 2**(esizemax - 1) - fsizemax)
-
+    env = _core.setenv((e, f))
+    _copyenv(env, globals())
+    return env
 
 # Make sure values are initialized to something, to start.
 setenv(3, 4)
 
-# Local palette definitions. *)
-gogreen = RGBColor(0, .75, .625)  # Traffic light color *)
-cautionamber = RGBColor(.96, .72, 0)  # Traffic light color *)
-stopred = RGBColor(1, .125, 0)  # Traffic light color *)
-brightblue = RGBColor(.25, .5, 1)  # Better contrast with black *)
-sanegreen = RGBColor(0, .75, 0)  # Better contrast with white *)
-paleblue = RGBColor(.9, .9, 1)  # Background color for g-bound tables *)
-brightpurple = RGBColor(.75, .5, 1)  # Used in "wrapping problem" *)
-brightmagenta = RGBColor(1, .25, 1)  # Prints better than magenta *)
-textamber = RGBColor(.75, .5, 0)  # Better contrast with white *)
-chartreuse = RGBColor(.875, 1, .5)  # Background for general interval table *)
-
-
-# View the three fields of a utag as a color-coded binary string. *)
-
-def utagview(u):
-    """
-    :param u: integer
-    :return:
-    """
-    e = BitShiftRight(BitAnd(u, esizemask), fsizesize)
-    f = BitAnd(u, fsizemask)
-    i = BitShiftRight(u, utagsize - 1)
-    if i == 1:
-        ubit_flag = "..."
+# Ubox routines.
+#
+# At the finest ULP (the utag with esize = esizemax and fsize = fsizemax), the
+# unums of one sign differ only in their exponent and fraction bits, and
+# counting those bits up walks the number line in order:  0, (0,
+# smallsubnormal), smallsubnormal, ..., maxreal, (maxreal, Infinity),
+# Infinity.  Number those unums by position, even for the exact ones and odd
+# for the open intervals between them, negative for the negative ones.  With
+# s = smallsubnormal:
+#
+#     position:  ...   -3       -2     -1      0     1      2     3       ...
+#     unum:      ...  (-2s, -s)  -s   (-s, 0)  0   (0, s)   s   (s, 2s)   ...
+#
+# Then the uboxes that tile any interval are the unums at a range of
+# positions, which can be counted, and generated one at a time without ever
+# building a list.
+
+def _finestindex(q, env):
+    """ For an exact magnitude 0 <= q <= maxreal, the exponent and fraction
+    bits k of the largest finest-ULP exact unum <= q, and whether it is
+    equal to q.
+    """
+    bias = 2**(env.esizemax - 1) - 1
+    if q < fractions.Fraction(2)**(1 - bias):
+        # Subnormal: count ULPs of smallsubnormal.
+        scaled = q / fractions.Fraction(2)**(1 - bias - env.fsizemax)
+        k = scaled.numerator // scaled.denominator
     else:
-        ubit_flag = "\/"  # down arrow
-    Grid(((Style(i, Magenta, "Input"),
-           Style(IntegerString(e, 2, esizesize), sanegreen, "Input"),
-           Style(IntegerString(f, 2, fsizesize), Gray, "Input")),
-         (ubit_flag,
-          Style(e + 1, "Text"),
-          Style(f + 1, "Text"))),
-         Frame -> (None, None, {(1, 1) : True, (1, 2) : True, (1, 3) : True}))
-
-
-def unumQ(x):
-    """ Test if a value is a legitimate unum. (Must be integer, and in-range.) *)
-    :param x:
-    :return boolean:
-    """
-    if IntegerQ(x):
-        if (x >= 0) ^ (x <= sNaNu):
-            return True
-        else:
-            return False
+        scale = q.numerator.bit_length() - q.denominator.bit_length()
+        if q < fractions.Fraction(2)**scale:
+            scale -= 1
+        scaled = q / fractions.Fraction(2)**(scale - env.fsizemax)
+        k = (BitShiftLeft(scale + bias, env.fsizemax) +
+             scaled.numerator // scaled.denominator - 2**env.fsizemax)
+    return k, scaled.denominator == 1
+
+def _position(x, env):
+    """ Position of the finest-ULP unum that contains the real x.
+    """
+    kmax = BitShiftRight(env.posinfu, env.utagsize)
+    if x == Infinity or x == NegInfinity:
+        p = 2 * kmax
+    elif Abs(x) > env.maxreal:
+        p = 2 * (kmax - 1) + 1
+    else:
+        k, exactQ = _finestindex(Abs(fractions.Fraction(x)), env)
+        p = 2 * k + (0 if exactQ else 1)
+    return -p if x < 0 else p
+
+def _finestu(p, env):
+    """ The finest-ULP unum at position p.
+    """
+    k = BitShiftRight(Abs(p), 1)
+    u = BitShiftLeft(k, env.utagsize) + env.efsizemask + (env.ubitmask if p % 2 else 0)
+    return u + env.signbigu if p < 0 else u
+
+def _positions(g, env):
+    """ First and last positions of the finest-ULP unums that intersect the
+    general interval g.
+    """
+    (lo, hi), (lo_open, hi_open) = g
+    first = _position(lo, env)
+    if lo_open and first % 2 == 0:
+        first += 1
+    last = _position(hi, env)
+    if hi_open and last % 2 == 0:
+        last -= 1
+    return first, last
+
+def _uboxrange(first, last, env):
+    p = first
+    while p <= last:
+        yield _finestu(p, env)
+        p += 1
+
+def uboxlistg(g, env=None):
+    """ Generate, in increasing order, the finest-ULP unums that intersect
+    the general interval g.  Generates just qNaNu if g is NaN.
+    """
+    env = env or _core.current_env
+    if g[0][0] != g[0][0] or g[0][1] != g[0][1]:
+        return iter([env.qNaNu])
+    first, last = _positions(g, env)
+    return _uboxrange(first, last, env)
+
+def uboxlist(ub, env=None):
+    """ Generate the 1-dimensional uboxes, at the finest ULP, that make up
+    the unum or ubound ub.
+    """
+    env = env or _core.current_env
+    return uboxlistg(u2g(ub, env), env)
+
+def uboxlistinexact(ub, env=None):
+    """ Same as uboxlist, leaving out the exact unums.
+    """
+    env = env or _core.current_env
+    return (u for u in uboxlist(ub, env) if BitAnd(env.ubitmask, u))
+
+def uboxcount(ub, env=None):
+    """ How many uboxes uboxlist(ub) generates, without generating them.
+    """
+    env = env or _core.current_env
+    g = u2g(ub, env)
+    if g[0][0] != g[0][0] or g[0][1] != g[0][1]:
+        return 1
+    first, last = _positions(g, env)
+    return Max(last - first + 1, 0)
+
+def uboxes(ubs, env=None):
+    """ Generate the n-dimensional uboxes, at the finest ULP, that make up
+    the ubox ubs (one unum or ubound per dimension), as tuples in
+    lexicographic order.
+    """
+    env = env or _core.current_env
+    return _uboxes(list(ubs), env)
+
+def _uboxes(ubs, env):
+    if not ubs:
+        yield ()
     else:
-         return False
\ No newline at end of file
+        # Generate the inner dimensions again for each outer ubox, rather
+        # than keeping lists of them:
+        for u in uboxlist(ubs[0], env):
+            for rest in _uboxes(ubs[1:], env):
+                yield (u,) + rest
+
+def coalesce1D(uboxes, env=None):
+    """ Merge a stream of 1-dimensional uboxes (unums or ubounds), sorted by
+    left endpoint, into the fewest ubounds.  Each ubound is generated as
+    soon as a ubox that does not touch it arrives.  NaN uboxes are passed
+    through as {qNaNu}.
+    """
+    env = env or _core.current_env
+    return _coalesce1D(iter(uboxes), env)
+
+def _coalesce1D(uboxes, env):
+    uL = uR = None
+    for ub in uboxes:
+        g = u2g(ub, env)
+        if g[0][0] != g[0][0] or g[0][1] != g[0][1]:
+            yield [env.qNaNu]
+            continue
+        (lo, hi), (lo_open, hi_open) = g
+        ub = [ub] if IntegerQ(ub) else ub
+        if uL is not None:
+            assert lo > left or (lo == left and (lo_open or not left_open)), \
+                'uboxes are not sorted by left endpoint'
+            touching = lo < right or (lo == right and not (lo_open and right_open))
+            if touching:
+                if hi > right or (hi == right and right_open and not hi_open):
+                    uR, right, right_open = ub[-1], hi, hi_open
+                continue
+            yield [uL] if uL == uR else [uL, uR]
+        uL, left, left_open = ub[0], lo, lo_open
+        uR, right, right_open = ub[-1], hi, hi_open
+    if uL is not None:
+        yield [uL] if uL == uR else [uL, uR]